@@ -6,11 +6,28 @@ Genera statistiche, validazioni e dashboard interattiva
 
 import pandas as pd
 import numpy as np
+import argparse
 import json
+import pickle
 import re
+import sys
+from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+from build_cache import sha256_file, sha256_json
+from classifier import CASE_FOLDS
+from columnar import decode_column as decodifica_colonna, read_columnar as leggi_colonnare
+# Correzioni note e tabelle di categorizzazione, condivise con scripts/02_build_contracts.py
+# (le regole sono compilate una sola volta in un unico matcher ciascuna)
+from rules import (
+    CATEGORIE_AI, CORRECTIONS as CORREZIONI, PNRR_PATTERNS, SETTORI_PA,
+    AI_RULES as REGOLE_AI, PNRR_RULES as REGOLE_PNRR, SECTOR_RULES as REGOLE_SETTORI,
+)
+from outliers import AmountProfile
+from run_report import RunReport
+
 # ============================================================================
 # CONFIGURAZIONE
 # ============================================================================
@@ -21,175 +38,161 @@ INPUT_FILES = [
     'appalti_ia_2025_anac.csv'
 ]
 
-# Errore critico da correggere
-ERRORE_CRITICO = {
-    'cig': 'B1B36B1A1E',
-    'importo_errato': 293893058.00,
-    'importo_corretto': 357.85,
-    'motivo': 'Acquisto libri biblioteca (confronto CIG B1AA21EEA3, B1B748D667)'
+# Schema dei CSV ANAC: tipi dichiarati invece che inferiti colonna per colonna.
+# Codici e identificativi restano stringhe (zeri iniziali compresi), i campi
+# con pochi valori distinti sono Categorical; le colonne non elencate sono str.
+TIPI_IMPORTO = ['importo_complessivo_gara', 'importo_lotto', 'IMPORTO_SICUREZZA', 'DURATA_PREVISTA']
+TIPI_INTERO = ['n_lotti_componenti', 'anno_pubblicazione', 'mese_pubblicazione']
+TIPI_CATEGORIA = [
+    'oggetto_principale_contratto', 'stato', 'settore', 'provincia',
+    'cod_tipo_scelta_contraente', 'tipo_scelta_contraente',
+    'cod_modalita_realizzazione', 'modalita_realizzazione', 'sezione_regionale',
+    'descrizione_cpv', 'flag_prevalente', 'COD_MODALITA_INDIZIONE_SPECIALI',
+    'MODALITA_INDIZIONE_SPECIALI', 'COD_MODALITA_INDIZIONE_SERVIZI',
+    'MODALITA_INDIZIONE_SERVIZI', 'COD_STRUMENTO_SVOLGIMENTO', 'STRUMENTO_SVOLGIMENTO',
+    'FLAG_URGENZA', 'COD_MOTIVO_URGENZA', 'MOTIVO_URGENZA', 'FLAG_DELEGA',
+    'FUNZIONI_DELEGATE', 'TIPO_APPALTO_RISERVATO', 'FLAG_PREV_RIPETIZIONI',
+    'COD_IPOTESI_COLLEGAMENTO', 'IPOTESI_COLLEGAMENTO', 'COD_ESITO', 'ESITO',
+    'FLAG_PNRR_PNC'
+]
+SCHEMA_CSV = {
+    **{c: 'float64' for c in TIPI_IMPORTO},
+    **{c: 'Int64' for c in TIPI_INTERO},
+    **{c: 'category' for c in TIPI_CATEGORIA},
 }
+FORMATO_DATA = '%Y-%m-%d'
+# Campi testuali ripuliti e riempiti con '' da pulisci_dati
+TESTI_PULITI = ['oggetto_lotto', 'oggetto_gara', 'denominazione_amministrazione_appaltante', 'provincia']
+
+# Colonne usate da pulizia, validazioni, categorizzazione e statistiche
+# (--solo-colonne-analisi legge solo queste)
+COLONNE_ANALISI = [
+    'cig', 'oggetto_gara', 'oggetto_lotto', 'importo_complessivo_gara', 'importo_lotto',
+    'provincia', 'data_pubblicazione', 'cf_amministrazione_appaltante',
+    'denominazione_amministrazione_appaltante', 'anno_pubblicazione', 'FLAG_PNRR_PNC'
+]
 
-# ============================================================================
-# PATTERN DI CATEGORIZZAZIONE
-# ============================================================================
+# Parser CSV: pyarrow (multi-thread) se installato, altrimenti il motore C
+try:
+    import pyarrow  # noqa: F401
+    MOTORE_CSV = 'pyarrow'
+except ImportError:
+    MOTORE_CSV = 'c'
 
-CATEGORIE_AI = {
-    'AI Generativa & LLM': [
-        r'ai generativa', r'llm', r'gpt', r'chatbot', r'chat bot',
-        r'assistente virtuale', r'conversazional', r'generative ai',
-        r'open\s*ai', r'copilot', r'digital human'
-    ],
-    'Machine Learning & Analytics': [
-        r'machine learning', r'ml(?:\s|$)', r'deep learning',
-        r'predittiv', r'analytics', r'analisi dati', r'data science',
-        r'big data', r'rete neural', r'neural network'
-    ],
-    'Computer Vision': [
-        r'visione artificiale', r'computer vision', r'riconoscimento immagini',
-        r'detection', r'rilevamento', r'video analytics', r'ocr',
-        r'image processing', r'elaborazione immagini'
-    ],
-    'NLP & Speech': [
-        r'nlp', r'natural language', r'elaborazione linguaggio',
-        r'speech', r'vocale', r'riconoscimento vocale', r'text mining',
-        r'sentiment analysis', r'text to speech'
-    ],
-    'RPA & Automazione': [
-        r'rpa', r'robotic process', r'automazione', r'workflow automation',
-        r'processo automatizzato', r'automazione processo'
-    ],
-    'Formazione IA': [
-        r'formazione.*(?:ia|ai|intelligenza artificiale)',
-        r'corso.*(?:ia|ai|intelligenza artificiale)',
-        r'training.*(?:ia|ai)', r'didattica.*(?:ia|ai)',
-        r'insegnamento.*(?:ia|ai)', r'master.*intelligenza',
-        r'seminari?.*(?:ia|ai|intelligenza)', r'mooc.*intelligenza',
-        r'laboratori?.*(?:ia|ai|intelligenza)', r'percors.*formativ'
-    ],
-    'Cybersecurity IA': [
-        r'cybersecurity.*(?:ia|ai)', r'sicurezza.*intelligenza artificiale',
-        r'threat detection', r'anomaly detection.*security',
-        r'cyber.*intelligenza', r'darktrace', r'monitoraggio.*anomalie'
-    ],
-    'Healthcare IA': [
-        r'diagnostica.*(?:ia|ai)', r'medical.*ai', r'radiologia.*(?:ia|ai)',
-        r'telemedicina.*(?:ia|ai)', r'clinical.*ai', r'pathology.*ai',
-        r'polipi', r'colonscopia', r'endoscopia.*(?:ia|ai)',
-        r'mammograf', r'ictus', r'stroke', r'neuroradiologia',
-        r'boneview', r'rapidai', r'zeeromed', r'ecocardiograf',
-        r'morfologic.*vetrini'
-    ],
-    'Biometria': [
-        r'biometric', r'facial recognition', r'riconoscimento facciale',
-        r'fingerprint', r'impronta digitale', r'iris recognition'
-    ],
-    'Document Intelligence': [
-        r'document.*intelligence', r'protocollazione.*(?:ia|ai)',
-        r'gestione documentale.*(?:ia|ai)', r'archiviazione.*(?:ia|ai)',
-        r'ocr.*(?:ia|ai)'
-    ],
-    'IoT & Edge AI': [
-        r'iot.*(?:ia|ai)', r'edge.*(?:ia|ai)', r'smart.*sensor',
-        r'sensori.*intelligenti', r'social robot'
-    ],
-    'Recommendation Systems': [
-        r'recommendation', r'raccomandazione', r'suggerimento automatico',
-        r'personalizzazione.*(?:ia|ai)'
-    ],
-    'AI Ethics & Governance': [
-        r'etica.*(?:ia|ai)', r'governance.*(?:ia|ai)', r'responsible.*ai',
-        r'trustworthy.*ai', r'ai act', r'trasparenza.*(?:ia|ai|intelligenza)'
-    ],
-    'Infrastruttura IA': [
-        r'gpu', r'cuda', r'tensorflow', r'pytorch', r'cloud.*(?:ia|ai)',
-        r'infrastructure.*ai', r'computing.*(?:ia|ai)', r'calcolo.*(?:ia|ai)',
-        r'server.*(?:gpu|hpc|ai)', r'workstation.*(?:ia|ai)',
-        r'nvidia', r'hpc4ai', r'multi-gpu'
-    ],
-    'Consulenza IA': [
-        r'consulenza.*(?:ia|ai|intelligenza)', r'advisory.*ai',
-        r'supporto.*intelligenza artificiale', r'assessment.*ai',
-        r'osservatorio.*intelligenza'
-    ]
-}
+# Soglie robuste degli outlier sugli importi, globali e per questi raggruppamenti
+GRUPPI_OUTLIER = {'categoria': 'categoria_ai', 'settore': 'settore_pa'}
+METODO_OUTLIER = 'mediana + 3 MAD sui log-importi'
 
-SETTORI_PA = {
-    'Sanità': [
-        r'\basl\b', r'azienda sanitaria', r'ospedale', r'\birccs\b', r'agenas',
-        r'policlinico', r'\busl\b', r'\bausl\b', r'\basst\b', r'\bats\b',
-        r'\baou\b', r'\basp\b', r'ospedalier[ao]', r'azienda.*sanitar',
-        r'azienda.*colli', r'fondazione.*pascale', r'fondazione.*policlinico'
-    ],
-    'Università e Ricerca': [
-        r'universit[àa]', r'university', r'politecnico', r'\bcnr\b',
-        r'scuola superiore', r'istituto nazionale', r'\binfn\b', r'\benea\b',
-        r'istituto superiore', r'ricerca metrologica', r'crea', r'inrim'
-    ],
-    'PA Centrale': [
-        r'ministero', r'agenzia entrate', r'\binps\b', r'\binail\b', r'\baci\b',
-        r'agenzia nazionale', r'\bagid\b', r'sogei', r'consip', r'agenzia dogane',
-        r'presidenza.*consiglio', r'commissione.*borsa', r'consob',
-        r'agenzia spaziale', r'\bice\b.*agenzia', r'\benit\b'
-    ],
-    'PA Locale': [
-        r'\bcomune\b', r'\bprovincia\b', r'\bregione\b', r'citt[àa] metropolitana',
-        r'municipio', r'unione comuni', r'comunit[àa] montana',
-        r'camera.*commercio', r'c\.c\.i\.a'
-    ],
-    'Istruzione': [
-        r'istituto comprensivo', r'\bliceo\b', r'istituto tecnico',
-        r'istituto professionale', r'convitto', r'\bscuola\b',
-        r'direzione didattica', r'circolo didattico', r'\bits\b.*academy',
-        r'istituto.*istruzione.*superiore', r'i\.i\.s\.'
-    ],
-    'Difesa e Sicurezza': [
-        r'\bdifesa\b', r'carabinieri', r'polizia', r'guardia.*finanza',
-        r'vigili.*fuoco', r'esercito', r'\bmarina\b', r'aeronautica',
-        r'corpo forestale', r'interno.*p\.?s\.?', r'comando.*rete'
-    ],
-    'Utilities & Trasporti': [
-        r'\brai\b', r'trenitalia', r'\brfi\b', r'\banas\b', r'\benav\b',
-        r'\bacea\b', r'\batac\b', r'\batm\b', r'\bamat\b', r'metropolitana',
-        r'ferrovie', r'\bamtab\b', r'\bhera\b', r'\bcap\b.*holding',
-        r'acquevenete', r've\.la\b'
-    ],
-    'Enti Pubblici Economici': [
-        r'cassa depositi', r'\bcdp\b', r'\beur\b.*spa', r'invitalia', r'\bsace\b',
-        r'banca.*italia', r'digital library'
-    ],
-    'Giustizia': [
-        r'tribunale', r'\bcorte\b', r'\bprocura\b', r'consiglio.*magistratura',
-        r'avvocatura', r'\btar\b', r'consiglio.*stato'
-    ]
-}
+# Cache del DataFrame pulito, corretto e categorizzato (--rebuild-cache per rigenerarla)
+CARTELLA_CACHE = Path('.cache_analisi')
+VERSIONE_CACHE = 2
 
-PNRR_PATTERNS = [
-    r'\bpnrr\b', r'piano nazionale ripresa', r'next generation',
-    r'\bngeu\b', r'recovery fund', r'recovery plan', r'\brrf\b',
-    r'd\.?m\.?\s*66', r'm4c1'
-]
+# Report di esecuzione (tempi e memoria per passo) e profilo delle categorizzazioni
+REPORT_ESECUZIONE = Path('report_esecuzione.json')
+FILE_PROFILO = CARTELLA_CACHE / 'categorizzazioni.prof'
 
 # ============================================================================
 # FUNZIONI DI CARICAMENTO E PULIZIA
 # ============================================================================
 
-def carica_csv(files):
+def _applica_schema(df):
+    """Converte le colonne numeriche lette come stringhe nei tipi di SCHEMA_CSV.
+
+    Importi e interi passano da pd.to_numeric(errors='coerce'): un valore
+    non numerico (es. 'N/D') diventa NaN invece di far fallire l'anno.
+    """
+    for col in df.columns:
+        tipo = SCHEMA_CSV.get(col, 'str')
+        if tipo == 'float64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+        elif tipo == 'Int64':
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+        elif df[col].dtype != tipo:
+            df[col] = df[col].astype(tipo)
+    return df
+
+def _leggi_csv(f, colonne=None):
+    """Un CSV ANAC con lo schema dichiarato (tutte le colonne o solo `colonne`)"""
+    intestazione = pd.read_csv(f, sep=';', encoding='utf-8-sig', nrows=0).columns
+    # Le colonne numeriche si leggono come stringhe e si convertono dopo
+    tipi = {c: 'str' if SCHEMA_CSV.get(c) in ('float64', 'Int64') else SCHEMA_CSV.get(c, 'str')
+            for c in intestazione if colonne is None or c in colonne}
+    opzioni = dict(sep=';', encoding='utf-8-sig', usecols=colonne, dtype=tipi)
+    df = None
+    if MOTORE_CSV == 'pyarrow':
+        try:
+            df = pd.read_csv(f, engine='pyarrow', **opzioni)
+        except (ValueError, TypeError, NotImplementedError):
+            pass  # opzione non supportata da questa versione: motore C
+    if df is None:
+        df = pd.read_csv(f, engine='c', **opzioni)
+    return _applica_schema(df)
+
+def carica_csv(files, solo_colonne_analisi=False):
     """Carica e unifica i CSV"""
+    colonne = COLONNE_ANALISI if solo_colonne_analisi else None
     dfs = []
     for f in files:
-        try:
-            df = pd.read_csv(f, sep=';', encoding='utf-8-sig', low_memory=False)
-            anno = f.split('_')[2]  # Estrai anno dal nome file
-            df['anno_dataset'] = anno
-            dfs.append(df)
-            print(f"✓ Caricato {f}: {len(df)} record")
-        except Exception as e:
-            print(f"✗ Errore caricamento {f}: {e}")
-
-    df = pd.concat(dfs, ignore_index=True)
+        df = _leggi_csv(f, colonne)
+        anno = f.split('_')[2]  # Estrai anno dal nome file
+        df['anno_dataset'] = anno
+        dfs.append(df)
+        print(f"✓ Caricato {f}: {len(df)} record")
+
+    df = _unifica_tipi(pd.concat(dfs, ignore_index=True))
     print(f"\n→ Totale record unificati: {len(df)}")
     return df
 
+def _unifica_tipi(df):
+    """Tipi finali delle colonne dopo l'unione degli anni"""
+    # Le categorie possono differire tra gli anni: concat le riporterebbe a object
+    for col in TIPI_CATEGORIA:
+        if col in df.columns and df[col].dtype != 'category':
+            df[col] = df[col].astype('category')
+    # Interi senza valori mancanti: int64 numpy invece di Int64 nullable
+    for col in TIPI_INTERO:
+        if col in df.columns and not df[col].isna().any():
+            df[col] = df[col].astype('int64')
+    return df
+
+def dataframe_da_record(record):
+    """DataFrame con lo schema di carica_csv dai record letti dalla build.
+
+    I record (dict di stringhe, None se vuote) sono quelli di
+    02_build_contracts.load_csv prima delle correzioni: build_all.py li
+    riusa invece di rileggere i CSV.
+    """
+    return _unifica_tipi(_applica_schema(pd.DataFrame.from_records(record)))
+
+def carica_colonnare(percorso='data/contracts.columnar.json'):
+    """Carica l'output colonnare della build (contratti già corretti e arricchiti).
+
+    Le colonne a dizionario di stringhe diventano Categorical senza
+    ricostruire i valori, gli importi restano array float (NaN se assenti).
+    """
+    dati = leggi_colonnare(percorso)
+    colonne = {}
+    for campo in dati['fields']:
+        valori = dati['columns'][campo]
+        codifica = dati['encodings'][campo]
+        if codifica == 'number':
+            colonne[campo] = np.array([np.nan if v is None else v for v in valori], dtype=float)
+        elif codifica == 'dict':
+            dizionario = dati['dictionaries'][campo]
+            if all(v is None or isinstance(v, str) for v in dizionario):
+                # None diventa il codice -1 (valore mancante) del Categorical
+                categorie = [v for v in dizionario if v is not None]
+                posizione = {v: i for i, v in enumerate(categorie)}
+                mappa = np.array([posizione.get(v, -1) if v is not None else -1 for v in dizionario])
+                colonne[campo] = pd.Categorical.from_codes(mappa[np.asarray(valori, dtype=int)], categorie)
+            else:
+                colonne[campo] = decodifica_colonna(dati, campo)
+        else:
+            colonne[campo] = valori
+    df = pd.DataFrame(colonne)
+    print(f"✓ Caricato {percorso}: {len(df)} record")
+    return df
+
 def pulisci_dati(df):
     """Pulizia e normalizzazione dati"""
     # Converti importi
@@ -197,12 +200,19 @@ def pulisci_dati(df):
     df['importo_complessivo_gara'] = pd.to_numeric(df['importo_complessivo_gara'], errors='coerce').fillna(0)
 
     # Pulisci campi testuali
-    for col in ['oggetto_lotto', 'oggetto_gara', 'denominazione_amministrazione_appaltante', 'provincia']:
+    for col in TESTI_PULITI:
         if col in df.columns:
-            df[col] = df[col].fillna('').astype(str).str.strip()
+            df[col] = df[col].astype(object).fillna('').astype(str).str.strip()
+
+    # Altri campi stringa: spazi esterni tolti, vuoti come mancanti (come clean_value della build)
+    for col in df.columns:
+        if col in TESTI_PULITI or df[col].dtype == 'category' or not pd.api.types.is_string_dtype(df[col]):
+            continue
+        valori = df[col].str.strip()
+        df[col] = valori.mask(valori == '')
 
     # Converti date
-    df['data_pubblicazione'] = pd.to_datetime(df['data_pubblicazione'], errors='coerce')
+    df['data_pubblicazione'] = pd.to_datetime(df['data_pubblicazione'], format=FORMATO_DATA, errors='coerce')
 
     # Normalizza provincia
     df['provincia'] = df['provincia'].str.upper().str.strip()
@@ -214,34 +224,103 @@ def applica_correzioni(df, validazioni):
     """Applica correzioni note"""
     correzioni = []
 
-    # Correzione errore critico CIG B1B36B1A1E
-    mask = df['cig'] == ERRORE_CRITICO['cig']
-    if mask.any():
-        importo_originale = df.loc[mask, 'importo_lotto'].values[0]
-        df.loc[mask, 'importo_lotto'] = ERRORE_CRITICO['importo_corretto']
-        df.loc[mask, 'importo_complessivo_gara'] = ERRORE_CRITICO['importo_corretto']
+    # Errori noti per CIG (tabella condivisa con la build)
+    for cig, correzione in CORREZIONI.items():
+        mask = df['cig'] == cig
+        if not mask.any():
+            continue
+        campo, importo_corretto = correzione['field'], correzione['correct_value']
+        importo_originale = df.loc[mask, campo].values[0]
+        df.loc[mask, campo] = importo_corretto
+        if campo == 'importo_lotto':
+            df.loc[mask, 'importo_complessivo_gara'] = importo_corretto
         correzioni.append({
-            'cig': ERRORE_CRITICO['cig'],
+            'cig': cig,
             'tipo': 'ERRORE CRITICO',
-            'campo': 'importo_lotto',
+            'campo': campo,
             'valore_originale': importo_originale,
-            'valore_corretto': ERRORE_CRITICO['importo_corretto'],
-            'motivo': ERRORE_CRITICO['motivo']
+            'valore_corretto': importo_corretto,
+            'motivo': correzione['reason']
         })
-        print(f"✓ Corretto CIG {ERRORE_CRITICO['cig']}: €{importo_originale:,.2f} → €{ERRORE_CRITICO['importo_corretto']:.2f}")
+        print(f"✓ Corretto CIG {cig}: €{importo_originale:,.2f} → €{importo_corretto:.2f}")
 
     validazioni['correzioni_applicate'] = correzioni
     return df
 
+# ============================================================================
+# CACHE DEL DATAFRAME ELABORATO
+# ============================================================================
+
+def chiave_cache(files, solo_colonne_analisi=False):
+    """Hash di CSV, schema, correzioni e regole: cambia se cambia uno qualsiasi"""
+    return sha256_json(
+        VERSIONE_CACHE,
+        [sha256_file(f) if Path(f).exists() else None for f in files],
+        {k: str(v) for k, v in SCHEMA_CSV.items()}, FORMATO_DATA,
+        COLONNE_ANALISI if solo_colonne_analisi else None,
+        CORREZIONI, CATEGORIE_AI, SETTORI_PA, PNRR_PATTERNS
+    )
+
+def carica_cache(chiave):
+    """(df, validazioni) dalla cache se corrisponde alla chiave, altrimenti None"""
+    try:
+        with open(CARTELLA_CACHE / 'meta.pkl', 'rb') as f:
+            meta = pickle.load(f)
+        if meta.get('versione') != VERSIONE_CACHE or meta.get('chiave') != chiave:
+            return None
+        percorso = CARTELLA_CACHE / meta['file']
+        if meta['formato'] == 'parquet':
+            # Letto in memory map: niente copia del file in un buffer intermedio
+            df = pd.read_parquet(percorso, memory_map=True)
+        else:
+            df = pd.read_pickle(percorso)
+    except Exception:
+        return None
+    return df, meta['validazioni']
+
+def salva_cache(df, validazioni, chiave):
+    """Parquet se pyarrow è installato, altrimenti pickle (stessi dtype)"""
+    CARTELLA_CACHE.mkdir(exist_ok=True)
+    formato = 'parquet' if MOTORE_CSV == 'pyarrow' else 'pickle'
+    nome = 'dataframe.parquet' if formato == 'parquet' else 'dataframe.pkl'
+    try:
+        if formato == 'parquet':
+            df.to_parquet(CARTELLA_CACHE / nome, index=False)
+        else:
+            df.to_pickle(CARTELLA_CACHE / nome)
+    except Exception as e:
+        print(f"✗ Cache non salvata: {e}")
+        return
+    for vecchio in CARTELLA_CACHE.glob('dataframe.*'):
+        if vecchio.name != nome:
+            vecchio.unlink()
+    # Il meta va scritto per ultimo: un salvataggio interrotto non lascia una cache valida
+    meta = {'versione': VERSIONE_CACHE, 'chiave': chiave, 'formato': formato,
+            'file': nome, 'validazioni': validazioni}
+    with open(CARTELLA_CACHE / 'meta.pkl', 'wb') as f:
+        pickle.dump(meta, f)
+    print(f"✓ Cache salvata: {CARTELLA_CACHE / nome}")
+
 # ============================================================================
 # FUNZIONI DI VALIDAZIONE
 # ============================================================================
 
 def valida_importi(df):
-    """Valida importi e identifica outlier"""
-    media = df['importo_lotto'].mean()
-    std = df['importo_lotto'].std()
-    soglia = media + 3 * std
+    """Valida importi e identifica outlier con soglie robuste.
+
+    Mediana e MAD dei log-importi vengono da sketch di quantili fondibili
+    (scripts/outliers.py), riempiti in un solo passaggio sulla colonna: la
+    soglia è exp(mediana + 3 · 1,4826 · MAD), che un singolo importo errato
+    non sposta. Se il DataFrame è già categorizzato le soglie sono calcolate
+    anche per categoria AI e per settore PA.
+    """
+    gruppi = {g: c for g, c in GRUPPI_OUTLIER.items() if c in df.columns}
+    profilo = AmountProfile()
+    profilo.add_many(df['importo_lotto'].to_numpy(dtype=float),
+                     **{g: df[c].to_numpy() for g, c in gruppi.items()})
+    soglie = profilo.thresholds()
+    globale = soglie['overall']
+    soglia = globale['threshold'] if globale['threshold'] is not None else float('inf')
 
     outliers = df[df['importo_lotto'] > soglia][['cig', 'denominazione_amministrazione_appaltante',
                                                    'importo_lotto', 'oggetto_lotto']].copy()
@@ -250,15 +329,34 @@ def valida_importi(df):
     # Contratti con importo 0
     zero_importo = df[df['importo_lotto'] == 0]
 
-    return {
-        'media': media,
+    risultato = {
+        'media': profilo.mean,
         'mediana': df['importo_lotto'].median(),
-        'std': std,
+        'std': profilo.std,
         'soglia_outlier': soglia,
+        'metodo_outlier': METODO_OUTLIER,
+        'mediana_log': globale['log_median'],
+        'mad_log': globale['log_mad'],
         'n_outliers': len(outliers),
         'outliers': outliers.head(20).to_dict('records'),
         'n_importo_zero': len(zero_importo)
     }
+    for g, c in gruppi.items():
+        risultato[f'per_{g}'] = _outlier_per_gruppo(df, c, soglie[g])
+    return risultato
+
+def _outlier_per_gruppo(df, colonna, soglie):
+    """Soglia e numero di outlier per ogni valore di colonna (None se il gruppo è troppo piccolo)"""
+    risultato = {}
+    mediane = df.groupby(df[colonna].astype(str), observed=True)['importo_lotto'].median()
+    for etichetta, s in soglie.items():
+        n_outliers = None
+        if s['threshold'] is not None:
+            gruppo = df[colonna].astype(str) == etichetta
+            n_outliers = int((gruppo & (df['importo_lotto'] > s['threshold'])).sum())
+        risultato[etichetta] = {'n_contratti': s['count'], 'mediana': mediane[etichetta],
+                                'soglia_outlier': s['threshold'], 'n_outliers': n_outliers}
+    return risultato
 
 def valida_date(df):
     """Valida coerenza date"""
@@ -301,25 +399,13 @@ def valida_campi(df):
 
 def categorizza_ai(row):
     """Categorizza contratto per tipologia AI"""
-    testo = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}".lower()
-
-    for categoria, patterns in CATEGORIE_AI.items():
-        for pattern in patterns:
-            if re.search(pattern, testo, re.IGNORECASE):
-                return categoria
-
-    return 'Altre applicazioni IA'
+    testo = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}"
+    return REGOLE_AI.classify(testo)
 
 def categorizza_settore(row):
     """Categorizza PA per settore"""
-    nome = str(row.get('denominazione_amministrazione_appaltante', '')).lower()
-
-    for settore, patterns in SETTORI_PA.items():
-        for pattern in patterns:
-            if re.search(pattern, nome, re.IGNORECASE):
-                return settore
-
-    return 'Altri Enti Pubblici'
+    nome = str(row.get('denominazione_amministrazione_appaltante', ''))
+    return REGOLE_SETTORI.classify(nome)
 
 def identifica_pnrr(row):
     """Identifica contratti PNRR"""
@@ -328,41 +414,144 @@ def identifica_pnrr(row):
         return True
 
     # Check testo
-    testo = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}".lower()
-    for pattern in PNRR_PATTERNS:
-        if re.search(pattern, testo, re.IGNORECASE):
-            return True
-
-    return False
+    testo = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}"
+    return REGOLE_PNRR.matches(testo)
+
+def _normalizza_testo(serie):
+    """Minuscolo + folding come classifier.fold, ma su un'intera colonna"""
+    # dtype object: str.contains deve usare il modulo re come le regole
+    return serie.astype(str).str.lower().str.translate(CASE_FOLDS).astype(object)
+
+def _cascata(testo, regole):
+    """Prima etichetta (in ordine di priorità) che trova match, per riga.
+
+    La cascata gira sui soli valori distinti (una PA ricorre in molti CIG)
+    e il risultato viene riespanso sulle righe tramite i codici.
+    """
+    codici, valori = pd.factorize(testo)
+    valori = pd.Series(valori, dtype=object)
+    condizioni = [valori.str.contains(p, regex=True, na=False) for p in regole.label_patterns]
+    etichette = np.select(condizioni, regole.labels, default=regole.default)
+    return etichette[codici]
+
+def categorizza_vettoriale(df):
+    """Categoria AI, settore PA e flag PNRR calcolati per colonna.
+
+    Equivalente a df.apply(categorizza_ai / categorizza_settore /
+    identifica_pnrr, axis=1), ma con operazioni stringa vettoriali e una
+    cascata np.select al posto di una Series per riga.
+    """
+    testo = _normalizza_testo(df['oggetto_lotto'].astype(str) + ' ' + df['oggetto_gara'].astype(str))
+    nome = _normalizza_testo(df['denominazione_amministrazione_appaltante'])
+
+    df['categoria_ai'] = _cascata(testo, REGOLE_AI)
+    df['settore_pa'] = _cascata(nome, REGOLE_SETTORI)
+
+    flag = df['FLAG_PNRR_PNC'].isin([1, '1']) if 'FLAG_PNRR_PNC' in df.columns else False
+    df['is_pnrr'] = flag | _cascata(testo, REGOLE_PNRR).astype(bool)
+    return df
 
 # ============================================================================
 # FUNZIONI DI ANALISI
 # ============================================================================
 
-def calcola_statistiche_generali(df):
+# Chiavi di tutte le viste: ogni cella dell'aggregazione è una combinazione
+# distinta di questi valori
+CHIAVI_AGGREGAZIONE = ['anno_pubblicazione', 'cf_amministrazione_appaltante',
+                       'denominazione_amministrazione_appaltante', 'provincia',
+                       'categoria_ai', 'settore_pa', 'is_pnrr']
+
+def aggrega(df):
+    """Unico passaggio raggruppato su tutte le chiavi usate dalle statistiche.
+
+    Restituisce le celle (una riga per combinazione distinta delle chiavi, con
+    righe, somma, conteggi, minimo e massimo di importo_lotto) e le mediane, le sole
+    grandezze che non si ricompongono dalle celle. Le funzioni di analisi
+    sono viste su questo risultato: ri-aggregano le celle, molte meno righe
+    del DataFrame.
+    """
+    celle = df.groupby(CHIAVI_AGGREGAZIONE, dropna=False, observed=True, sort=False).agg(
+        valore=('importo_lotto', 'sum'),
+        n_righe=('importo_lotto', 'size'),
+        n_contratti=('cig', 'count'),
+        n_importi=('importo_lotto', 'count'),
+        importo_min=('importo_lotto', 'min'),
+        importo_max=('importo_lotto', 'max'),
+    ).reset_index()
+    mediane_pnrr = df.groupby('is_pnrr')['importo_lotto'].median()
+    return {
+        'n_righe': len(df),
+        'celle': celle,
+        'mediana': df['importo_lotto'].median(),
+        'mediane_pnrr': {bool(k): v for k, v in mediane_pnrr.items()},
+    }
+
+def _per(celle, chiave, **colonne):
+    """Somme delle colonne delle celle per chiave (stessa semantica dropna di groupby)"""
+    return celle.groupby(chiave, observed=True)[list(colonne)].sum().rename(columns=colonne)
+
+def calcola_statistiche_generali(df, aggregati=None):
     """Calcola statistiche generali del dataset"""
+    aggregati = aggregati or aggrega(df)
+    celle = aggregati['celle']
+    totale = celle['valore'].sum()
+    n_importi = celle['n_importi'].sum()
     return {
-        'totale_contratti': len(df),
-        'valore_totale': round(df['importo_lotto'].sum(), 2),
-        'valore_medio': round(df['importo_lotto'].mean(), 2),
-        'valore_mediano': round(df['importo_lotto'].median(), 2),
-        'pa_coinvolte': df['cf_amministrazione_appaltante'].nunique(),
-        'province_coinvolte': df[df['provincia'] != 'N/D']['provincia'].nunique(),
-        'anni_coperti': sorted(df['anno_pubblicazione'].dropna().unique().tolist()),
-        'distribuzione_annuale': df.groupby('anno_pubblicazione').agg({
-            'cig': 'count',
-            'importo_lotto': 'sum'
-        }).rename(columns={'cig': 'n_contratti', 'importo_lotto': 'valore'}).to_dict('index')
+        'totale_contratti': aggregati['n_righe'],
+        'valore_totale': round(totale, 2),
+        'valore_medio': round(totale / n_importi, 2),
+        'valore_mediano': round(aggregati['mediana'], 2),
+        'pa_coinvolte': celle['cf_amministrazione_appaltante'].nunique(),
+        'province_coinvolte': celle.loc[celle['provincia'] != 'N/D', 'provincia'].nunique(),
+        'anni_coperti': sorted(celle['anno_pubblicazione'].dropna().unique().tolist()),
+        'distribuzione_annuale': _per(celle, 'anno_pubblicazione',
+                                      n_contratti='n_contratti', valore='valore').to_dict('index')
     }
 
-def classifica_pa(df, top_n=30):
+def _moda_per_gruppo(celle, chiavi, colonna):
+    """Valore più frequente di `colonna` per gruppo, calcolato dalle celle.
+
+    Conta le righe per (gruppo, valore), ordina per conteggio decrescente e
+    valore crescente e tiene la prima riga di ogni gruppo: a parità vince il
+    valore minore, come Series.mode().iloc[0]. I NaN non contano, come in mode().
+    """
+    conteggi = (celle.dropna(subset=[colonna])
+                .groupby(chiavi + [colonna], observed=True)['n_righe'].sum()
+                .reset_index())
+    conteggi = conteggi.sort_values(chiavi + ['n_righe', colonna],
+                                    ascending=[True] * len(chiavi) + [False, True],
+                                    kind='mergesort')
+    return conteggi.drop_duplicates(chiavi).set_index(chiavi)[colonna]
+
+def _distinti_per_gruppo(celle, chiavi, colonna):
+    """Lista ordinata dei valori distinti (non NaN) di `colonna` per gruppo"""
+    distinti = (celle.dropna(subset=[colonna])[chiavi + [colonna]]
+                .drop_duplicates()
+                .sort_values(chiavi + [colonna], kind='mergesort'))
+    valori = distinti[colonna].tolist()
+    inizi = np.flatnonzero(~distinti.duplicated(chiavi).to_numpy())
+    fini = list(inizi[1:]) + [len(valori)]
+    indice = pd.MultiIndex.from_frame(distinti.iloc[inizi][chiavi])
+    return pd.Series([valori[i:j] for i, j in zip(inizi, fini)], index=indice, dtype=object)
+
+def classifica_pa(df, top_n=30, aggregati=None):
     """Classifica PA per spesa"""
-    grouped = df.groupby(['cf_amministrazione_appaltante', 'denominazione_amministrazione_appaltante']).agg({
-        'importo_lotto': ['sum', 'mean', 'min', 'max', 'count'],
-        'provincia': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'N/D',
-        'anno_pubblicazione': lambda x: sorted(x.dropna().unique().tolist()),
-        'settore_pa': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else 'Altri Enti'
-    }).reset_index()
+    aggregati = aggregati or aggrega(df)
+    celle = aggregati['celle']
+    chiavi = ['cf_amministrazione_appaltante', 'denominazione_amministrazione_appaltante']
+    grouped = celle.groupby(chiavi).agg(
+        importo_totale=('valore', 'sum'),
+        n_importi=('n_importi', 'sum'),
+        importo_min=('importo_min', 'min'),
+        importo_max=('importo_max', 'max'),
+    )
+    grouped['importo_medio'] = grouped['importo_totale'] / grouped['n_importi']
+    grouped['provincia'] = _moda_per_gruppo(celle, chiavi, 'provincia').reindex(grouped.index).fillna('N/D')
+    anni = _distinti_per_gruppo(celle, chiavi, 'anno_pubblicazione').reindex(grouped.index)
+    grouped['anni_attivita'] = [a if isinstance(a, list) else [] for a in anni]
+    grouped['settore_pa'] = _moda_per_gruppo(celle, chiavi, 'settore_pa').reindex(grouped.index).fillna('Altri Enti')
+    grouped = grouped[['importo_totale', 'importo_medio', 'importo_min', 'importo_max',
+                       'n_importi', 'provincia', 'anni_attivita', 'settore_pa']].reset_index()
 
     grouped.columns = ['cf', 'denominazione', 'importo_totale', 'importo_medio',
                        'importo_min', 'importo_max', 'n_contratti', 'provincia',
@@ -373,12 +562,10 @@ def classifica_pa(df, top_n=30):
 
     return grouped.to_dict('records')
 
-def raggruppa_per_categoria(df):
+def raggruppa_per_categoria(df, aggregati=None):
     """Raggruppa contratti per categoria AI"""
-    grouped = df.groupby('categoria_ai').agg({
-        'importo_lotto': 'sum',
-        'cig': 'count'
-    }).rename(columns={'cig': 'n_contratti', 'importo_lotto': 'valore'})
+    aggregati = aggregati or aggrega(df)
+    grouped = _per(aggregati['celle'], 'categoria_ai', valore='valore', n_contratti='n_contratti')
 
     totale = grouped['valore'].sum()
     grouped['percentuale'] = round((grouped['valore'] / totale) * 100, 2)
@@ -386,17 +573,12 @@ def raggruppa_per_categoria(df):
 
     return grouped.to_dict('records')
 
-def raggruppa_per_settore(df):
+def raggruppa_per_settore(df, aggregati=None):
     """Raggruppa per settore PA"""
-    grouped = df.groupby('settore_pa').agg({
-        'importo_lotto': 'sum',
-        'cig': 'count',
-        'cf_amministrazione_appaltante': 'nunique'
-    }).rename(columns={
-        'cig': 'n_contratti',
-        'importo_lotto': 'valore',
-        'cf_amministrazione_appaltante': 'n_pa'
-    })
+    aggregati = aggregati or aggrega(df)
+    celle = aggregati['celle']
+    grouped = _per(celle, 'settore_pa', valore='valore', n_contratti='n_contratti')
+    grouped['n_pa'] = celle.groupby('settore_pa')['cf_amministrazione_appaltante'].nunique()
 
     totale = grouped['valore'].sum()
     grouped['percentuale'] = round((grouped['valore'] / totale) * 100, 2)
@@ -404,31 +586,42 @@ def raggruppa_per_settore(df):
 
     return grouped.to_dict('records')
 
-def analisi_pnrr(df):
+def analisi_pnrr(df, aggregati=None):
     """Analisi contratti PNRR vs non-PNRR"""
-    pnrr = df[df['is_pnrr'] == True]
-    non_pnrr = df[df['is_pnrr'] == False]
+    aggregati = aggregati or aggrega(df)
+    celle = aggregati['celle']
+    per_flag = _per(celle, 'is_pnrr', n_contratti='n_contratti', valore='valore',
+                    n_importi='n_importi')
+    totale = celle['valore'].sum()
+
+    def riepilogo(flag):
+        if flag not in per_flag.index:
+            return 0, 0.0, 0
+        riga = per_flag.loc[flag]
+        return int(riga['n_contratti']), riga['valore'], int(riga['n_importi'])
+
+    n_pnrr, valore_pnrr, importi_pnrr = riepilogo(True)
+    n_non_pnrr, valore_non_pnrr, importi_non_pnrr = riepilogo(False)
+    mediane = aggregati['mediane_pnrr']
 
-    pnrr_per_anno = pnrr.groupby('anno_pubblicazione').agg({
-        'cig': 'count',
-        'importo_lotto': 'sum'
-    }).rename(columns={'cig': 'n_contratti', 'importo_lotto': 'valore'}).to_dict('index')
+    pnrr_per_anno = _per(celle[celle['is_pnrr'] == True], 'anno_pubblicazione',
+                         n_contratti='n_contratti', valore='valore').to_dict('index')
 
     return {
         'pnrr': {
-            'n_contratti': len(pnrr),
-            'valore': round(pnrr['importo_lotto'].sum(), 2),
-            'valore_medio': round(pnrr['importo_lotto'].mean(), 2) if len(pnrr) > 0 else 0,
-            'valore_mediano': round(pnrr['importo_lotto'].median(), 2) if len(pnrr) > 0 else 0,
-            'percentuale_contratti': round(len(pnrr) / len(df) * 100, 2),
-            'percentuale_valore': round(pnrr['importo_lotto'].sum() / df['importo_lotto'].sum() * 100, 2),
+            'n_contratti': n_pnrr,
+            'valore': round(valore_pnrr, 2),
+            'valore_medio': round(valore_pnrr / importi_pnrr, 2) if n_pnrr > 0 else 0,
+            'valore_mediano': round(mediane[True], 2) if n_pnrr > 0 else 0,
+            'percentuale_contratti': round(n_pnrr / aggregati['n_righe'] * 100, 2),
+            'percentuale_valore': round(valore_pnrr / totale * 100, 2),
             'per_anno': pnrr_per_anno
         },
         'non_pnrr': {
-            'n_contratti': len(non_pnrr),
-            'valore': round(non_pnrr['importo_lotto'].sum(), 2),
-            'valore_medio': round(non_pnrr['importo_lotto'].mean(), 2) if len(non_pnrr) > 0 else 0,
-            'valore_mediano': round(non_pnrr['importo_lotto'].median(), 2) if len(non_pnrr) > 0 else 0
+            'n_contratti': n_non_pnrr,
+            'valore': round(valore_non_pnrr, 2),
+            'valore_medio': round(valore_non_pnrr / importi_non_pnrr, 2) if n_non_pnrr > 0 else 0,
+            'valore_mediano': round(mediane[False], 2) if n_non_pnrr > 0 else 0
         }
     }
 
@@ -703,7 +896,7 @@ def genera_dashboard_html(stats, top_pa, categorie, settori, pnrr_data, validazi
                 <div>
                     <strong>Outlier Identificati</strong><br>
                     Rilevati <span class="badge bg-primary">{validazioni['importi']['n_outliers']}</span> contratti
-                    con importi superiori a 3 deviazioni standard dalla media (> €{validazioni['importi']['soglia_outlier']:,.0f}).
+                    con importi anomali (> €{validazioni['importi']['soglia_outlier']:,.0f}: mediana + 3 MAD sui logaritmi degli importi).
                 </div>
             </div>
         </div>
@@ -950,10 +1143,22 @@ Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}
    Media: €{validazioni['importi']['media']:,.2f}
    Mediana: €{validazioni['importi']['mediana']:,.2f}
    Deviazione standard: €{validazioni['importi']['std']:,.2f}
-   Soglia outlier (3σ): €{validazioni['importi']['soglia_outlier']:,.2f}
+   Soglia outlier ({validazioni['importi']['metodo_outlier']}): €{validazioni['importi']['soglia_outlier']:,.2f}
    Numero outlier identificati: {validazioni['importi']['n_outliers']}
    Contratti con importo zero: {validazioni['importi']['n_importo_zero']}
+'''
+    for chiave, titolo in [('per_categoria', 'categoria AI'), ('per_settore', 'settore PA')]:
+        if chiave not in validazioni['importi']:
+            continue
+        report += f"\n   Soglie per {titolo} (mediana, soglia, outlier):\n"
+        for etichetta, g in validazioni['importi'][chiave].items():
+            if g['soglia_outlier'] is None:
+                report += f"     {etichetta}: {g['n_contratti']} contratti, troppo pochi per una soglia propria\n"
+            else:
+                report += (f"     {etichetta}: €{g['mediana']:,.2f}, €{g['soglia_outlier']:,.2f}, "
+                           f"{g['n_outliers']}\n")
 
+    report += f'''
 3. VALIDAZIONE DATE
 -------------------------------------------------------------------------------
    Date future: {validazioni['date']['n_date_future']}
@@ -995,56 +1200,76 @@ FINE REPORT
 # MAIN
 # ============================================================================
 
-def main():
-    print("=" * 70)
-    print("ANALISI APPALTI IA ANAC 2023-2025")
-    print("=" * 70)
-    print()
-
+def elabora_csv(args, report):
+    """Passi 1-5: caricamento, pulizia, categorizzazioni, validazioni, correzioni"""
     # 1. Caricamento dati
     print("1. CARICAMENTO DATI")
     print("-" * 40)
-    df = carica_csv(INPUT_FILES)
+    with report.stage('caricamento') as passo:
+        df = carica_csv(INPUT_FILES, solo_colonne_analisi=args.solo_colonne_analisi)
+        passo['records_out'] = len(df)
+
+    return elabora_dataframe(df, report, profilo=args.profile)
 
+def elabora_dataframe(df, report, profilo=False, etichette=None):
+    """Passi 2-5 su un DataFrame caricato (da carica_csv o dataframe_da_record).
+
+    etichette, se date, sono le colonne categoria_ai, settore_pa e is_pnrr
+    già calcolate dalla build (una per riga di df): il passo 3 le assegna
+    invece di ricalcolarle.
+    """
     # 2. Pulizia
     print("\n2. PULIZIA DATI")
     print("-" * 40)
-    df = pulisci_dati(df)
+    with report.stage('pulizia', len(df)):
+        df = pulisci_dati(df)
     print("✓ Dati puliti e normalizzati")
 
-    # 3. Validazioni
-    print("\n3. VALIDAZIONI")
+    # 3. Categorizzazioni (prima delle validazioni, che calcolano le soglie per categoria e settore)
+    print("\n3. CATEGORIZZAZIONI")
     print("-" * 40)
-    validazioni = {
-        'importi': valida_importi(df),
-        'date': valida_date(df),
-        'campi': valida_campi(df)
-    }
-    print(f"✓ Outlier identificati: {validazioni['importi']['n_outliers']}")
+    with report.stage('categorizzazioni', len(df)), \
+            report.profile('categorizzazioni', FILE_PROFILO, enabled=profilo):
+        if etichette is None:
+            df = categorizza_vettoriale(df)
+        else:
+            for col in ('categoria_ai', 'settore_pa', 'is_pnrr'):
+                df[col] = etichette[col]
+    print(f"✓ Categorie AI assegnate: {df['categoria_ai'].nunique()}")
+    print(f"✓ Settori PA assegnati: {df['settore_pa'].nunique()}")
+    print(f"✓ Contratti PNRR: {df['is_pnrr'].sum()}")
 
-    # 4. Correzioni
-    print("\n4. CORREZIONI")
+    # 4. Validazioni
+    print("\n4. VALIDAZIONI")
     print("-" * 40)
-    df = applica_correzioni(df, validazioni)
+    with report.stage('validazioni', len(df)):
+        validazioni = {
+            'importi': valida_importi(df),
+            'date': valida_date(df),
+            'campi': valida_campi(df)
+        }
+    print(f"✓ Outlier identificati: {validazioni['importi']['n_outliers']}")
 
-    # 5. Categorizzazioni
-    print("\n5. CATEGORIZZAZIONI")
+    # 5. Correzioni
+    print("\n5. CORREZIONI")
     print("-" * 40)
-    df['categoria_ai'] = df.apply(categorizza_ai, axis=1)
-    df['settore_pa'] = df.apply(categorizza_settore, axis=1)
-    df['is_pnrr'] = df.apply(identifica_pnrr, axis=1)
-    print(f"✓ Categorie AI assegnate: {df['categoria_ai'].nunique()}")
-    print(f"✓ Settori PA assegnati: {df['settore_pa'].nunique()}")
-    print(f"✓ Contratti PNRR: {df['is_pnrr'].sum()}")
+    with report.stage('correzioni', len(df)):
+        df = applica_correzioni(df, validazioni)
+
+    return df, validazioni
 
+def genera_output(df, validazioni, report):
+    """Passi 6-7: statistiche, dashboard, JSON, CSV corretto e report validazioni"""
     # 6. Calcolo statistiche
     print("\n6. CALCOLO STATISTICHE")
     print("-" * 40)
-    stats = calcola_statistiche_generali(df)
-    top_pa = classifica_pa(df, 30)
-    categorie = raggruppa_per_categoria(df)
-    settori = raggruppa_per_settore(df)
-    pnrr_data = analisi_pnrr(df)
+    with report.stage('statistiche', len(df)):
+        aggregati = aggrega(df)
+        stats = calcola_statistiche_generali(df, aggregati)
+        top_pa = classifica_pa(df, 30, aggregati)
+        categorie = raggruppa_per_categoria(df, aggregati)
+        settori = raggruppa_per_settore(df, aggregati)
+        pnrr_data = analisi_pnrr(df, aggregati)
 
     print(f"✓ Totale contratti: {stats['totale_contratti']}")
     print(f"✓ Valore totale: €{stats['valore_totale']:,.2f}")
@@ -1055,44 +1280,102 @@ def main():
     print("-" * 40)
 
     # Dashboard HTML
-    html = genera_dashboard_html(stats, top_pa, categorie, settori, pnrr_data, validazioni)
-    with open('index.html', 'w', encoding='utf-8') as f:
-        f.write(html)
+    with report.stage('dashboard', len(df)):
+        html = genera_dashboard_html(stats, top_pa, categorie, settori, pnrr_data, validazioni)
+        with open('index.html', 'w', encoding='utf-8') as f:
+            f.write(html)
     print("✓ Dashboard salvata: index.html")
 
     # JSON dati processati
-    output_json = {
-        'metadata': {
-            'data_elaborazione': datetime.now().isoformat(),
-            'totale_contratti': stats['totale_contratti'],
-            'valore_totale': stats['valore_totale'],
-            'anni': [str(a) for a in stats['anni_coperti']],
-            'correzioni_applicate': validazioni.get('correzioni_applicate', [])
-        },
-        'statistiche_generali': stats,
-        'top_pa': top_pa,
-        'categorie_ai': categorie,
-        'settori_pa': settori,
-        'pnrr': pnrr_data,
-        'validazioni': {
-            'importi': {k: v for k, v in validazioni['importi'].items() if k != 'outliers'},
-            'date': validazioni['date'],
-            'campi': validazioni['campi']
+    with report.stage('json', len(df)):
+        output_json = {
+            'metadata': {
+                'data_elaborazione': datetime.now().isoformat(),
+                'totale_contratti': stats['totale_contratti'],
+                'valore_totale': stats['valore_totale'],
+                'anni': [str(a) for a in stats['anni_coperti']],
+                'correzioni_applicate': validazioni.get('correzioni_applicate', [])
+            },
+            'statistiche_generali': stats,
+            'top_pa': top_pa,
+            'categorie_ai': categorie,
+            'settori_pa': settori,
+            'pnrr': pnrr_data,
+            'validazioni': {
+                'importi': {k: v for k, v in validazioni['importi'].items() if k != 'outliers'},
+                'date': validazioni['date'],
+                'campi': validazioni['campi']
+            }
         }
-    }
 
-    with open('dati_processati.json', 'w', encoding='utf-8') as f:
-        json.dump(output_json, f, indent=2, ensure_ascii=False, default=str)
+        with open('dati_processati.json', 'w', encoding='utf-8') as f:
+            json.dump(output_json, f, indent=2, ensure_ascii=False, default=str)
     print("✓ Dati JSON salvati: dati_processati.json")
 
     # CSV corretto
-    df['importo_corretto'] = df['importo_lotto']
-    df['is_outlier'] = df['importo_lotto'] > validazioni['importi']['soglia_outlier']
-    df.to_csv('dataset_corretto.csv', index=False, sep=';', encoding='utf-8-sig')
+    with report.stage('csv', len(df)):
+        df['importo_corretto'] = df['importo_lotto']
+        df['is_outlier'] = df['importo_lotto'] > validazioni['importi']['soglia_outlier']
+        df.to_csv('dataset_corretto.csv', index=False, sep=';', encoding='utf-8-sig')
     print("✓ Dataset corretto salvato: dataset_corretto.csv")
 
     # Report validazioni
-    genera_report_validazioni(validazioni, 'report_validazioni.txt')
+    with report.stage('report_validazioni'):
+        genera_report_validazioni(validazioni, 'report_validazioni.txt')
+
+    return stats, top_pa, pnrr_data
+
+def argomenti(argv=None):
+    parser = argparse.ArgumentParser(description="Analisi e dashboard appalti IA ANAC")
+    parser.add_argument('--solo-colonne-analisi', action='store_true',
+                        help="legge dai CSV solo le colonne usate dall'analisi "
+                             "(dataset_corretto.csv conterrà solo quelle)")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help=f"ignora la cache in {CARTELLA_CACHE}/ e rielabora i CSV")
+    parser.add_argument('--report-esecuzione', type=Path, default=REPORT_ESECUZIONE,
+                        help="dove scrivere il report JSON di esecuzione (tempi e memoria per passo)")
+    parser.add_argument('--no-trace-memory', action='store_true',
+                        help="non traccia le allocazioni (più veloce, senza picco di memoria per passo)")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"profila le categorizzazioni con cProfile ({FILE_PROFILO}, "
+                             "funzioni più costose nel report); da usare con --rebuild-cache")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = argomenti(argv)
+    report = RunReport(Path(__file__).name, trace_memory=not args.no_trace_memory)
+    print("=" * 70)
+    print("ANALISI APPALTI IA ANAC 2023-2025")
+    print("=" * 70)
+    print()
+
+    with report.stage('cache') as passo:
+        chiave = chiave_cache(INPUT_FILES, args.solo_colonne_analisi)
+        cache = None if args.rebuild_cache else carica_cache(chiave)
+        if cache is not None:
+            df, validazioni = cache
+            # valida_date dipende dalla data odierna: ricalcolata a ogni esecuzione
+            validazioni['date'] = valida_date(df)
+            passo['records_out'] = len(df)
+    if cache is not None:
+        print(f"✓ Dati puliti, corretti e categorizzati letti dalla cache ({len(df)} record)")
+        print("  (passi 1-5 saltati, --rebuild-cache per rielaborare i CSV)")
+    else:
+        df, validazioni = elabora_csv(args, report)
+        with report.stage('salvataggio_cache', len(df)):
+            salva_cache(df, validazioni, chiave)
+
+    stats, top_pa, pnrr_data = genera_output(df, validazioni, report)
+
+    # Report di esecuzione
+    esecuzione = report.write(args.report_esecuzione)
+    print(f"✓ Report di esecuzione salvato: {args.report_esecuzione}")
+    report.print_summary()
+    for profilo in esecuzione.get('profiles', []):
+        print(f"\n  Funzioni più costose in {profilo['stage']} (cProfile, {profilo['file']}):")
+        for f in profilo['hotspots'][:10]:
+            print(f"    {f['cumtime_s']:>8.3f} s cum {f['tottime_s']:>8.3f} s propri "
+                  f"{f['ncalls']:>9}  {f['function']}")
 
     print("\n" + "=" * 70)
     print("ELABORAZIONE COMPLETATA")
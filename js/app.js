@@ -2,6 +2,9 @@
 // app.js - Main application logic
 
 window.contractsData = [];
+window.aggregates = null;
+// contracts.json hash of the loaded shards (from their manifest), if known
+window.contractsBuild = null;
 
 // Colors palette
 const colors = [
@@ -14,106 +17,249 @@ const colors = [
 const formatEuro = (value) => '€' + value.toLocaleString('it-IT');
 const formatMilioni = (value) => '€' + (value/1000000).toFixed(1) + 'M';
 
-// Load data and initialize
+// Shards fetched in parallel per batch; the dashboard is rendered after the first batch
+const SHARD_BATCH = 4;
+
+// data/aggregates.json, search_index.json and contracts_listing.json layouts this dashboard understands
+const AGGREGATES_VERSION = 1;
+const SEARCH_INDEX_VERSION = 1;
+const LISTING_VERSION = 1;
+
+// Fields matched by the search box (same list as scripts/search_index.py)
+const SEARCH_FIELDS = ['cig', 'denominazione_amministrazione_appaltante', 'oggetto_lotto', 'provincia', 'categoria_ai', 'settore_pa'];
+
+// Load data and initialize: KPIs and charts come from the precomputed
+// aggregates; the records are loaded afterwards for search and the PA modal.
 document.addEventListener('DOMContentLoaded', async () => {
+    initSearch();
+    initFilters();
     try {
-        const response = await fetch('data/contracts.json');
-        window.contractsData = await response.json();
-        updateKPIs();
-        initCharts();
-        initSearch();
-        initFilters();
-        initTop30Table();
+        window.aggregates = await loadAggregates();
+        if (window.aggregates) renderDashboard(window.aggregates);
+        await loadContracts(() => {
+            // Without (current) aggregates, compute them from what is loaded so far
+            if (!window.aggregates) renderDashboard(computeAggregates(window.contractsData));
+        });
     } catch (error) {
         console.error('Error loading data:', error);
     }
 });
 
-// Update KPIs from data
-function updateKPIs() {
-    const data = window.contractsData;
-    const totalContratti = data.length;
-    const totalValore = data.reduce((sum, c) => sum + (parseFloat(c.importo_complessivo_gara) || 0), 0);
-    const paSet = new Set(data.map(c => c.cf_amministrazione_appaltante).filter(Boolean));
-    const provSet = new Set(data.map(c => c.provincia).filter(p => p && p !== 'N/D'));
-    const pnrrCount = data.filter(c => c.is_pnrr).length;
-    const pnrrPct = totalContratti > 0 ? ((pnrrCount / totalContratti) * 100).toFixed(1) : 0;
-    const media = totalContratti > 0 ? totalValore / totalContratti : 0;
+function renderDashboard(aggregates) {
+    updateKPIs(aggregates);
+    initCharts(aggregates);
+    initTop30Table(aggregates);
+    // Re-apply the active sector filter to the rebuilt table
+    const activeFilter = document.querySelector('.filter-btn.active');
+    if (activeFilter) activeFilter.click();
+}
 
-    document.getElementById('kpiContratti').textContent = totalContratti.toLocaleString('it-IT');
-    document.getElementById('kpiValore').textContent = (totalValore / 1e6).toFixed(1) + 'M';
-    document.getElementById('kpiPA').textContent = paSet.size.toLocaleString('it-IT');
-    document.getElementById('kpiMedia').textContent = Math.round(media / 1000).toLocaleString('it-IT') + 'K';
-    document.getElementById('kpiPNRR').textContent = pnrrCount;
-    document.getElementById('kpiPNRRLabel').textContent = `PNRR (${pnrrPct}%)`;
-    document.getElementById('kpiProvince').textContent = provSet.size;
+// Precomputed aggregates written by 02_build_contracts.py, or null
+async function loadAggregates() {
+    const response = await fetch('data/aggregates.json').catch(() => null);
+    if (!response || !response.ok) return null;
+    const aggregates = await response.json();
+    return aggregates.version === AGGREGATES_VERSION ? aggregates : null;
+}
 
-    // Update search count
-    const searchCount = document.getElementById('searchCount');
-    if (searchCount) searchCount.textContent = totalContratti.toLocaleString('it-IT');
+// Load contracts: the slim listing if present (full records are fetched per
+// contract, see loadDetails), else the month shards (newest first), else the
+// columnar file, else contracts.json. render() is called once the first
+// records are in, and again when the shards are all loaded.
+async function loadContracts(render) {
+    const listingResponse = await fetch('data/contracts_listing.json').catch(() => null);
+    if (listingResponse && listingResponse.ok) {
+        const listing = await listingResponse.json();
+        if (listing.version === LISTING_VERSION) {
+            setContractsBuild(listing.contracts_sha256);
+            window.contractsData = listing.records;
+            searchTexts.length = 0;
+            detailBuckets = listing.detail_buckets;
+            render();
+            return;
+        }
+    }
 
-    // Update stats info
-    const statsInfo = document.getElementById('statsInfo');
-    if (statsInfo) statsInfo.textContent = `Record totali: ${totalContratti.toLocaleString('it-IT')} | Validati: ${totalContratti.toLocaleString('it-IT')} | Errori corretti: 1`;
+    const manifestResponse = await fetch('data/contracts/manifest.json').catch(() => null);
+    if (!manifestResponse || !manifestResponse.ok) {
+        const columnar = await fetch('data/contracts.columnar.json').catch(() => null);
+        window.contractsData = columnar && columnar.ok
+            ? decodeColumnar(await columnar.json())
+            : await (await fetch('data/contracts.json')).json();
+        searchTexts.length = 0;
+        render();
+        return;
+    }
 
-    // Update last update date
-    const lastUpdate = document.getElementById('lastUpdate');
-    if (lastUpdate) lastUpdate.textContent = new Date().toLocaleDateString('it-IT');
+    const manifest = await manifestResponse.json();
+    setContractsBuild(manifest.contracts_sha256);
+    const shards = manifest.shards;
+    window.contractsData = [];
+    searchTexts.length = 0;
+    for (let i = 0; i < shards.length; i += SHARD_BATCH) {
+        const batch = await Promise.all(shards.slice(i, i + SHARD_BATCH).map(s =>
+            fetch('data/contracts/' + s.file).then(r => r.json())
+        ));
+        batch.forEach(records => window.contractsData.push(...records));
+        if (i === 0 || i + SHARD_BATCH >= shards.length) render();
+    }
 }
 
-// Generate Top 30 PA table
-function initTop30Table() {
-    const byPA = {};
-    window.contractsData.forEach(c => {
-        const pa = c.denominazione_amministrazione_appaltante || 'N/D';
-        if (!byPA[pa]) byPA[pa] = { total: 0, count: 0, provincia: c.provincia || 'N/D', settore: c.settore_pa || 'Altri Enti Pubblici' };
-        byPA[pa].total += parseFloat(c.importo_complessivo_gara) || 0;
-        byPA[pa].count++;
+// Remember which contracts.json build the loaded records come from;
+// aggregates from a different build are stale
+function setContractsBuild(sha256) {
+    window.contractsBuild = sha256 || null;
+    if (window.aggregates && window.aggregates.build.contracts_sha256 !== window.contractsBuild) {
+        window.aggregates = null;
+    }
+}
+
+// Full records of listed contracts, from the data/details/ buckets (see
+// scripts/listing.py). Each bucket is fetched once; with complete records
+// loaded (no listing) the contracts are returned as they are.
+let detailBuckets = 0;
+const detailCache = new Map();
+
+// FNV-1a (32 bit) of the CIG modulo the bucket count, in padded hex
+function detailBucket(cig) {
+    let h = 0x811c9dc5;
+    for (let i = 0; i < cig.length; i++) {
+        h ^= cig.charCodeAt(i);
+        h = Math.imul(h, 0x01000193);
+    }
+    const width = (detailBuckets - 1).toString(16).length;
+    return ((h >>> 0) % detailBuckets).toString(16).padStart(width, '0');
+}
+
+async function loadDetails(contracts) {
+    if (!detailBuckets) return contracts;
+    const buckets = contracts.map(c => detailBucket(c.cig || ''));
+    buckets.forEach(name => {
+        if (!detailCache.has(name)) {
+            detailCache.set(name, fetch('data/details/' + name + '.json').then(r => r.json()).catch(() => ({})));
+        }
     });
-    const top30 = Object.entries(byPA).sort((a, b) => b[1].total - a[1].total).slice(0, 30);
-    document.getElementById('paTableBody').innerHTML = top30.map(([pa, data], i) =>
-        `<tr data-settore="${data.settore}" data-pa="${pa}"><td>${i + 1}</td><td><span class="pa-link" onclick="showPAContracts(this)">${pa.length > 50 ? pa.substring(0, 47) + '...' : pa}</span></td><td>${data.provincia}</td><td><span class="badge bg-secondary badge-settore">${data.settore}</span></td><td class="text-end fw-bold">${Math.round(data.total).toLocaleString('it-IT')}</td><td class="text-end">${data.count}</td><td class="text-end">${Math.round(data.total / data.count).toLocaleString('it-IT')}</td></tr>`
-    ).join('');
+    const details = await Promise.all(buckets.map(name => detailCache.get(name)));
+    return contracts.map((c, i) => details[i][c.cig] || c);
 }
 
-// Calculate aggregations from data
-function calculateStats() {
+// Rebuild records from data/contracts.columnar.json (see scripts/columnar.py):
+// dictionary codes are resolved, amounts stay numbers
+function decodeColumnar(payload) {
+    const columns = payload.fields.map(field => {
+        const column = payload.columns[field];
+        if (payload.encodings[field] !== 'dict') return column;
+        const dictionary = payload.dictionaries[field];
+        return column.map(code => dictionary[code]);
+    });
+    const records = new Array(payload.records);
+    for (let i = 0; i < payload.records; i++) {
+        const record = {};
+        payload.fields.forEach((field, k) => { record[field] = columns[k][i]; });
+        records[i] = record;
+    }
+    return records;
+}
+
+// Create a chart, replacing the one already drawn on the same canvas
+function renderChart(canvasId, config) {
+    const canvas = document.getElementById(canvasId);
+    const existing = Chart.getChart(canvas);
+    if (existing) existing.destroy();
+    return new Chart(canvas, config);
+}
+
+// Same shape as data/aggregates.json (see scripts/aggregates.py)
+function computeAggregates(data) {
     const byPA = {};
     const byCategoria = {};
     const bySettore = {};
     const byYear = {};
-    let pnrrValue = 0, nonPnrrValue = 0;
+    const paSet = new Set();
+    const provSet = new Set();
+    let totalValore = 0, pnrrCount = 0, pnrrValue = 0, nonPnrrValue = 0;
 
-    window.contractsData.forEach(c => {
+    data.forEach(c => {
         const pa = c.denominazione_amministrazione_appaltante || 'N/D';
         const cat = c.categoria_ai || 'Altre applicazioni IA';
         const set = c.settore_pa || 'Altri Enti Pubblici';
         const importo = parseFloat(c.importo_complessivo_gara) || 0;
         const year = c.anno_pubblicazione || '2025';
 
-        byPA[pa] = (byPA[pa] || 0) + importo;
+        if (!byPA[pa]) byPA[pa] = { denominazione: pa, total: 0, count: 0, provincia: c.provincia || 'N/D', settore: c.settore_pa || 'Altri Enti Pubblici' };
+        byPA[pa].total += importo;
+        byPA[pa].count++;
         byCategoria[cat] = (byCategoria[cat] || 0) + importo;
         bySettore[set] = (bySettore[set] || 0) + importo;
         byYear[year] = byYear[year] || { count: 0, value: 0 };
         byYear[year].count++;
         byYear[year].value += importo;
 
-        if (c.is_pnrr) pnrrValue += importo;
+        totalValore += importo;
+        if (c.cf_amministrazione_appaltante) paSet.add(c.cf_amministrazione_appaltante);
+        if (c.provincia && c.provincia !== 'N/D') provSet.add(c.provincia);
+        if (c.is_pnrr) { pnrrCount++; pnrrValue += importo; }
         else nonPnrrValue += importo;
     });
 
-    return { byPA, byCategoria, bySettore, byYear, pnrrValue, nonPnrrValue };
+    const sortedDesc = (totals) => Object.entries(totals).sort((a, b) => b[1] - a[1]);
+    return {
+        kpis: {
+            contratti: data.length,
+            valore: totalValore,
+            pa: paSet.size,
+            province: provSet.size,
+            pnrr: pnrrCount,
+            media: data.length > 0 ? totalValore / data.length : 0
+        },
+        top_pa: Object.values(byPA).sort((a, b) => b.total - a.total).slice(0, 30),
+        categorie: sortedDesc(byCategoria),
+        settori: sortedDesc(bySettore),
+        by_year: byYear,
+        pnrr: { value: pnrrValue, non_pnrr_value: nonPnrrValue }
+    };
+}
+
+// Update KPIs
+function updateKPIs(aggregates) {
+    const kpis = aggregates.kpis;
+    const totalContratti = kpis.contratti;
+    const pnrrPct = totalContratti > 0 ? ((kpis.pnrr / totalContratti) * 100).toFixed(1) : 0;
+
+    document.getElementById('kpiContratti').textContent = totalContratti.toLocaleString('it-IT');
+    document.getElementById('kpiValore').textContent = (kpis.valore / 1e6).toFixed(1) + 'M';
+    document.getElementById('kpiPA').textContent = kpis.pa.toLocaleString('it-IT');
+    document.getElementById('kpiMedia').textContent = Math.round(kpis.media / 1000).toLocaleString('it-IT') + 'K';
+    document.getElementById('kpiPNRR').textContent = kpis.pnrr;
+    document.getElementById('kpiPNRRLabel').textContent = `PNRR (${pnrrPct}%)`;
+    document.getElementById('kpiProvince').textContent = kpis.province;
+
+    // Update search count
+    const searchCount = document.getElementById('searchCount');
+    if (searchCount) searchCount.textContent = totalContratti.toLocaleString('it-IT');
+
+    // Update stats info
+    const statsInfo = document.getElementById('statsInfo');
+    if (statsInfo) statsInfo.textContent = `Record totali: ${totalContratti.toLocaleString('it-IT')} | Validati: ${totalContratti.toLocaleString('it-IT')} | Errori corretti: 1`;
+
+    // Update last update date
+    const lastUpdate = document.getElementById('lastUpdate');
+    if (lastUpdate) lastUpdate.textContent = new Date().toLocaleDateString('it-IT');
 }
 
-function initCharts() {
-    const stats = calculateStats();
+// Generate Top 30 PA table
+function initTop30Table(aggregates) {
+    document.getElementById('paTableBody').innerHTML = aggregates.top_pa.map((data, i) => {
+        const pa = data.denominazione;
+        return `<tr data-settore="${data.settore}" data-pa="${pa}"><td>${i + 1}</td><td><span class="pa-link" onclick="showPAContracts(this)">${pa.length > 50 ? pa.substring(0, 47) + '...' : pa}</span></td><td>${data.provincia}</td><td><span class="badge bg-secondary badge-settore">${data.settore}</span></td><td class="text-end fw-bold">${Math.round(data.total).toLocaleString('it-IT')}</td><td class="text-end">${data.count}</td><td class="text-end">${Math.round(data.total / data.count).toLocaleString('it-IT')}</td></tr>`;
+    }).join('');
+}
 
+function initCharts(aggregates) {
     // Top 10 PA
-    const top10PA = Object.entries(stats.byPA)
-        .sort((a, b) => b[1] - a[1])
-        .slice(0, 10);
+    const top10PA = aggregates.top_pa.slice(0, 10).map(p => [p.denominazione, p.total]);
 
-    new Chart(document.getElementById('chartTop10'), {
+    renderChart('chartTop10', {
         type: 'bar',
         data: {
             labels: top10PA.map(([name]) => name.length > 40 ? name.substring(0, 37) + '...' : name),
@@ -135,8 +281,8 @@ function initCharts() {
     });
 
     // Categorie AI
-    const catSorted = Object.entries(stats.byCategoria).sort((a, b) => b[1] - a[1]);
-    new Chart(document.getElementById('chartCategorie'), {
+    const catSorted = aggregates.categorie;
+    renderChart('chartCategorie', {
         type: 'doughnut',
         data: {
             labels: catSorted.map(([name]) => name),
@@ -153,8 +299,8 @@ function initCharts() {
     });
 
     // Settori PA
-    const setSorted = Object.entries(stats.bySettore).sort((a, b) => b[1] - a[1]);
-    new Chart(document.getElementById('chartSettori'), {
+    const setSorted = aggregates.settori;
+    renderChart('chartSettori', {
         type: 'bar',
         data: {
             labels: setSorted.map(([name]) => name),
@@ -169,11 +315,11 @@ function initCharts() {
     });
 
     // PNRR
-    new Chart(document.getElementById('chartPnrr'), {
+    renderChart('chartPnrr', {
         type: 'doughnut',
         data: {
             labels: ['PNRR', 'Non-PNRR'],
-            datasets: [{ data: [stats.pnrrValue, stats.nonPnrrValue], backgroundColor: ['#198754', '#6c757d'], borderWidth: 2 }]
+            datasets: [{ data: [aggregates.pnrr.value, aggregates.pnrr.non_pnrr_value], backgroundColor: ['#198754', '#6c757d'], borderWidth: 2 }]
         },
         options: {
             responsive: true,
@@ -184,13 +330,13 @@ function initCharts() {
 
     // Trend
     const years = ['2023', '2024', '2025'];
-    new Chart(document.getElementById('chartTrend'), {
+    renderChart('chartTrend', {
         type: 'line',
         data: {
             labels: years,
             datasets: [
-                { label: 'N. Contratti', data: years.map(y => stats.byYear[y]?.count || 0), borderColor: 'rgb(75, 192, 192)', backgroundColor: 'rgba(75, 192, 192, 0.2)', tension: 0.1, yAxisID: 'y', fill: true },
-                { label: 'Valore (€M)', data: years.map(y => (stats.byYear[y]?.value || 0) / 1000000), borderColor: 'rgb(255, 99, 132)', backgroundColor: 'rgba(255, 99, 132, 0.2)', tension: 0.1, yAxisID: 'y1', fill: true }
+                { label: 'N. Contratti', data: years.map(y => aggregates.by_year[y]?.count || 0), borderColor: 'rgb(75, 192, 192)', backgroundColor: 'rgba(75, 192, 192, 0.2)', tension: 0.1, yAxisID: 'y', fill: true },
+                { label: 'Valore (€M)', data: years.map(y => (aggregates.by_year[y]?.value || 0) / 1000000), borderColor: 'rgb(255, 99, 132)', backgroundColor: 'rgba(255, 99, 132, 0.2)', tension: 0.1, yAxisID: 'y1', fill: true }
             ]
         },
         options: {
@@ -206,6 +352,100 @@ function initCharts() {
     });
 }
 
+// Search: trigram index built by 02_build_contracts.py (data/search_index.json).
+// Candidates come from intersecting the postings of the query's trigrams and are
+// confirmed against the record's folded text; without a usable index every
+// record is scanned. The index is fetched on the first focus or input of the
+// search box, so visitors who never search do not download it; until it
+// arrives, searches scan the records.
+let searchIndex = null;
+let searchIndexRequest = null;
+const postingsCache = new Map();
+const searchTexts = [];
+
+// Lowercase and strip accents (same as fold_text in scripts/search_index.py)
+function foldText(text) {
+    return text.toLowerCase().normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+}
+
+function recordSearchText(i) {
+    if (searchTexts[i] === undefined) {
+        const c = window.contractsData[i];
+        searchTexts[i] = foldText(SEARCH_FIELDS.map(f => c[f]).join(' '));
+    }
+    return searchTexts[i];
+}
+
+// Start fetching the index (once); later calls return the same request
+function loadSearchIndex() {
+    if (!searchIndexRequest) searchIndexRequest = fetchSearchIndex().catch(() => null);
+    return searchIndexRequest;
+}
+
+async function fetchSearchIndex() {
+    const response = await fetch('data/search_index.json').catch(() => null);
+    if (!response || !response.ok) return;
+    const index = await response.json();
+    if (index.version === SEARCH_INDEX_VERSION) searchIndex = index;
+}
+
+// The index describes the loaded records only if it comes from the same build
+function searchIndexUsable() {
+    if (!searchIndex) return false;
+    if (window.contractsBuild) return searchIndex.contracts_sha256 === window.contractsBuild;
+    return searchIndex.records === window.contractsData.length;
+}
+
+// Sorted record ordinals containing a trigram (postings are delta-encoded)
+function trigramPostings(gram) {
+    if (!postingsCache.has(gram)) {
+        const deltas = searchIndex.trigrams[gram] || [];
+        const ordinals = new Int32Array(deltas.length);
+        let total = 0;
+        deltas.forEach((d, i) => { total += d; ordinals[i] = total; });
+        postingsCache.set(gram, ordinals);
+    }
+    return postingsCache.get(gram);
+}
+
+function indexCandidates(query) {
+    const grams = new Set();
+    for (let i = 0; i + 3 <= query.length; i++) grams.add(query.substring(i, i + 3));
+    const lists = [...grams].map(trigramPostings).sort((a, b) => a.length - b.length);
+    let candidates = lists[0];
+    for (let k = 1; k < lists.length && candidates.length > 0; k++) {
+        const other = lists[k];
+        const kept = [];
+        let j = 0;
+        for (const ordinal of candidates) {
+            while (j < other.length && other[j] < ordinal) j++;
+            if (j === other.length) break;
+            if (other[j] === ordinal) kept.push(ordinal);
+        }
+        candidates = kept;
+    }
+    return candidates;
+}
+
+// Contracts whose search fields contain query (accent-insensitive), in data order
+function searchContracts(query, limit = Infinity) {
+    const q = foldText(query);
+    const data = window.contractsData;
+    const matches = [];
+    if (q.length < 3) return matches;
+    if (searchIndexUsable()) {
+        for (const i of indexCandidates(q)) {
+            if (i >= data.length || matches.length >= limit) break;
+            if (recordSearchText(i).includes(q)) matches.push(data[i]);
+        }
+        return matches;
+    }
+    for (let i = 0; i < data.length && matches.length < limit; i++) {
+        if (recordSearchText(i).includes(q)) matches.push(data[i]);
+    }
+    return matches;
+}
+
 // Search functionality
 function initSearch() {
     const searchInput = document.getElementById('searchInput');
@@ -213,7 +453,9 @@ function initSearch() {
     const searchResults = document.getElementById('searchResults');
     let selectedIndex = -1;
 
+    searchInput.addEventListener('focus', loadSearchIndex, { once: true });
     searchInput.addEventListener('input', (e) => {
+        loadSearchIndex();
         const query = e.target.value.trim().toLowerCase();
         if (query.length < 3) {
             autocomplete.style.display = 'none';
@@ -221,13 +463,7 @@ function initSearch() {
             return;
         }
 
-        const matches = window.contractsData.filter(c => {
-            const searchText = [
-                c.cig, c.denominazione_amministrazione_appaltante, c.oggetto_lotto,
-                c.provincia, c.categoria_ai, c.settore_pa
-            ].join(' ').toLowerCase();
-            return searchText.includes(query);
-        }).slice(0, 10);
+        const matches = searchContracts(query, 10);
 
         if (matches.length > 0) {
             autocomplete.innerHTML = matches.map((c, i) => `
@@ -284,10 +520,7 @@ function showFullResults(query) {
     const searchResults = document.getElementById('searchResults');
     if (query.length < 3) return;
 
-    const matches = window.contractsData.filter(c => {
-        const searchText = [c.cig, c.denominazione_amministrazione_appaltante, c.oggetto_lotto, c.provincia, c.categoria_ai, c.settore_pa].join(' ').toLowerCase();
-        return searchText.includes(query);
-    });
+    const matches = searchContracts(query);
 
     if (matches.length === 0) {
         searchResults.innerHTML = '<div class="no-results"><i class="bi bi-search"></i><p>Nessun risultato per "' + query + '"</p></div>';
@@ -354,12 +587,17 @@ function initFilters() {
 }
 
 // Show PA contracts in modal
-function showPAContracts(element) {
+async function showPAContracts(element) {
     const paName = element.closest('tr').dataset.pa;
-    const contracts = window.contractsData.filter(c => c.denominazione_amministrazione_appaltante === paName);
+    const listed = window.contractsData.filter(c => c.denominazione_amministrazione_appaltante === paName);
+    const list = document.getElementById('paContractsList');
 
     document.getElementById('paModalLabel').textContent = paName;
-    document.getElementById('paContractsList').innerHTML = contracts.map(c => {
+    if (detailBuckets) list.innerHTML = '<div class="text-muted">Caricamento dettagli...</div>';
+    new bootstrap.Modal(document.getElementById('paModal')).show();
+
+    const contracts = await loadDetails(listed);
+    list.innerHTML = contracts.map(c => {
         const importoGara = parseFloat(c.importo_complessivo_gara) || 0;
         const importoLotto = parseFloat(c.importo_lotto) || 0;
         const nLotti = c.n_lotti_componenti || 1;
@@ -390,8 +628,6 @@ function showPAContracts(element) {
             </div>
         </div>`;
     }).join('');
-
-    new bootstrap.Modal(document.getElementById('paModal')).show();
 }
 
 // Make showPAContracts globally available
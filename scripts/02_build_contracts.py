@@ -10,21 +10,46 @@ Reads appalti_ia_YYYY_anac.csv files, applies:
   - PNRR identification
   - Quality checks and validation
 
+Loading, corrections and enrichment are cached per year in .build_cache/
+(see build_cache.py): only years whose CSV changed, or all of them if the
+rule tables changed, are reprocessed before the merge. When nothing changed
+and contracts.json is current, the build exits immediately.
+
 Usage:
     python scripts/02_build_contracts.py
     python scripts/02_build_contracts.py --years 2025
     python scripts/02_build_contracts.py --years 2023 2024 2025
+    python scripts/02_build_contracts.py --force      # ignore the cache
 """
 
+import argparse
 import csv
 import json
-import re
 import sys
-import os
+import shutil
+from itertools import islice
 from pathlib import Path
-from datetime import datetime
 from collections import Counter
 
+from aggregates import aggregates_are_current, compute_aggregates
+from build_cache import BuildCache, sha256_json
+from cig_index import CigIndex, RowReader, is_more_recent, iter_rows, last_modified, read_header
+from classify_chunks import ClassifierPool
+from classifier import MemoizedClassifier
+from columnar import columnar_is_current, to_columnar
+from contracts_db import db_is_current, write_contracts_db
+from json_writer import COMPRESSION_LEVELS, DEFAULT_COMPRESSION, write_json, write_json_array
+from listing import DEFAULT_DETAIL_BUCKETS, LISTING_FIELDS, listing_is_current, write_listing
+from outliers import AmountProfile
+from records import apply_corrections, classify_ai_category, clean_value, is_pnrr, parse_float
+from rules import (  # correction and rule tables, shared with analisi_appalti_ia.py
+    CATEGORIE_AI, CORRECTIONS, PNRR_PATTERNS, SECTOR_RULES, SETTORI_PA,
+)
+from run_report import RunReport
+from search_index import build_search_index, search_index_is_current
+from shards import shards_are_current, write_shard_groups, write_shards
+from streaming import BATCH_SIZE, DEFAULT_MEMORY_BUDGET_MB, RecordStore
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -32,160 +57,21 @@ from collections import Counter
 PROJECT_DIR = Path(__file__).resolve().parent.parent
 DEFAULT_YEARS = ["2023", "2024", "2025"]
 OUTPUT_FILE = PROJECT_DIR / "data" / "contracts.json"
-
-# Known data corrections
-CORRECTIONS = {
-    "B1B36B1A1E": {
-        "field": "importo_lotto",
-        "wrong_value": 293893058.00,
-        "correct_value": 357.85,
-        "reason": "Acquisto libri biblioteca (confronto CIG B1AA21EEA3, B1B748D667)"
-    }
-}
-
-# ============================================================================
-# AI CATEGORY PATTERNS
-# ============================================================================
-
-CATEGORIE_AI = {
-    "AI Generativa & LLM": [
-        r"ai generativa", r"llm", r"gpt", r"chatbot", r"chat bot",
-        r"assistente virtuale", r"conversazional", r"generative ai",
-        r"open\s*ai", r"copilot", r"digital human"
-    ],
-    "Machine Learning & Analytics": [
-        r"machine learning", r"ml(?:\s|$)", r"deep learning",
-        r"predittiv", r"analytics", r"analisi dati", r"data science",
-        r"big data", r"rete neural", r"neural network"
-    ],
-    "Computer Vision": [
-        r"visione artificiale", r"computer vision", r"riconoscimento immagini",
-        r"detection", r"rilevamento", r"video analytics", r"ocr",
-        r"image processing", r"elaborazione immagini"
-    ],
-    "NLP & Speech": [
-        r"nlp", r"natural language", r"elaborazione linguaggio",
-        r"speech", r"vocale", r"riconoscimento vocale", r"text mining",
-        r"sentiment analysis", r"text to speech"
-    ],
-    "RPA & Automazione": [
-        r"rpa", r"robotic process", r"automazione", r"workflow automation",
-        r"processo automatizzato", r"automazione processo"
-    ],
-    "Formazione IA": [
-        r"formazione.*(?:ia|ai|intelligenza artificiale)",
-        r"corso.*(?:ia|ai|intelligenza artificiale)",
-        r"training.*(?:ia|ai)", r"didattica.*(?:ia|ai)",
-        r"insegnamento.*(?:ia|ai)", r"master.*intelligenza",
-        r"seminari?.*(?:ia|ai|intelligenza)", r"mooc.*intelligenza",
-        r"laboratori?.*(?:ia|ai|intelligenza)", r"percors.*formativ"
-    ],
-    "Cybersecurity IA": [
-        r"cybersecurity.*(?:ia|ai)", r"sicurezza.*intelligenza artificiale",
-        r"threat detection", r"anomaly detection.*security",
-        r"cyber.*intelligenza", r"darktrace", r"monitoraggio.*anomalie"
-    ],
-    "Healthcare IA": [
-        r"diagnostica.*(?:ia|ai)", r"medical.*ai", r"radiologia.*(?:ia|ai)",
-        r"telemedicina.*(?:ia|ai)", r"clinical.*ai", r"pathology.*ai",
-        r"polipi", r"colonscopia", r"endoscopia.*(?:ia|ai)",
-        r"mammograf", r"ictus", r"stroke", r"neuroradiologia",
-        r"boneview", r"rapidai", r"zeeromed", r"ecocardiograf",
-        r"morfologic.*vetrini"
-    ],
-    "Biometria": [
-        r"biometric", r"facial recognition", r"riconoscimento facciale",
-        r"fingerprint", r"impronta digitale", r"iris recognition"
-    ],
-    "Document Intelligence": [
-        r"document.*intelligence", r"protocollazione.*(?:ia|ai)",
-        r"gestione documentale.*(?:ia|ai)", r"archiviazione.*(?:ia|ai)",
-        r"ocr.*(?:ia|ai)"
-    ],
-    "IoT & Edge AI": [
-        r"iot.*(?:ia|ai)", r"edge.*(?:ia|ai)", r"smart.*sensor",
-        r"sensori.*intelligenti", r"social robot"
-    ],
-    "Recommendation Systems": [
-        r"recommendation", r"raccomandazione", r"suggerimento automatico",
-        r"personalizzazione.*(?:ia|ai)"
-    ],
-    "AI Ethics & Governance": [
-        r"etica.*(?:ia|ai)", r"governance.*(?:ia|ai)", r"responsible.*ai",
-        r"trustworthy.*ai", r"ai act", r"trasparenza.*(?:ia|ai|intelligenza)"
-    ],
-    "Infrastruttura IA": [
-        r"gpu", r"cuda", r"tensorflow", r"pytorch", r"cloud.*(?:ia|ai)",
-        r"infrastructure.*ai", r"computing.*(?:ia|ai)", r"calcolo.*(?:ia|ai)",
-        r"server.*(?:gpu|hpc|ai)", r"workstation.*(?:ia|ai)",
-        r"nvidia", r"hpc4ai", r"multi-gpu"
-    ],
-    "Consulenza IA": [
-        r"consulenza.*(?:ia|ai|intelligenza)", r"advisory.*ai",
-        r"supporto.*intelligenza artificiale", r"assessment.*ai",
-        r"osservatorio.*intelligenza"
-    ]
-}
-
-# ============================================================================
-# PA SECTOR PATTERNS
-# ============================================================================
-
-SETTORI_PA = {
-    "Sanità": [
-        r"\basl\b", r"azienda sanitaria", r"ospedale", r"\birccs\b", r"agenas",
-        r"policlinico", r"\busl\b", r"\bausl\b", r"\basst\b", r"\bats\b",
-        r"\baou\b", r"\basp\b", r"ospedalier[ao]", r"azienda.*sanitar",
-        r"azienda.*colli", r"fondazione.*pascale", r"fondazione.*policlinico"
-    ],
-    "Università e Ricerca": [
-        r"universit[àa]", r"university", r"politecnico", r"\bcnr\b",
-        r"scuola superiore", r"istituto nazionale", r"\binfn\b", r"\benea\b",
-        r"istituto superiore", r"ricerca metrologica", r"crea", r"inrim"
-    ],
-    "PA Centrale": [
-        r"ministero", r"agenzia entrate", r"\binps\b", r"\binail\b", r"\baci\b",
-        r"agenzia nazionale", r"\bagid\b", r"sogei", r"consip", r"agenzia dogane",
-        r"presidenza.*consiglio", r"commissione.*borsa", r"consob",
-        r"agenzia spaziale", r"\bice\b.*agenzia", r"\benit\b"
-    ],
-    "PA Locale": [
-        r"\bcomune\b", r"\bprovincia\b", r"\bregione\b", r"citt[àa] metropolitana",
-        r"municipio", r"unione comuni", r"comunit[àa] montana",
-        r"camera.*commercio", r"c\.c\.i\.a"
-    ],
-    "Istruzione": [
-        r"istituto comprensivo", r"\bliceo\b", r"istituto tecnico",
-        r"istituto professionale", r"convitto", r"\bscuola\b",
-        r"direzione didattica", r"circolo didattico", r"\bits\b.*academy",
-        r"istituto.*istruzione.*superiore", r"i\.i\.s\."
-    ],
-    "Difesa e Sicurezza": [
-        r"\bdifesa\b", r"carabinieri", r"polizia", r"guardia.*finanza",
-        r"vigili.*fuoco", r"esercito", r"\bmarina\b", r"aeronautica",
-        r"corpo forestale", r"interno.*p\.?s\.?", r"comando.*rete"
-    ],
-    "Utilities & Trasporti": [
-        r"\brai\b", r"trenitalia", r"\brfi\b", r"\banas\b", r"\benav\b",
-        r"\bacea\b", r"\batac\b", r"\batm\b", r"\bamat\b", r"metropolitana",
-        r"ferrovie", r"\bamtab\b", r"\bhera\b", r"\bcap\b.*holding",
-        r"acquevenete", r"ve\.la\b"
-    ],
-    "Enti Pubblici Economici": [
-        r"cassa depositi", r"\bcdp\b", r"\beur\b.*spa", r"invitalia", r"\bsace\b",
-        r"banca.*italia", r"digital library"
-    ],
-    "Giustizia": [
-        r"tribunale", r"\bcorte\b", r"\bprocura\b", r"consiglio.*magistratura",
-        r"avvocatura", r"\btar\b", r"consiglio.*stato"
-    ]
-}
-
-PNRR_PATTERNS = [
-    r"\bpnrr\b", r"piano nazionale ripresa", r"next generation",
-    r"\bngeu\b", r"recovery fund", r"recovery plan", r"\brrf\b",
-    r"d\.?m\.?\s*66", r"m4c1"
-]
+SHARDS_DIR = PROJECT_DIR / "data" / "contracts"
+AGGREGATES_FILE = PROJECT_DIR / "data" / "aggregates.json"
+SEARCH_INDEX_FILE = PROJECT_DIR / "data" / "search_index.json"
+COLUMNAR_FILE = PROJECT_DIR / "data" / "contracts.columnar.json"
+LISTING_FILE = PROJECT_DIR / "data" / "contracts_listing.json"
+DETAILS_DIR = PROJECT_DIR / "data" / "details"
+DB_FILE = PROJECT_DIR / "data" / "contracts.sqlite"
+REPORT_FILE = PROJECT_DIR / "data" / "build_report.json"
+CACHE_DIR = PROJECT_DIR / ".build_cache"
+SECTOR_MEMO_FILE = CACHE_DIR / "sector_memo.json"
+PROFILE_FILE = CACHE_DIR / "enrichment.prof"
+DEFAULT_SECTOR_MEMO_SIZE = 50_000
+
+# One administration issues many CIGs: classify each distinct name once
+SECTOR_MEMO = MemoizedClassifier(SECTOR_RULES, maxsize=DEFAULT_SECTOR_MEMO_SIZE)
 
 # CSV field mapping (all fields from ANAC CIG dataset)
 CSV_FIELDS = [
@@ -216,98 +102,35 @@ CSV_FIELDS = [
 # CLASSIFICATION FUNCTIONS
 # ============================================================================
 
-def classify_ai_category(oggetto_lotto, oggetto_gara):
-    """Classify contract by AI category based on text content."""
-    text = f"{oggetto_lotto} {oggetto_gara}".lower()
-    for category, patterns in CATEGORIE_AI.items():
-        for pattern in patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return category
-    return "Altre applicazioni IA"
-
-
 def classify_pa_sector(denominazione):
-    """Classify PA by sector based on name."""
-    name = denominazione.lower()
-    for sector, patterns in SETTORI_PA.items():
-        for pattern in patterns:
-            if re.search(pattern, name, re.IGNORECASE):
-                return sector
-    return "Altri Enti Pubblici"
-
-
-def is_pnrr(row):
-    """Check if contract is PNRR-funded."""
-    flag = str(row.get("FLAG_PNRR_PNC", "")).strip()
-    if flag == "1":
-        return True
-    text = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}".lower()
-    for pattern in PNRR_PATTERNS:
-        if re.search(pattern, text, re.IGNORECASE):
-            return True
-    return False
+    """Classify PA by sector based on name (memoized by normalized name)."""
+    return SECTOR_MEMO.classify(denominazione)
 
 
 # ============================================================================
 # DATA LOADING AND CLEANING
 # ============================================================================
 
-def clean_value(value):
-    """Clean a CSV field value - normalize empty strings to None."""
-    if value is None:
-        return None
-    v = value.strip().strip('"')
-    if v == "" or v.lower() == "nan":
-        return None
-    return v
-
+def make_record(row, year):
+    """A record from a CSV row ({column: raw value}) of the given dataset year."""
+    record = {}
+    for field in CSV_FIELDS:
+        record[field] = clean_value(row.get(field))
+    record["anno_dataset"] = year
+    return record
 
-def parse_float(value):
-    """Parse a float value, returning None for invalid values."""
-    v = clean_value(value)
-    if v is None:
-        return None
-    try:
-        return float(v)
-    except (ValueError, TypeError):
-        return None
 
-
-def load_csv(filepath, year):
-    """Load a single ANAC CSV file and return list of dicts."""
-    records = []
+def iter_csv(filepath, year):
+    """Yield the records of a single ANAC CSV file one at a time."""
     with open(filepath, "r", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f, delimiter=";", quotechar='"')
         for row in reader:
-            record = {}
-            for field in CSV_FIELDS:
-                record[field] = clean_value(row.get(field))
-            record["anno_dataset"] = year
-            records.append(record)
-    return records
+            yield make_record(row, year)
 
 
-def apply_corrections(records):
-    """Apply known data corrections."""
-    corrections_applied = []
-    for record in records:
-        cig = record.get("cig")
-        if cig in CORRECTIONS:
-            correction = CORRECTIONS[cig]
-            field = correction["field"]
-            old_val = parse_float(record.get(field))
-            record[field] = str(correction["correct_value"])
-            if field == "importo_lotto":
-                record["importo_complessivo_gara"] = str(correction["correct_value"])
-            corrections_applied.append({
-                "cig": cig,
-                "field": field,
-                "old_value": old_val,
-                "new_value": correction["correct_value"],
-                "reason": correction["reason"]
-            })
-            print(f"  [CORRECTED] CIG {cig}: {field} {old_val} -> {correction['correct_value']}")
-    return corrections_applied
+def load_csv(filepath, year):
+    """Load a single ANAC CSV file and return list of dicts."""
+    return list(iter_csv(filepath, year))
 
 
 # ============================================================================
@@ -315,7 +138,12 @@ def apply_corrections(records):
 # ============================================================================
 
 def validate_records(records):
-    """Run quality checks on records."""
+    """Run quality checks on records (one pass, any iterable).
+
+    Amount outliers are counted against the robust threshold of
+    outliers.py (median + 3 MAD of the log amounts), sketched in the same
+    pass; issues["outlier_threshold"] is that threshold.
+    """
     issues = {
         "missing_cig": 0,
         "missing_oggetto": 0,
@@ -323,10 +151,13 @@ def validate_records(records):
         "missing_pa": 0,
         "zero_importo": 0,
         "negative_importo": 0,
-        "total": len(records)
+        "outlier_importo": 0,
+        "total": 0
     }
+    amounts = AmountProfile()
 
     for r in records:
+        issues["total"] += 1
         if not r.get("cig"):
             issues["missing_cig"] += 1
         if not r.get("oggetto_lotto") and not r.get("oggetto_gara"):
@@ -338,9 +169,13 @@ def validate_records(records):
             issues["zero_importo"] += 1
         elif importo < 0:
             issues["negative_importo"] += 1
+        amounts.add(importo)
         if not r.get("denominazione_amministrazione_appaltante"):
             issues["missing_pa"] += 1
 
+    overall = amounts.thresholds()["overall"]
+    issues["outlier_importo"] = overall["above"]
+    issues["outlier_threshold"] = overall["threshold"]
     return issues
 
 
@@ -348,7 +183,7 @@ def print_validation_report(issues):
     """Print validation summary."""
     print(f"\n  Validation Report ({issues['total']} records):")
     for key, count in issues.items():
-        if key == "total":
+        if key in ("total", "outlier_threshold"):
             continue
         if count > 0:
             pct = (count / issues["total"]) * 100
@@ -356,14 +191,27 @@ def print_validation_report(issues):
             print(f"    {status} {key}: {count} ({pct:.1f}%)")
         else:
             print(f"    [OK] {key}: 0")
+    if issues.get("outlier_threshold") is not None:
+        print(f"    (outlier_importo: above EUR {issues['outlier_threshold']:,.2f}, "
+              f"median + 3 MAD of the log amounts)")
 
 
 # ============================================================================
 # ENRICHMENT
 # ============================================================================
 
-def enrich_records(records):
-    """Add AI category, PA sector, PNRR flag to each record."""
+def enrich_records(records, pool=None):
+    """Add AI category, PA sector, PNRR flag to each record.
+
+    With a pool (classify_chunks.ClassifierPool) the records are classified
+    in chunks on its worker processes.
+    """
+    if pool is not None:
+        for r, (categoria, settore, pnrr) in zip(records, pool.classify(records)):
+            r["categoria_ai"] = categoria
+            r["settore_pa"] = settore
+            r["is_pnrr"] = pnrr
+        return
     for r in records:
         r["categoria_ai"] = classify_ai_category(
             r.get("oggetto_lotto", "") or "",
@@ -374,19 +222,27 @@ def enrich_records(records):
         )
         r["is_pnrr"] = is_pnrr(r)
 
-    # Print category distribution
-    cat_counts = Counter(r["categoria_ai"] for r in records)
+
+def print_enrichment_report(records):
+    """Print category, sector and PNRR distribution (one pass over records)."""
+    cat_counts = Counter()
+    sector_counts = Counter()
+    pnrr_count = total = 0
+    for r in records:
+        cat_counts[r["categoria_ai"]] += 1
+        sector_counts[r["settore_pa"]] += 1
+        pnrr_count += bool(r["is_pnrr"])
+        total += 1
+
     print(f"\n  AI Categories ({len(cat_counts)} categories):")
     for cat, count in cat_counts.most_common():
         print(f"    {cat}: {count}")
 
-    sector_counts = Counter(r["settore_pa"] for r in records)
     print(f"\n  PA Sectors ({len(sector_counts)} sectors):")
     for sec, count in sector_counts.most_common():
         print(f"    {sec}: {count}")
 
-    pnrr_count = sum(1 for r in records if r["is_pnrr"])
-    print(f"\n  PNRR contracts: {pnrr_count} ({pnrr_count/len(records)*100:.1f}%)")
+    print(f"\n  PNRR contracts: {pnrr_count} ({pnrr_count/total*100:.1f}%)")
 
 
 # ============================================================================
@@ -394,7 +250,12 @@ def enrich_records(records):
 # ============================================================================
 
 def deduplicate(records):
-    """Deduplicate by CIG, keeping the record from the most recent dataset year."""
+    """Deduplicate by CIG, keeping the most recent record.
+
+    Most recent: latest dataset year, then latest last-modified date; ties
+    keep the first seen (cig_index.is_more_recent, the rule of the CIG index
+    used by --stream and by the extractor).
+    """
     by_cig = {}
     duplicates = 0
     for r in records:
@@ -403,10 +264,7 @@ def deduplicate(records):
             continue
         if cig in by_cig:
             duplicates += 1
-            # Keep the one from the most recent dataset year
-            existing_year = by_cig[cig].get("anno_dataset", "0")
-            new_year = r.get("anno_dataset", "0")
-            if new_year > existing_year:
+            if is_more_recent(r, by_cig[cig]):
                 by_cig[cig] = r
         else:
             by_cig[cig] = r
@@ -421,74 +279,328 @@ def deduplicate(records):
 # MAIN
 # ============================================================================
 
-def main():
-    years = DEFAULT_YEARS
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--years":
-            years = sys.argv[2:]
-        else:
-            years = sys.argv[1:]
+def rules_hash():
+    """Hash of everything besides the CSVs that shapes the enriched records."""
+    return sha256_json(CSV_FIELDS, CORRECTIONS, CATEGORIE_AI, SETTORI_PA, PNRR_PATTERNS)
 
-    print("=" * 60)
-    print(" Build contracts.json from ANAC CSVs")
-    print("=" * 60)
 
-    # 1. Load CSVs
-    all_records = []
+def output_options_hash(args):
+    """Hash of the options that shape the written files, not the records."""
+    return sha256_json(args.pretty, compression(args), args.listing_fields, args.detail_buckets)
+
+
+def artifacts_are_current(args, contracts_sha256):
+    """True if every file the build would write besides contracts.json was
+    written for this contracts.json (a run with --no-* flags leaves the
+    skipped ones from an older build behind)."""
+    return aggregates_are_current(AGGREGATES_FILE, contracts_sha256) \
+        and search_index_is_current(SEARCH_INDEX_FILE, contracts_sha256) \
+        and (args.no_shards or shards_are_current(SHARDS_DIR, contracts_sha256)) \
+        and (args.no_columnar or columnar_is_current(COLUMNAR_FILE, contracts_sha256)) \
+        and (args.no_listing or listing_is_current(LISTING_FILE, DETAILS_DIR, contracts_sha256)) \
+        and (args.no_db or db_is_current(DB_FILE, contracts_sha256))
+
+
+def compression(args):
+    """The compress argument of the JSON writers: False or a preset name."""
+    return False if args.no_compress else args.compression
+
+
+def collect_inputs(years, cache, force=False):
+    """{year: (csv_path, fingerprint, changed)} for the years whose CSV exists."""
+    inputs = {}
     for year in years:
         csv_path = PROJECT_DIR / f"appalti_ia_{year}_anac.csv"
         if not csv_path.exists():
             print(f"\n[SKIP] {csv_path.name} not found")
             continue
-        print(f"\n[LOAD] {csv_path.name}")
-        records = load_csv(csv_path, year)
-        print(f"  Loaded {len(records)} records")
-        all_records.extend(records)
+        fingerprint, changed = cache.input_fingerprint(year, csv_path)
+        inputs[year] = (csv_path, fingerprint, changed or force)
+    return inputs
 
-    if not all_records:
-        print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
-        sys.exit(1)
 
+def process_year(csv_path, year, report=None, profile=False, pool=None):
+    """Load, correct and enrich one year's CSV (cacheable unit of work)."""
+    report = report or RunReport(csv_path.name, trace_memory=False)
+    with report.stage("load") as stage:
+        records = load_csv(csv_path, year)
+        stage["records_out"] = len(records)
+    with report.stage("corrections", len(records)):
+        corrections = apply_corrections(records)
+    with report.stage("enrichment", len(records)), \
+            report.profile("enrichment", PROFILE_FILE, enabled=profile):
+        enrich_records(records, pool)
+    return {"records": records, "corrections": corrections}
+
+
+def write_run_report(report, path):
+    """Print the per-stage table (and profile hotspots) and save the JSON report."""
+    print(f"\n[STEP] Run report ({path})...")
+    report.print_summary()
+    run = report.write(path)
+    for profile in run.get("profiles", []):
+        print(f"\n  Hotspots of {profile['stage']} (cProfile, {profile['file']}):")
+        for h in profile["hotspots"][:10]:
+            print(f"    {h['cumtime_s']:>8.3f} s cum {h['tottime_s']:>8.3f} s own "
+                  f"{h['ncalls']:>9}  {h['function']}")
+
+
+def build_streaming(args, inputs, report, pool=None):
+    """--stream: index every row by CIG on disk (cig_index.py), then read back
+    only the winning rows, correcting and enriching them in batches into an
+    on-disk store, and write the outputs from it in date order. Memory is
+    bounded by the two page caches (sharing --memory-budget) plus one batch,
+    not by the input size.
+
+    The per-year cache is not used, and the artifacts that need every record
+    in memory (columnar file, listing and details, search index) are not
+    written: stale copies are removed so the frontend falls back to the shards.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    corrections = []
+    batch_size = BATCH_SIZE * (pool.workers if pool else 1)
+    # The index only holds a few short fields per CIG: a quarter of the budget
+    index_budget = args.memory_budget / 4
+    with CigIndex(CACHE_DIR, index_budget) as index, \
+            RecordStore(CACHE_DIR, args.memory_budget - index_budget) as store:
+        # 2. Index every row: CIG -> most recent (year, last-modified, file, offset)
+        headers = {}
+        position = 0
+        for year, (csv_path, _, _) in inputs.items():
+            print(f"\n[INDEX] {csv_path.name}")
+            header = headers[str(csv_path)] = read_header(csv_path)
+            source = index.source(csv_path)
+            rows = iter_rows(csv_path)
+            loaded = 0
+            while True:
+                with report.stage("index") as stage:
+                    entries = []
+                    for offset, fields in islice(rows, batch_size):
+                        row = make_record(dict(zip(header, fields)), year)
+                        entries.append((row["cig"], year, last_modified(row), position,
+                                        source, offset))
+                        position += 1
+                    index.add(entries)
+                    stage["records_out"] = len(entries)
+                if not entries:
+                    break
+                loaded += len(entries)
+            print(f"  Loaded {loaded} records")
+
+        # Only the winning row of each CIG is read back, in first-seen order,
+        # corrected, enriched and put in the store
+        print(f"\n[STREAM] Reading back {len(index)} unique CIG")
+        winners = index.iter_winners()
+        with RowReader() as reader:
+            while True:
+                with report.stage("load") as stage:
+                    batch = [make_record(dict(zip(headers[path], reader.read_row(path, offset))), year)
+                             for _, year, path, offset in islice(winners, batch_size)]
+                    stage["records_out"] = len(batch)
+                if not batch:
+                    break
+                with report.stage("corrections", len(batch)):
+                    corrections.extend(apply_corrections(batch))
+                with report.stage("enrichment", len(batch)), \
+                        report.profile("enrichment", PROFILE_FILE, enabled=args.profile):
+                    enrich_records(batch, pool)
+                with report.stage("store", len(batch)):
+                    store.add(batch)
+
+        if not len(store):
+            print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
+            sys.exit(1)
+
+        print(f"\n{'='*60}")
+        print(f" Total loaded: {index.added + index.skipped} records from {len(inputs)} year(s)")
+        print(f"{'='*60}")
+
+        # 3. Deduplicate (done by the index while loading)
+        print("\n[STEP] Deduplication...")
+        if index.duplicates:
+            print(f"  [DEDUP] Removed {index.duplicates} duplicate CIG entries")
+        print(f"  Final unique records: {len(store)}")
+
+        # 4. Corrections
+        print("\n[STEP] Corrections...")
+        corrections = list({c["cig"]: c for c in corrections}.values())
+        for c in corrections:
+            print(f"  CIG {c['cig']}: {c['field']} {c['old_value']} -> {c['new_value']}")
+        if not corrections:
+            print("  No corrections needed")
+
+        # 5. Validate, tallying the summary on the same pass
+        print("\n[STEP] Validation...")
+        year_counts = Counter()
+        totals = {"value": 0.0}
+
+        def tallied(records):
+            for r in records:
+                year_counts[r.get("anno_dataset")] += 1
+                totals["value"] += parse_float(r.get("importo_lotto")) or 0
+                yield r
+
+        with report.stage("validation", len(store)):
+            issues = validate_records(tallied(store.iter_records()))
+        print_validation_report(issues)
+
+        # 6. Enrichment summary
+        print("\n[STEP] Enrichment (AI categories, PA sectors, PNRR)...")
+        print_enrichment_report(store.iter_records())
+
+        # 7-8. Write output, sorted by date (newest first) by the store
+        print(f"\n[STEP] Writing {OUTPUT_FILE} (streaming)...")
+        OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with report.stage("write_contracts", len(store)):
+            written = write_json_array(store.iter_sorted(), OUTPUT_FILE, pretty=args.pretty,
+                                       compress=compression(args))
+        print(f"  Written {written['records']} records ({written['bytes']/1024/1024:.1f} MB)")
+        if not args.no_shards:
+            with report.stage("write_shards", len(store)):
+                manifest = write_shard_groups(store.iter_shards(), SHARDS_DIR,
+                                              compress=compression(args),
+                                              contracts_sha256=written["sha256"])
+            print(f"  Written {len(manifest['shards'])} month shards to {SHARDS_DIR.name}/")
+        with report.stage("write_aggregates", len(store)):
+            aggregates = compute_aggregates(store.iter_sorted(),
+                                            contracts_sha256=written["sha256"],
+                                            years=list(inputs))
+            with open(AGGREGATES_FILE, "w", encoding="utf-8") as f:
+                json.dump(aggregates, f, indent=2, ensure_ascii=False)
+        print(f"  Written {AGGREGATES_FILE.name}")
+        if not args.no_db:
+            write_db(store.iter_sorted(), report, written["sha256"], list(inputs),
+                     count=len(store))
+
+    for path in (COLUMNAR_FILE, LISTING_FILE, SEARCH_INDEX_FILE):
+        for stale in (path, path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")):
+            if stale.exists():
+                stale.unlink()
+                print(f"  [STREAM] Removed stale {stale.name} (not written in streaming mode)")
+    if DETAILS_DIR.exists():
+        shutil.rmtree(DETAILS_DIR)
+        print(f"  [STREAM] Removed stale {DETAILS_DIR.name}/ (not written in streaming mode)")
+
+    # 9. Summary
     print(f"\n{'='*60}")
-    print(f" Total loaded: {len(all_records)} records from {len(years)} year(s)")
+    print(f" Summary")
     print(f"{'='*60}")
+    print(f"  Total contracts: {written['records']}")
+    print(f"  Total value: EUR {totals['value']:,.2f}")
+    print(f"  By year:")
+    for year in sorted(year_counts.keys()):
+        print(f"    {year}: {year_counts[year]} contracts")
+    if corrections:
+        print(f"  Corrections applied: {len(corrections)}")
+    print(f"\n  Output: {OUTPUT_FILE}")
+
+
+def write_db(records, report, contracts_sha256, years, count=None):
+    """Publish the records (contracts.json order) as the SQLite database."""
+    with report.stage("write_db", count if count is not None else len(records)):
+        db = write_contracts_db(records, DB_FILE, contracts_sha256=contracts_sha256, years=years)
+    print(f"  Written {DB_FILE.name} ({db['bytes']/1024/1024:.1f} MB, "
+          f"query with scripts/contracts_db.py)")
 
-    # 2. Deduplicate
+
+def build_outputs(all_records, corrections, inputs, args, report, cache):
+    """Steps 3-9: dedup, validation, sort and every data/ artifact.
+
+    all_records are the corrected and enriched records of all the years in
+    inputs ({year: (csv_path, fingerprint, changed)}). Returns the final
+    records, newest first.
+    """
+    # 3. Deduplicate
     print("\n[STEP] Deduplication...")
-    records = deduplicate(all_records)
+    with report.stage("dedup", len(all_records)) as stage:
+        records = deduplicate(all_records)
+        stage["records_out"] = len(records)
     print(f"  Final unique records: {len(records)}")
 
-    # 3. Apply corrections
-    print("\n[STEP] Applying corrections...")
-    corrections = apply_corrections(records)
+    # 4. Corrections (applied per year while loading)
+    print("\n[STEP] Corrections...")
+    corrections = list({c["cig"]: c for c in corrections}.values())
+    for c in corrections:
+        print(f"  CIG {c['cig']}: {c['field']} {c['old_value']} -> {c['new_value']}")
     if not corrections:
         print("  No corrections needed")
 
-    # 4. Validate
+    # 5. Validate
     print("\n[STEP] Validation...")
-    issues = validate_records(records)
+    with report.stage("validation", len(records)):
+        issues = validate_records(records)
     print_validation_report(issues)
 
-    # 5. Enrich
+    # 6. Enrichment summary
     print("\n[STEP] Enrichment (AI categories, PA sectors, PNRR)...")
-    enrich_records(records)
+    print_enrichment_report(records)
 
-    # 6. Sort by date (newest first)
-    records.sort(
-        key=lambda r: r.get("data_pubblicazione") or "0000-00-00",
-        reverse=True
-    )
+    # 7. Sort by date (newest first)
+    with report.stage("sort", len(records)):
+        records.sort(
+            key=lambda r: r.get("data_pubblicazione") or "0000-00-00",
+            reverse=True
+        )
 
-    # 7. Write output
+    # 8. Write output
     print(f"\n[STEP] Writing {OUTPUT_FILE}...")
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(records, f, indent=2, ensure_ascii=False, default=str)
-
-    file_size = OUTPUT_FILE.stat().st_size
-    print(f"  Written {len(records)} records ({file_size/1024/1024:.1f} MB)")
-
-    # 8. Summary
+    with report.stage("write_contracts", len(records)):
+        written = write_json_array(records, OUTPUT_FILE, pretty=args.pretty,
+                                   compress=compression(args))
+    print(f"  Written {written['records']} records ({written['bytes']/1024/1024:.1f} MB)")
+    for ext in ("gz", "br"):
+        if f"{ext}_bytes" in written:
+            print(f"    {OUTPUT_FILE.name}.{ext}: {written[f'{ext}_bytes']/1024:.0f} KB")
+    if not args.no_compress and "br_bytes" not in written:
+        print("    (brotli module not installed: .br sibling skipped)")
+
+    if not args.no_shards:
+        with report.stage("write_shards", len(records)):
+            manifest = write_shards(records, SHARDS_DIR, compress=compression(args),
+                                    contracts_sha256=written["sha256"])
+        shard_bytes = sum(sh["bytes"] for sh in manifest["shards"])
+        print(f"  Written {len(manifest['shards'])} month shards to {SHARDS_DIR.name}/ "
+              f"({shard_bytes/1024/1024:.1f} MB, manifest.json)")
+    if not args.no_columnar:
+        with report.stage("write_columnar", len(records)):
+            columnar = write_json(to_columnar(records, contracts_sha256=written["sha256"]),
+                                  COLUMNAR_FILE, compress=compression(args))
+        print(f"  Written {COLUMNAR_FILE.name} ({columnar['bytes']/1024/1024:.1f} MB"
+              + "".join(f", .{ext} {columnar[f'{ext}_bytes']/1024:.0f} KB"
+                        for ext in ("gz", "br") if f"{ext}_bytes" in columnar) + ")")
+    if not args.no_listing:
+        with report.stage("write_listing", len(records)):
+            listing = write_listing(records, LISTING_FILE, DETAILS_DIR,
+                                    fields=args.listing_fields, buckets=args.detail_buckets,
+                                    compress=compression(args),
+                                    contracts_sha256=written["sha256"])
+        print(f"  Written {LISTING_FILE.name} ({listing['listing_bytes']/1024:.0f} KB) and "
+              f"{listing['detail_files']} detail buckets in {DETAILS_DIR.name}/ "
+              f"({listing['detail_bytes']/1024/1024:.1f} MB)")
+
+    with report.stage("write_aggregates", len(records)):
+        aggregates = compute_aggregates(records, contracts_sha256=written["sha256"],
+                                        years=list(inputs))
+        with open(AGGREGATES_FILE, "w", encoding="utf-8") as f:
+            json.dump(aggregates, f, indent=2, ensure_ascii=False)
+    print(f"  Written {AGGREGATES_FILE.name} (top {len(aggregates['top_pa'])} PA, "
+          f"{len(aggregates['categorie'])} categories, {len(aggregates['settori'])} sectors)")
+
+    with report.stage("write_search_index", len(records)):
+        index = build_search_index(records, contracts_sha256=written["sha256"])
+        search = write_json(index, SEARCH_INDEX_FILE, compress=compression(args))
+    print(f"  Written {SEARCH_INDEX_FILE.name} ({len(index['trigrams'])} trigrams, "
+          f"{search['bytes']/1024:.0f} KB"
+          + "".join(f", .{ext} {search[f'{ext}_bytes']/1024:.0f} KB"
+                    for ext in ("gz", "br") if f"{ext}_bytes" in search) + ")")
+    if not args.no_db:
+        write_db(records, report, written["sha256"], list(inputs))
+    cache.record_output(list(inputs), OUTPUT_FILE, output_options_hash(args),
+                        sha256=written["sha256"])
+    cache.save()
+
+    # 9. Summary
     year_counts = Counter(r.get("anno_dataset") for r in records)
     total_value = sum(parse_float(r.get("importo_lotto")) or 0 for r in records)
 
@@ -502,7 +614,161 @@ def main():
         print(f"    {year}: {year_counts[year]} contracts")
     if corrections:
         print(f"  Corrections applied: {len(corrections)}")
+    print(f"  Years reprocessed: {sum(1 for _, _, c in inputs.values() if c)}/{len(inputs)}")
+    # With --workers the counts are those of the worker memos, added up
+    memo = SECTOR_MEMO.stats()
+    entries = (f"{memo['size']}/{memo['maxsize']} entries" if args.workers <= 1
+               else f"{args.workers} worker memos of {memo['maxsize']} entries")
+    print(f"  Sector memo: {memo['hits']} hits, {memo['misses']} misses, "
+          f"{memo['evictions']} evictions ({memo['hit_rate']*100:.1f}% hit rate, {entries})")
     print(f"\n  Output: {OUTPUT_FILE}")
+
+    return records
+
+
+def build_parser():
+    """The build's command line (build_all.py extends it)."""
+    parser = argparse.ArgumentParser(description="Build data/contracts.json from ANAC CSVs")
+    parser.add_argument("years", nargs="*", help="dataset years (default: 2023 2024 2025)")
+    parser.add_argument("--years", dest="years_opt", nargs="+", metavar="YEAR",
+                        help="dataset years (same as the positional form)")
+    parser.add_argument("--force", action="store_true",
+                        help="reprocess every year and rewrite the output, ignoring the cache")
+    parser.add_argument("--pretty", action="store_true",
+                        help="indented contracts.json (default: compact, one record per line)")
+    parser.add_argument("--no-compress", action="store_true",
+                        help="do not write the .gz/.br precompressed siblings")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_LEVELS),
+                        default=DEFAULT_COMPRESSION,
+                        help="level of the .gz/.br siblings: fast (gzip 6, brotli 5, default) "
+                             "or max (gzip 9, brotli 11, for release builds)")
+    parser.add_argument("--no-shards", action="store_true",
+                        help="do not write the per-month shards in data/contracts/")
+    parser.add_argument("--no-columnar", action="store_true",
+                        help=f"do not write the columnar {COLUMNAR_FILE.name}")
+    parser.add_argument("--no-listing", action="store_true",
+                        help=f"do not write {LISTING_FILE.name} and the detail buckets")
+    parser.add_argument("--no-db", action="store_true",
+                        help=f"do not write the SQLite database {DB_FILE.name}")
+    parser.add_argument("--listing-fields", nargs="+", metavar="FIELD", default=LISTING_FIELDS,
+                        help="fields kept in the slim listing (cig is always included)")
+    parser.add_argument("--detail-buckets", type=int, default=DEFAULT_DETAIL_BUCKETS,
+                        help="number of data/details/ files the full records are hashed into")
+    parser.add_argument("--sector-memo-size", type=int, default=DEFAULT_SECTOR_MEMO_SIZE,
+                        help="max distinct PA names kept in the sector memo (0 disables it)")
+    parser.add_argument("--no-persist-memo", action="store_true",
+                        help=f"do not load/save the sector memo ({SECTOR_MEMO_FILE.name})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes classifying records in the enrichment step "
+                             "(default 1: in this process; see classify_chunks.py)")
+    parser.add_argument("--stream", action="store_true",
+                        help="streaming mode: bounded memory, records deduplicated and sorted "
+                             "in an on-disk store (no columnar/listing/search index)")
+    parser.add_argument("--memory-budget", type=float, default=DEFAULT_MEMORY_BUDGET_MB,
+                        metavar="MB", help="page cache of the --stream store "
+                                           f"(default {DEFAULT_MEMORY_BUDGET_MB} MB)")
+    parser.add_argument("--report", type=Path, default=REPORT_FILE,
+                        help="where to write the JSON run report (per-stage time and memory)")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="do not trace allocations (faster; no per-stage peak memory)")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"profile the enrichment stage with cProfile ({PROFILE_FILE.name}, "
+                             "hotspots in the run report); combine with --force")
+    return parser
+
+
+def parse_args(argv=None):
+    args = build_parser().parse_args(argv)
+    args.years = args.years_opt or args.years or DEFAULT_YEARS
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    years = args.years
+    report = RunReport(Path(__file__).name, trace_memory=not args.no_trace_memory)
+
+    print("=" * 60)
+    print(" Build contracts.json from ANAC CSVs")
+    print("=" * 60)
+
+    # 1. Check inputs against the build manifest
+    with report.stage("inputs"):
+        cache = BuildCache(CACHE_DIR, rules_hash())
+        inputs = collect_inputs(years, cache, args.force)
+
+    if not inputs:
+        print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
+        sys.exit(1)
+
+    if not args.force and not any(changed for _, _, changed in inputs.values()) \
+            and cache.output_is_current(list(inputs), OUTPUT_FILE, output_options_hash(args)) \
+            and artifacts_are_current(args, cache.output_sha256):
+        cache.save()
+        report.write(args.report)
+        print(f"\n[UP TO DATE] Inputs, rules and output options unchanged, "
+              f"{OUTPUT_FILE.name} is current")
+        return
+
+    if cache.rules_changed:
+        print("\n[CACHE] Rule tables changed: reprocessing every year")
+
+    SECTOR_MEMO.maxsize = args.sector_memo_size
+    persist_memo = not args.no_persist_memo and args.sector_memo_size > 0
+    if persist_memo:
+        SECTOR_MEMO.load(SECTOR_MEMO_FILE, cache.rules_hash)
+
+    # Enrichment on worker processes, only if something is to be enriched
+    pool = None
+    if args.workers > 1 and (args.stream or any(c for _, _, c in inputs.values())):
+        pool = ClassifierPool(args.workers, memo=SECTOR_MEMO)
+
+    if args.stream:
+        try:
+            build_streaming(args, inputs, report, pool)
+        finally:
+            if pool is not None:
+                pool.close()
+        if persist_memo:
+            SECTOR_MEMO.save(SECTOR_MEMO_FILE, cache.rules_hash)
+        write_run_report(report, args.report)
+        print(f"{'='*60}")
+        return
+
+    # 2. Load, correct and enrich each year (or reuse the cached result)
+    all_records = []
+    corrections = []
+    for year, (csv_path, fingerprint, changed) in inputs.items():
+        if changed:
+            print(f"\n[LOAD] {csv_path.name}")
+            result = process_year(csv_path, year, report, profile=args.profile, pool=pool)
+            with report.stage("cache_store", len(result["records"])):
+                cache.store_year(year, fingerprint, result)
+        else:
+            print(f"\n[CACHED] {csv_path.name}")
+            with report.stage("cache_load") as stage:
+                result = cache.load_year(year)
+                stage["records_out"] = len(result["records"])
+        print(f"  Loaded {len(result['records'])} records")
+        all_records.extend(result["records"])
+        corrections.extend(result["corrections"])
+    if pool is not None:
+        pool.close()
+
+    if not all_records:
+        print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
+        sys.exit(1)
+
+    print(f"\n{'='*60}")
+    print(f" Total loaded: {len(all_records)} records from {len(years)} year(s)")
+    print(f"{'='*60}")
+
+    build_outputs(all_records, corrections, inputs, args, report, cache)
+    if persist_memo:
+        SECTOR_MEMO.save(SECTOR_MEMO_FILE, cache.rules_hash)
+
+    # 10. Run report
+    write_run_report(report, args.report)
     print(f"{'='*60}")
 
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+aggregates.py - Dashboard aggregates computed once at build time
+
+Produces data/aggregates.json, with exactly the numbers js/app.js would
+otherwise compute by scanning every contract on page load (same amount
+field, same grouping keys, same tie order):
+
+    {
+      "version": 1,
+      "build": {"contracts_sha256": "...", "records": 1302,
+                "years": ["2023", "2024", "2025"], "generated_at": "..."},
+      "kpis": {"contratti", "valore", "pa", "province", "pnrr", "media"},
+      "top_pa": [{"denominazione", "total", "count", "provincia", "settore"}],
+      "categorie": [[name, value], ...],        # sorted by value, desc
+      "settori": [[name, value], ...],          # sorted by value, desc
+      "by_year": {"2025": {"count": 737, "value": 123.4}, ...},
+      "pnrr": {"value": ..., "non_pnrr_value": ...}
+    }
+
+build.contracts_sha256 is the hash of the contracts.json written by the same
+build, so the frontend can tell the two files belong together.
+"""
+
+import json
+from datetime import datetime
+
+AGGREGATES_VERSION = 1
+TOP_PA = 30
+
+
+def _importo(record):
+    """parseFloat(c.importo_complessivo_gara) || 0, as in app.js."""
+    try:
+        value = float(record.get("importo_complessivo_gara") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+    return value if value == value else 0.0
+
+
+def _sorted_desc(totals):
+    # sorted() is stable like Array.prototype.sort: ties keep first-seen order
+    return [[k, v] for k, v in sorted(totals.items(), key=lambda kv: -kv[1])]
+
+
+def compute_aggregates(records, contracts_sha256=None, years=None, top_n=TOP_PA):
+    """Aggregate the records in the order they are written to contracts.json.
+
+    records can be any iterable: it is consumed once.
+    """
+    by_pa = {}
+    by_categoria = {}
+    by_settore = {}
+    by_year = {}
+    pa_set = set()
+    prov_set = set()
+    total_value = 0.0
+    pnrr_count = 0
+    pnrr_value = non_pnrr_value = 0.0
+    n = 0
+
+    for r in records:
+        n += 1
+        importo = _importo(r)
+        pa = r.get("denominazione_amministrazione_appaltante") or "N/D"
+        cat = r.get("categoria_ai") or "Altre applicazioni IA"
+        sett = r.get("settore_pa") or "Altri Enti Pubblici"
+        year = r.get("anno_pubblicazione") or "2025"
+
+        entry = by_pa.get(pa)
+        if entry is None:
+            entry = by_pa[pa] = {
+                "denominazione": pa, "total": 0.0, "count": 0,
+                "provincia": r.get("provincia") or "N/D",
+                "settore": r.get("settore_pa") or "Altri Enti Pubblici",
+            }
+        entry["total"] += importo
+        entry["count"] += 1
+
+        by_categoria[cat] = by_categoria.get(cat, 0.0) + importo
+        by_settore[sett] = by_settore.get(sett, 0.0) + importo
+        y = by_year.setdefault(year, {"count": 0, "value": 0.0})
+        y["count"] += 1
+        y["value"] += importo
+
+        total_value += importo
+        if r.get("cf_amministrazione_appaltante"):
+            pa_set.add(r["cf_amministrazione_appaltante"])
+        if r.get("provincia") and r["provincia"] != "N/D":
+            prov_set.add(r["provincia"])
+        if r.get("is_pnrr"):
+            pnrr_count += 1
+            pnrr_value += importo
+        else:
+            non_pnrr_value += importo
+
+    top_pa = sorted(by_pa.values(), key=lambda e: -e["total"])[:top_n]
+
+    return {
+        "version": AGGREGATES_VERSION,
+        "build": {
+            "contracts_sha256": contracts_sha256,
+            "records": n,
+            "years": list(years or []),
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "kpis": {
+            "contratti": n,
+            "valore": total_value,
+            "pa": len(pa_set),
+            "province": len(prov_set),
+            "pnrr": pnrr_count,
+            "media": total_value / n if n else 0,
+        },
+        "top_pa": top_pa,
+        "categorie": _sorted_desc(by_categoria),
+        "settori": _sorted_desc(by_settore),
+        "by_year": by_year,
+        "pnrr": {"value": pnrr_value, "non_pnrr_value": non_pnrr_value},
+    }
+
+
+def aggregates_are_current(path, contracts_sha256):
+    """True if path holds aggregates of this version for this contracts.json."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            aggregates = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return aggregates.get("version") == AGGREGATES_VERSION and bool(contracts_sha256) \
+        and aggregates.get("build", {}).get("contracts_sha256") == contracts_sha256
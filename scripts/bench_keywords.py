@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+bench_keywords.py - Benchmark the AI keyword filter on a synthetic month
+
+Generates a synthetic ANAC-like monthly CSV (a few million rows by default,
+~0.5% of them mentioning an AI keyword) and times, over the same file:
+  - grep -i -E "<alternation>"        the old shell filter
+  - re alternation, IGNORECASE       the same pattern in Python
+  - KeywordMatcher.search            the trie-compiled regex matcher
+
+Each matcher is run with the configured keywords and again with extra
+synthetic keywords, to show how the scan cost grows with the keyword list.
+
+Usage:
+    python scripts/bench_keywords.py
+    python scripts/bench_keywords.py --rows 500000 --extra-keywords 100
+    python scripts/bench_keywords.py --keep /tmp/synthetic_month.csv
+"""
+
+import argparse
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from keyword_matcher import DEFAULT_KEYWORDS_FILE, KeywordMatcher, load_keywords
+
+WORDS = [
+    "fornitura", "servizio", "servizi", "manutenzione", "software", "licenze",
+    "sistema", "gestione", "piattaforma", "acquisto", "affidamento", "lavori",
+    "progettazione", "supporto", "tecnico", "informatico", "dati", "rete",
+    "materiale", "consumo", "sanitario", "scolastico", "comunale", "digitale",
+    "noleggio", "apparecchiature", "laboratorio", "pulizia", "energia", "analisi",
+]
+PA_NAMES = [
+    "COMUNE DI ROMA", "ASL NAPOLI 1 CENTRO", "UNIVERSITA' DEGLI STUDI DI MILANO",
+    "REGIONE LOMBARDIA", "AZIENDA OSPEDALIERA DI PADOVA", "CONSIP SPA",
+    "ISTITUTO COMPRENSIVO STATALE G. VERDI", "MINISTERO DELL'INTERNO",
+]
+
+
+def synthetic_line(rng, keywords, hit_rate):
+    words = rng.choices(WORDS, k=rng.randint(4, 14))
+    if rng.random() < hit_rate:
+        kw = rng.choice(keywords)
+        kw = kw.upper() if rng.random() < 0.5 else kw.title()
+        words.insert(rng.randrange(len(words) + 1), kw)
+    oggetto = " ".join(words).upper()
+    fields = [
+        f'"{rng.randrange(16**10):010X}"', "", f'"{rng.randrange(10**7)}"',
+        f'"{oggetto}"', f'"{rng.uniform(100, 5e6):.2f}"', '"1"', f'"{oggetto}"',
+        f'"{rng.uniform(100, 5e6):.2f}"', '"SERVIZI"', '"ATTIVO"',
+        '"SETTORI ORDINARI"', "", '"RM"', '"2025-01-13"', '"2025-02-13"',
+        '"27"', '"PROCEDURA APERTA"', "", "", f'"{rng.randrange(10**10):010d}"',
+        f'"{rng.randrange(10**11):011d}"', f'"{rng.choice(PA_NAMES)}"',
+    ] + ['""'] * 39
+    return ";".join(fields) + "\n"
+
+
+def generate(path, rows, keywords, hit_rate, seed):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('"cig";"cig_accordo_quadro";"numero_gara";"oggetto_gara"\n')
+        for _ in range(rows):
+            f.write(synthetic_line(rng, keywords, hit_rate))
+
+
+def time_python(path, search):
+    start = time.perf_counter()
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        next(f)
+        for line in f:
+            if search(line):
+                count += 1
+    return time.perf_counter() - start, count
+
+
+def time_grep(path, keywords):
+    pattern = "|".join(re.escape(k) for k in keywords)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        ["bash", "-c", 'tail -n +2 "$1" | grep -i -E -c "$2"', "_", str(path), pattern],
+        capture_output=True, text=True)
+    return time.perf_counter() - start, int(proc.stdout.strip() or 0)
+
+
+def extra_keywords(n, seed):
+    rng = random.Random(seed)
+    letters = "abcdefghilmnoprstuvz"
+    return [
+        " ".join("".join(rng.choices(letters, k=rng.randint(4, 10))) for _ in range(2))
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AI keyword filter")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--hit-rate", type=float, default=0.005)
+    parser.add_argument("--extra-keywords", type=int, default=50,
+                        help="synthetic keywords added for the scaling run")
+    parser.add_argument("--keywords", type=Path, default=DEFAULT_KEYWORDS_FILE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", type=Path, help="write the synthetic month here and keep it")
+    args = parser.parse_args()
+
+    keywords = load_keywords(args.keywords)
+    tmp_dir = None
+    if args.keep:
+        path = args.keep
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="bench_keywords_")
+        path = Path(tmp_dir) / "synthetic_month.csv"
+
+    try:
+        print(f"[GEN] {args.rows:,} rows -> {path}")
+        start = time.perf_counter()
+        generate(path, args.rows, keywords, args.hit_rate, args.seed)
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(f"  {size_mb:.0f} MB in {time.perf_counter() - start:.1f}s\n")
+
+        runs = [("configured", keywords),
+                (f"+{args.extra_keywords} extra", keywords + extra_keywords(args.extra_keywords, args.seed))]
+        print(f"{'keywords':<16} {'matcher':<24} {'seconds':>8} {'MB/s':>8} {'matches':>9}")
+        for label, kws in runs:
+            alternation = re.compile("|".join(re.escape(k) for k in kws), re.IGNORECASE)
+            matcher = KeywordMatcher(kws)
+            results = []
+            if shutil.which("grep"):
+                results.append(("grep -i -E", *time_grep(path, kws)))
+            results.append(("re alternation (re.I)", *time_python(path, alternation.search)))
+            results.append(("KeywordMatcher", *time_python(path, matcher.search)))
+            for name, seconds, count in results:
+                print(f"{f'{label} ({len(kws)})':<16} {name:<24} {seconds:>8.2f} "
+                      f"{size_mb / seconds:>8.1f} {count:>9,}")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
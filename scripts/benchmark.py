@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - Time both pipelines stage by stage on synthetic ANAC data
+
+For every size (10k, 100k, 1M, 10M rows...) generates the yearly CSVs with
+synth_anac.py, then runs each pipeline in its own subprocess, calling its
+stage functions one after the other and timing them:
+
+  build    02_build_contracts.py: load, corrections, enrichment, dedup,
+           validation, sort, write (contracts.json), artifacts (shards,
+           columnar, listing, aggregates, search index)
+  analisi  analisi_appalti_ia.py: load, clean, enrichment, validation,
+           corrections, statistics (aggrega + views), write (dashboard,
+           JSON, corrected CSV, validation report)
+
+Per stage it reports the wall time, the rows per second and the peak RSS
+of the subprocess so far (ru_maxrss), so every pipeline starts from a fresh
+interpreter. Outputs go to a scratch directory: data/, .build_cache/ and
+.cache_analisi/ of the project are left untouched. Everything runs offline.
+
+Usage:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --sizes 10k 100k 1M --pipelines build
+    python scripts/benchmark.py --sizes 1M --work-dir /tmp/bench --keep --json bench.json
+    python scripts/benchmark.py --python ~/.pyenv/versions/3.12.1/bin/python
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from run_report import peak_rss_mb
+from synth_anac import DEFAULT_YEARS, generate, parse_count
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PIPELINES = ["build", "analisi"]
+DEFAULT_SIZES = ["10k", "100k"]
+
+
+def load_module(name, path):
+    """Import a script by path (02_build_contracts is not a valid module name)."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StageTimer:
+    """Collects wall time, rows and peak RSS of consecutive stages."""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=0):
+        """Time the block; rows can be set on the yielded entry once known."""
+        entry = {"stage": name, "rows": rows}
+        start = time.perf_counter()
+        # Stage functions print progress: keep the child's stdout clean
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield entry
+        entry["seconds"] = time.perf_counter() - start
+        entry["peak_rss_mb"] = peak_rss_mb()
+        self.stages.append(entry)
+
+
+# ============================================================================
+# PIPELINES (run in the child process)
+# ============================================================================
+
+def run_build(input_dir, output_dir, years):
+    build = load_module("build_contracts", Path(__file__).resolve().parent / "02_build_contracts.py")
+    timer = StageTimer()
+    paths = [(year, input_dir / f"appalti_ia_{year}_anac.csv") for year in years]
+
+    with timer.stage("load") as stage:
+        records = []
+        for year, path in paths:
+            records.extend(build.load_csv(path, year))
+        rows = stage["rows"] = len(records)
+    with timer.stage("corrections", rows):
+        build.apply_corrections(records)
+    with timer.stage("enrichment", rows):
+        build.enrich_records(records)
+    with timer.stage("dedup", rows):
+        records = build.deduplicate(records)
+    with timer.stage("validation", len(records)):
+        build.validate_records(records)
+    with timer.stage("sort", len(records)):
+        records.sort(key=lambda r: r.get("data_pubblicazione") or "0000-00-00", reverse=True)
+    with timer.stage("write", len(records)):
+        written = build.write_json_array(records, output_dir / "contracts.json")
+    with timer.stage("artifacts", len(records)):
+        sha = written["sha256"]
+        build.write_shards(records, output_dir / "contracts", contracts_sha256=sha)
+        build.write_json(build.to_columnar(records, contracts_sha256=sha),
+                         output_dir / "contracts.columnar.json")
+        build.write_listing(records, output_dir / "contracts_listing.json",
+                            output_dir / "details", contracts_sha256=sha)
+        build.compute_aggregates(records, contracts_sha256=sha, years=years)
+        build.write_json(build.build_search_index(records, contracts_sha256=sha),
+                         output_dir / "search_index.json")
+    return {"rows_in": rows, "rows_out": len(records), "stages": timer.stages}
+
+
+def run_analisi(input_dir, output_dir, years):
+    analisi = load_module("analisi_appalti_ia", PROJECT_DIR / "analisi_appalti_ia.py")
+    timer = StageTimer()
+    # carica_csv takes the year from the file name: read the files by bare name
+    os.chdir(input_dir)
+    files = [f"appalti_ia_{year}_anac.csv" for year in years]
+
+    with timer.stage("load") as stage:
+        df = analisi.carica_csv(files)
+        rows = stage["rows"] = len(df)
+    with timer.stage("clean", rows):
+        df = analisi.pulisci_dati(df)
+    with timer.stage("enrichment", rows):
+        df = analisi.categorizza_vettoriale(df)
+    with timer.stage("validation", rows):
+        validazioni = {
+            "importi": analisi.valida_importi(df),
+            "date": analisi.valida_date(df),
+            "campi": analisi.valida_campi(df),
+        }
+    with timer.stage("corrections", rows):
+        df = analisi.applica_correzioni(df, validazioni)
+    with timer.stage("statistics", rows):
+        aggregati = analisi.aggrega(df)
+        stats = analisi.calcola_statistiche_generali(df, aggregati)
+        top_pa = analisi.classifica_pa(df, 30, aggregati)
+        categorie = analisi.raggruppa_per_categoria(df, aggregati)
+        settori = analisi.raggruppa_per_settore(df, aggregati)
+        pnrr_data = analisi.analisi_pnrr(df, aggregati)
+    with timer.stage("write", rows):
+        html = analisi.genera_dashboard_html(stats, top_pa, categorie, settori, pnrr_data,
+                                             validazioni)
+        (output_dir / "index.html").write_text(html, encoding="utf-8")
+        with open(output_dir / "dati_processati.json", "w", encoding="utf-8") as f:
+            json.dump({"statistiche_generali": stats, "top_pa": top_pa, "categorie_ai": categorie,
+                       "settori_pa": settori, "pnrr": pnrr_data}, f, ensure_ascii=False,
+                      default=str)
+        df.to_csv(output_dir / "dataset_corretto.csv", index=False, sep=";", encoding="utf-8-sig")
+        analisi.genera_report_validazioni(validazioni, output_dir / "report_validazioni.txt")
+    return {"rows_in": rows, "rows_out": len(df), "stages": timer.stages}
+
+
+def run_child(args):
+    runner = {"build": run_build, "analisi": run_analisi}[args.child]
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    result = runner(args.input_dir.resolve(), args.output_dir.resolve(), args.years)
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = peak_rss_mb()
+    args.result.write_text(json.dumps(result), encoding="utf-8")
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def run_pipeline(python, pipeline, input_dir, output_dir, years):
+    """Run one pipeline in a fresh interpreter. Returns its result or an error string."""
+    result_path = output_dir.with_suffix(".result.json")
+    proc = subprocess.run(
+        [python, str(Path(__file__).resolve()), "--child", pipeline,
+         "--input-dir", str(input_dir), "--output-dir", str(output_dir),
+         "--result", str(result_path), "--years", *years],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        lines = (proc.stderr or proc.stdout).strip().splitlines()
+        return lines[-1] if lines else f"exit status {proc.returncode}"
+    return json.loads(result_path.read_text(encoding="utf-8"))
+
+
+def print_result(pipeline, result):
+    if isinstance(result, str):
+        print(f"  {pipeline:<8} [FAIL] {result}")
+        return
+    print(f"  {pipeline:<8} {result['rows_in']:,} rows in, {result['rows_out']:,} out, "
+          f"{result['seconds']:.2f} s, {result['rows_in'] / result['seconds']:,.0f} rows/s, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    for s in result["stages"]:
+        rate = f"{s['rows'] / s['seconds']:>12,.0f}" if s["rows"] and s["seconds"] else f"{'-':>12}"
+        print(f"    {s['stage']:<12} {s['seconds']:>8.3f} s {rate} rows/s "
+              f"{s['peak_rss_mb']:>8.0f} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark both pipelines on synthetic ANAC data")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="total rows per run (e.g. 10k 100k 1M 10M)")
+    parser.add_argument("--years", nargs="+", default=DEFAULT_YEARS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=PIPELINES)
+    parser.add_argument("--python", default=sys.executable,
+                        help="interpreter for the pipeline subprocesses (default: this one)")
+    parser.add_argument("--work-dir", type=Path,
+                        help="where to put the synthetic CSVs and outputs (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="do not delete the work dir")
+    parser.add_argument("--json", type=Path, help="also save the results as JSON")
+    # Internal: run one pipeline and write its timings to --result
+    parser.add_argument("--child", choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument("--input-dir", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--output-dir", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        run_child(args)
+        return
+
+    work_dir = (args.work_dir or Path(tempfile.mkdtemp(prefix="bench_anac_"))).resolve()
+    results = []
+    try:
+        for size in args.sizes:
+            rows = parse_count(size)
+            input_dir = work_dir / f"input_{size}"
+            start = time.perf_counter()
+            paths = generate(input_dir, rows, args.years, args.seed)
+            mb = sum(p.stat().st_size for p in paths.values()) / 1024 / 1024
+            print(f"\n[BENCH] {rows:,} rows, {len(paths)} year(s), {mb:.1f} MB "
+                  f"(generated in {time.perf_counter() - start:.1f} s)")
+            for pipeline in args.pipelines:
+                result = run_pipeline(args.python, pipeline, input_dir,
+                                      work_dir / f"output_{size}_{pipeline}", args.years)
+                print_result(pipeline, result)
+                results.append({"size": size, "rows": rows, "input_mb": mb,
+                                "pipeline": pipeline, "result": result})
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            print(f"\n[KEEP] {work_dir}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\n[SAVED] {args.json}")
+
+
+if __name__ == "__main__":
+    main()
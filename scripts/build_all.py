@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+build_all.py - Full refresh of every artifact from a single pass over the CSVs
+
+02_build_contracts.py and analisi_appalti_ia.py both parse the yearly
+appalti_ia_YYYY_anac.csv files, correct them and classify every contract.
+Run one after the other they do all of it twice; build_all.py does it once
+and fans the result out to both:
+
+  1. load        each CSV is parsed once (load_csv of the build)
+  2. dataframe   the raw rows, before corrections, become the analysis
+                 DataFrame (analisi.dataframe_da_record, same dtypes as
+                 carica_csv): the validations still see the original amounts
+  3. corrections / enrichment
+                 the build's apply_corrections and enrich_records, per year;
+                 the results go to the build cache as in a normal build
+  4. build       dedup, validation and every data/ artifact (contracts.json,
+                 shards, columnar, listing, aggregates, search index, SQLite
+                 database)
+  5. analysis    cleaning, validations and corrections of the analysis on the
+                 DataFrame, with categoria_ai / settore_pa / is_pnrr taken from
+                 the enriched records instead of classified again; writes
+                 dati_processati.json, dataset_corretto.csv, index.html and
+                 report_validazioni.txt, and refreshes .cache_analisi/
+
+Corrections and rule tables come from rules.py in both halves, so the
+outputs match those of the two scripts run separately. Every year is
+reprocessed (it is a full refresh); afterwards both scripts find their
+caches current. One run report covers both halves (--report).
+
+Usage:
+    python scripts/build_all.py
+    python scripts/build_all.py --workers 4
+    python scripts/build_all.py 2024 2025 --no-listing
+"""
+
+import importlib.util
+import os
+import sys
+from pathlib import Path
+
+from classify_chunks import ClassifierPool
+from run_report import RunReport
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def load_module(name, path):
+    """Import a script by path (02_build_contracts is not a valid module name)."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+build = load_module("build_contracts", Path(__file__).resolve().parent / "02_build_contracts.py")
+analisi = load_module("analisi_appalti_ia", PROJECT_DIR / "analisi_appalti_ia.py")
+
+
+def parse_args(argv=None):
+    parser = build.build_parser()
+    parser.description = ("Build contracts.json and the analysis outputs "
+                          "(dashboard, JSON, corrected CSV) from one pass over the ANAC CSVs")
+    args = parser.parse_args(argv)
+    if args.stream:
+        parser.error("--stream is not supported: the analysis needs the records in memory")
+    args.years = args.years_opt or args.years or build.DEFAULT_YEARS
+    return args
+
+
+def run_analysis(df, labels, years, report):
+    """Steps 2-7 of analisi_appalti_ia.py on the shared DataFrame."""
+    # The analysis writes its outputs and cache relative to the project root
+    cwd = os.getcwd()
+    os.chdir(PROJECT_DIR)
+    try:
+        df, validazioni = analisi.elabora_dataframe(df, report, etichette=labels)
+        with report.stage("salvataggio_cache", len(df)):
+            files = [f"appalti_ia_{year}_anac.csv" for year in years]
+            analisi.salva_cache(df, validazioni, analisi.chiave_cache(files))
+        return analisi.genera_output(df, validazioni, report)
+    finally:
+        os.chdir(cwd)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = RunReport(Path(__file__).name, trace_memory=not args.no_trace_memory)
+
+    print("=" * 60)
+    print(" Build contracts.json and the analysis outputs (one pass)")
+    print("=" * 60)
+
+    with report.stage("inputs"):
+        cache = build.BuildCache(build.CACHE_DIR, build.rules_hash())
+        inputs = build.collect_inputs(args.years, cache, force=True)
+    if not inputs:
+        print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
+        sys.exit(1)
+
+    build.SECTOR_MEMO.maxsize = args.sector_memo_size
+    persist_memo = not args.no_persist_memo and args.sector_memo_size > 0
+    if persist_memo:
+        build.SECTOR_MEMO.load(build.SECTOR_MEMO_FILE, cache.rules_hash)
+
+    # 1. Parse each CSV once
+    raw = {}
+    for year, (csv_path, _, _) in inputs.items():
+        print(f"\n[LOAD] {csv_path.name}")
+        with report.stage("load") as stage:
+            raw[year] = build.load_csv(csv_path, year)
+            stage["records_out"] = len(raw[year])
+        print(f"  Loaded {len(raw[year])} records")
+    all_records = [r for records in raw.values() for r in records]
+    if not all_records:
+        print("\n[ERROR] No records loaded. Run 01_extract_cig.sh first.")
+        sys.exit(1)
+
+    # 2. The analysis DataFrame, from the rows as read (before corrections)
+    with report.stage("dataframe", len(all_records)):
+        df = analisi.dataframe_da_record(all_records)
+
+    # 3. Corrections and enrichment, once for both outputs
+    print("\n[STEP] Corrections and enrichment...")
+    pool = ClassifierPool(args.workers, memo=build.SECTOR_MEMO) if args.workers > 1 else None
+    corrections = []
+    try:
+        for year, (csv_path, fingerprint, _) in inputs.items():
+            records = raw[year]
+            with report.stage("corrections", len(records)):
+                year_corrections = build.apply_corrections(records)
+            with report.stage("enrichment", len(records)), \
+                    report.profile("enrichment", build.PROFILE_FILE, enabled=args.profile):
+                build.enrich_records(records, pool)
+            with report.stage("cache_store", len(records)):
+                cache.store_year(year, fingerprint,
+                                 {"records": records, "corrections": year_corrections})
+            corrections.extend(year_corrections)
+    finally:
+        if pool is not None:
+            pool.close()
+    labels = {field: [r[field] for r in all_records]
+              for field in ("categoria_ai", "settore_pa", "is_pnrr")}
+
+    print(f"\n{'='*60}")
+    print(f" Total loaded: {len(all_records)} records from {len(inputs)} year(s)")
+    print(f"{'='*60}")
+
+    # 4. data/ artifacts
+    build.build_outputs(all_records, corrections, inputs, args, report, cache)
+    if persist_memo:
+        build.SECTOR_MEMO.save(build.SECTOR_MEMO_FILE, cache.rules_hash)
+
+    # 5. Analysis outputs
+    print(f"\n{'='*60}")
+    print(" Analysis outputs")
+    print(f"{'='*60}")
+    stats, _, pnrr_data = run_analysis(df, labels, list(inputs), report)
+    print(f"\n  Analysis: {stats['totale_contratti']} contracts, "
+          f"EUR {stats['valore_totale']:,.2f}, "
+          f"{pnrr_data['pnrr']['n_contratti']} PNRR")
+
+    build.write_run_report(report, args.report)
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
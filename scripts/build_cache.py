@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+build_cache.py - Content-hash manifest and per-year cache for the build
+
+02_build_contracts.py keeps, in .build_cache/:
+  - manifest.json        content hash of every input CSV, hash of the
+                         classification/correction rules, and a fingerprint
+                         of the last written output (with a hash of the
+                         options it was written with)
+  - enriched_YYYY.json   the loaded, corrected and enriched records of one
+                         year, reused while that year's CSV and the rules
+                         are unchanged
+
+A file's SHA-256 is only recomputed when its size or mtime differ from the
+manifest, so checking an unchanged tree costs a few stat() calls.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+# Bump when the cached record layout changes, to invalidate old caches
+CACHE_VERSION = 1
+
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sha256_json(*objects):
+    """Stable hash of JSON-serializable objects (e.g. rule tables)."""
+    payload = json.dumps(objects, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path, previous=None):
+    """{size, mtime_ns, sha256} of a file, reusing previous' hash if unchanged."""
+    st = Path(path).stat()
+    if previous and previous.get("size") == st.st_size \
+            and previous.get("mtime_ns") == st.st_mtime_ns:
+        return dict(previous)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256_file(path)}
+
+
+def fingerprint_matches(path, fingerprint):
+    """True if path still has the recorded size and mtime."""
+    if not fingerprint or not Path(path).exists():
+        return False
+    st = Path(path).stat()
+    return st.st_size == fingerprint.get("size") and st.st_mtime_ns == fingerprint.get("mtime_ns")
+
+
+class BuildCache:
+    """The manifest plus per-year enriched records in one cache directory."""
+
+    def __init__(self, cache_dir, rules_hash):
+        self.dir = Path(cache_dir)
+        self.manifest_path = self.dir / "manifest.json"
+        self.rules_hash = rules_hash
+        self.manifest = self._load_manifest()
+        self.rules_changed = self.manifest.get("rules_hash") != rules_hash
+        if self.rules_changed:
+            self.manifest = {"version": CACHE_VERSION, "rules_hash": rules_hash,
+                             "inputs": {}, "output": None}
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != CACHE_VERSION:
+            return {}
+        return manifest
+
+    def year_path(self, year):
+        return self.dir / f"enriched_{year}.json"
+
+    def input_fingerprint(self, year, csv_path):
+        """Current fingerprint of a year's CSV and whether it changed."""
+        previous = self.manifest["inputs"].get(year)
+        current = file_fingerprint(csv_path, previous)
+        unchanged = previous is not None and previous.get("sha256") == current["sha256"] \
+            and self.year_path(year).exists()
+        if unchanged:
+            # Same content, maybe touched: remember the new mtime
+            self.manifest["inputs"][year] = current
+        return current, not unchanged
+
+    def load_year(self, year):
+        with open(self.year_path(year), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def store_year(self, year, fingerprint, payload):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.year_path(year), "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        self.manifest["inputs"][year] = fingerprint
+
+    def output_is_current(self, years, output_path, options_hash=None):
+        """True if output_path was written from exactly these years' inputs,
+        with the same output options (options_hash, see record_output)."""
+        out = self.manifest.get("output")
+        if not out or out.get("years") != list(years) or out.get("options") != options_hash:
+            return False
+        inputs = {y: self.manifest["inputs"].get(y, {}).get("sha256") for y in years}
+        return out.get("inputs") == inputs and fingerprint_matches(output_path, out.get("file"))
+
+    def record_output(self, years, output_path, options_hash=None, sha256=None):
+        """Remember the output written from these years' inputs.
+
+        options_hash identifies the options that shape the output files
+        (formatting, compression, listing layout): changing them makes the
+        output stale even if the inputs did not change. sha256 is the hash
+        of the output, which the artifacts derived from it (shards) repeat.
+        """
+        st = Path(output_path).stat()
+        self.manifest["output"] = {
+            "years": list(years),
+            "inputs": {y: self.manifest["inputs"][y]["sha256"] for y in years},
+            "options": options_hash,
+            "file": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+            "sha256": sha256,
+        }
+
+    @property
+    def output_sha256(self):
+        """sha256 of the last recorded output (None if unknown)."""
+        return (self.manifest.get("output") or {}).get("sha256")
+
+    def save(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
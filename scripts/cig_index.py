@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+cig_index.py - Disk-backed "most recent wins" CIG index
+
+The same CIG can appear in several monthly archives and in several dataset
+years. Instead of holding the rows in memory to pick one, the extractor and
+the --stream build index every row in a temporary SQLite database:
+
+    cig_index(seq, cig UNIQUE, year, modified, position, source, offset)
+
+  - seq       first-seen position of the CIG (the output order of the build)
+  - year      dataset year of the row
+  - modified  last-modified date of the row (last_modified())
+  - position  caller-defined order of the row: on equal (year, modified)
+              the row with the lowest position wins, so ties resolve the
+              same way whatever order the rows arrive in
+  - source    id of the file holding the row (sources table)
+  - offset    byte offset of the row in that file
+
+A row replaces the indexed one only if it is more recent, i.e. its
+(year, modified) is greater (recency() / is_more_recent() are the same rule
+for in-memory records, used by deduplicate() in 02_build_contracts.py).
+Only the winners are read back, by offset (iter_winners() + read_row()), so
+memory stays flat whatever the number of years or rows: the index holds a
+few short fields per CIG and its page cache is bounded by the memory budget.
+
+Offsets are those of the first line of each CSV record, and read_row()
+parses a whole record from there, so a quoted field spanning several lines
+is read back complete, as csv.DictReader reads it.
+"""
+
+import csv
+import sqlite3
+import tempfile
+from pathlib import Path
+
+DEFAULT_MEMORY_BUDGET_MB = 64
+BATCH_SIZE = 5000
+# Record fields giving the last-modified date, in order of preference
+MODIFIED_FIELDS = ["DATA_ULTIMO_PERFEZIONAMENTO", "data_pubblicazione"]
+
+_SCHEMA = """
+CREATE TABLE sources (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+CREATE TABLE cig_index (
+    seq INTEGER PRIMARY KEY,
+    cig TEXT NOT NULL UNIQUE,
+    year TEXT NOT NULL,
+    modified TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+"""
+# Keep the first-seen seq; replace the row only with a more recent one
+_UPSERT = """
+INSERT INTO cig_index (cig, year, modified, position, source, offset) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (cig) DO UPDATE SET
+    year = excluded.year, modified = excluded.modified, position = excluded.position,
+    source = excluded.source, offset = excluded.offset
+WHERE (excluded.year, excluded.modified, -excluded.position)
+    > (cig_index.year, cig_index.modified, -cig_index.position)
+"""
+
+
+def last_modified(fields):
+    """Last-modified date of a record (dict): first non-empty MODIFIED_FIELDS value."""
+    for name in MODIFIED_FIELDS:
+        value = fields.get(name)
+        if value:
+            return value.strip()
+    return ""
+
+
+def recency(record):
+    """(dataset year, last-modified date) of a build record: greater is more recent."""
+    return (record.get("anno_dataset") or "0", last_modified(record))
+
+
+def is_more_recent(candidate, current):
+    """True if candidate should replace current (ties keep current, the first seen)."""
+    return recency(candidate) > recency(current)
+
+
+def _text_line(line, encoding, errors):
+    """A line decoded with universal newlines, as a text-mode open() reads it."""
+    return line.decode(encoding, errors).replace("\r\n", "\n").replace("\r", "\n")
+
+
+def iter_rows(path, encoding="utf-8", errors="strict", delimiter=";"):
+    """(offset, fields) of each data record of a CSV file, after its header.
+
+    The offsets are byte offsets of the record's first line, to be passed to
+    read_row(). csv.reader consumes exactly the lines of one record before
+    yielding it, so the next record starts where the consumed lines end.
+    """
+    with open(path, "rb") as f:
+        end = [len(f.readline())]
+
+        def lines():
+            for line in f:
+                end[0] += len(line)
+                yield _text_line(line, encoding, errors)
+
+        start = end[0]
+        for fields in csv.reader(lines(), delimiter=delimiter, quotechar='"'):
+            yield start, fields
+            start = end[0]
+
+
+def read_header(path, encoding="utf-8-sig", errors="strict", delimiter=";"):
+    """The column names of a CSV file."""
+    with open(path, "rb") as f:
+        line = f.readline().decode(encoding, errors)
+    return next(csv.reader([line], delimiter=delimiter, quotechar='"'), [])
+
+
+class RowReader:
+    """Reads single rows back by offset, keeping each source file open.
+
+    read_line() returns one physical line as stored, read_row() one whole
+    CSV record (which can span several lines), with universal newlines.
+    """
+
+    def __init__(self, encoding="utf-8", errors="strict", delimiter=";"):
+        self.encoding = encoding
+        self.errors = errors
+        self.delimiter = delimiter
+        self._files = {}
+
+    def _seek(self, path, offset):
+        f = self._files.get(path)
+        if f is None:
+            f = self._files[path] = open(path, "rb")
+        f.seek(offset)
+        return f
+
+    def read_line(self, path, offset):
+        return self._seek(path, offset).readline().decode(self.encoding, self.errors)
+
+    def read_row(self, path, offset):
+        f = self._seek(path, offset)
+        lines = (_text_line(line, self.encoding, self.errors) for line in iter(f.readline, b""))
+        return next(csv.reader(lines, delimiter=self.delimiter, quotechar='"'), [])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CigIndex:
+    """CIG -> most recent (year, modified, source, offset), in a temporary SQLite file."""
+
+    def __init__(self, directory=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self._tmp = tempfile.TemporaryDirectory(prefix="cig_index_", dir=directory)
+        self.path = Path(self._tmp.name) / "cig_index.sqlite"
+        self.db = sqlite3.connect(self.path)
+        # A scratch database: no journal, no fsync, sorts spill to files
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("PRAGMA temp_store = FILE")
+        self.db.execute(f"PRAGMA cache_size = -{int(memory_budget_mb * 1024)}")
+        self.db.executescript(_SCHEMA)
+        self._sources = {}
+        self.added = 0
+        self.skipped = 0
+
+    def source(self, path):
+        """Id of a source file (registered on first use)."""
+        path = str(path)
+        if path not in self._sources:
+            with self.db:
+                cursor = self.db.execute("INSERT INTO sources (path) VALUES (?)", (path,))
+            self._sources[path] = cursor.lastrowid
+        return self._sources[path]
+
+    def add(self, entries):
+        """Index a batch of (cig, year, modified, position, source, offset).
+
+        Entries without a CIG are dropped.
+        """
+        rows = []
+        for entry in entries:
+            if not entry[0]:
+                self.skipped += 1
+                continue
+            rows.append(entry)
+        with self.db:
+            self.db.executemany(_UPSERT, rows)
+        self.added += len(rows)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM cig_index").fetchone()[0]
+
+    @property
+    def duplicates(self):
+        return self.added - len(self)
+
+    def iter_winners(self, order="seq"):
+        """(cig, year, source path, offset) of each CIG's winning row.
+
+        order="seq": first-seen order of the CIGs; order="cig": sorted by CIG.
+        """
+        column = {"seq": "i.seq", "cig": "i.cig"}[order]
+        return iter(self.db.execute(
+            "SELECT i.cig, i.year, s.path, i.offset FROM cig_index i "
+            f"JOIN sources s ON s.id = i.source ORDER BY {column}"))
+
+    def close(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
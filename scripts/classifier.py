@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+classifier.py - Compiled multi-pattern classifier for the regex rule tables
+
+The classification tables (AI categories, PA sectors, PNRR patterns) are
+ordered dicts of label -> list of lowercase regex patterns: a text gets the
+first label, in table order, that has at least one pattern matching anywhere
+(case-insensitively).
+
+RuleSet compiles a whole table once into a single alternation with one
+named group per label, so a text is scanned by one regex instead of one
+re.search per pattern. The result is identical to the pattern-by-pattern
+loop:
+
+  - at any given position the alternation tries labels in priority order,
+    so the leftmost match reports the best label that matches *there*;
+  - a higher-priority label can only match further right, so the scan
+    resumes after that position with a matcher restricted to the labels
+    that rank above the current best, until none of them match.
+
+Usage:
+    from classifier import RuleSet
+
+    rules = RuleSet(CATEGORIE_AI, default="Altre applicazioni IA")
+    rules.classify("Servizio chatbot per URP")   # -> "AI Generativa & LLM"
+
+    pnrr = RuleSet({True: PNRR_PATTERNS}, default=False)
+    pnrr.classify("Progetto finanziato PNRR")     # -> True
+
+MemoizedClassifier puts a bounded LRU memo in front of a RuleSet, for
+inputs that repeat a lot (the same administration issues many CIGs).
+"""
+
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+# Characters that re.IGNORECASE treats as equal to an ASCII letter even after
+# str.lower(); folding them lets the matcher run case-sensitively on lowered
+# text with exactly the same results, which is several times faster.
+CASE_FOLDS = str.maketrans({"\u0131": "i", "\u017f": "s"})
+
+_MISSING = object()
+
+
+def fold(text):
+    """Lowercase text the way the compiled rules expect it."""
+    return text.lower().translate(CASE_FOLDS)
+
+
+class RuleSet:
+    """An ordered label -> patterns table compiled into one matcher."""
+
+    def __init__(self, rules, default=None):
+        self.labels = list(rules.keys())
+        self.default = default
+        # One combined (non-capturing) pattern per label, in priority order
+        self.label_patterns = [
+            "|".join(f"(?:{p})" for p in rules[label]) for label in self.labels
+        ]
+        # _prefix[k] matches any of the first k labels; _prefix[n] is the
+        # full matcher used for the initial scan.
+        self._prefix = [None] + [
+            re.compile(
+                "|".join(
+                    f"(?P<r{i}>{self.label_patterns[i]})" for i in range(k)
+                )
+            )
+            for k in range(1, len(self.labels) + 1)
+        ]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def match_index(self, text):
+        """Return the index of the first matching label, or None."""
+        if not self.labels:
+            return None
+        text = fold(text)
+        m = self._prefix[-1].search(text)
+        if m is None:
+            return None
+        best = int(m.lastgroup[1:])
+        while best > 0:
+            m = self._prefix[best].search(text, m.start() + 1)
+            if m is None:
+                break
+            best = int(m.lastgroup[1:])
+        return best
+
+    def classify(self, text):
+        """Return the first matching label for text, or the default."""
+        idx = self.match_index(text)
+        return self.default if idx is None else self.labels[idx]
+
+    def matches(self, text):
+        """True if any pattern of any label matches text."""
+        return bool(self.labels) and self._prefix[-1].search(fold(text)) is not None
+
+
+def normalize_key(text):
+    """Memo key: the folded text, the only thing RuleSet.classify depends on.
+
+    Whitespace is kept as is: the patterns can match across or depend on
+    it, so collapsing it could give a different label than the rules do.
+    """
+    return fold(text)
+
+
+class MemoizedClassifier:
+    """Bounded LRU memo in front of RuleSet.classify.
+
+    Entries are keyed by normalize_key(text) and the original text is what
+    gets classified: the result is always exactly RuleSet.classify(text)
+    (and the same as the analysis's rule cascade). When full, the least
+    recently used entry is evicted. The memo can be saved to and loaded from
+    a JSON file; entries are only reused if the rules hash matches.
+    """
+
+    def __init__(self, rules, maxsize=50_000):
+        self.rules = rules
+        self.maxsize = maxsize
+        self._memo = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._memo)
+
+    def classify(self, text):
+        key = normalize_key(text)
+        label = self._memo.get(key, _MISSING)
+        if label is not _MISSING:
+            self.hits += 1
+            self._memo.move_to_end(key)
+            return label
+        self.misses += 1
+        label = self.rules.classify(text)
+        if self.maxsize > 0:
+            self._memo[key] = label
+            if len(self._memo) > self.maxsize:
+                self._memo.popitem(last=False)
+                self.evictions += 1
+        return label
+
+    def add_counts(self, counts):
+        """Add the hits / misses / evictions of another memo (a worker process's)."""
+        self.hits += counts["hits"]
+        self.misses += counts["misses"]
+        self.evictions += counts["evictions"]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._memo),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def load(self, path, rules_hash):
+        """Load persisted entries (oldest first). Returns how many were loaded."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("rules_hash") != rules_hash:
+            return 0
+        entries = data.get("entries", [])[-self.maxsize:] if self.maxsize > 0 else []
+        for key, label in entries:
+            self._memo[key] = label
+        return len(entries)
+
+    def save(self, path, rules_hash):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"rules_hash": rules_hash, "entries": list(self._memo.items())},
+                      f, ensure_ascii=False, separators=(",", ":"))
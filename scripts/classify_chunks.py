@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+classify_chunks.py - Chunked multi-core classification of ANAC CIG CSVs
+
+Runs the AI category / PA sector / PNRR rules of 02_build_contracts.py over
+CSVs of any size, e.g. every CIG ANAC publishes instead of the keyword
+filtered subset. The input is read in fixed-size chunks of raw lines; each
+chunk is parsed, corrected (records.apply_corrections) and classified by a
+process pool. The workers import the rules (rules.py, records.py) once, at
+startup, and each keeps its own sector memo. Each worker returns, per chunk:
+
+  - the per-chunk aggregates: rows, and count / importo_lotto total per AI
+    category, per PA sector and for PNRR / non-PNRR contracts, plus the
+    amount sketches of outliers.py (overall, per category and per sector),
+    the corrections applied and the hits / misses / evictions of its memo
+  - optionally the classification of each row (cig, categoria_ai,
+    settore_pa, is_pnrr), written in input order to --output
+
+The chunk aggregates are summed into the totals saved with --aggregates;
+the sketches merge too, so the robust outlier thresholds (median + 3 MAD of
+the log amounts) cover every row in bounded memory.
+Parsing and classification both happen in the workers, while the parent only
+splits lines, so throughput grows almost linearly with --workers.
+
+A quoted field can span several lines (some oggetto_lotto values do), so
+chunks are cut only between records: the parent tracks whether a quote is
+open at the end of each line, without parsing it. Inputs can be .csv files
+or the monthly cig_csv_YYYY_MM.zip archives.
+
+02_build_contracts.py --workers N classifies its records on the same kind
+of pool (ClassifierPool) in its enrichment step.
+
+Usage:
+    python scripts/classify_chunks.py cig_csv_2025_*.zip --aggregates totals.json
+    python scripts/classify_chunks.py appalti_ia_2025_anac.csv --output classified.csv
+    python scripts/classify_chunks.py data/*.zip --workers 8 --chunk-size 100000
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from classifier import MemoizedClassifier
+from outliers import AmountProfile
+from records import apply_corrections, classify_ai_category, clean_value, is_pnrr, parse_float
+from rules import CORRECTIONS, SECTOR_RULES
+
+DEFAULT_CHUNK_SIZE = 50_000
+DEFAULT_MEMO_SIZE = 50_000
+MIN_CHUNK_SIZE = 500
+# Fields a worker needs to classify a record
+CLASSIFY_FIELDS = ["oggetto_lotto", "oggetto_gara",
+                   "denominazione_amministrazione_appaltante", "FLAG_PNRR_PNC"]
+# Fields read from each CSV line: the above plus the key and the amount
+LINE_FIELDS = ["cig", "importo_lotto"] + CLASSIFY_FIELDS
+
+ENCODING = "utf-8"
+ERRORS = "surrogateescape"
+
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+# Worker state: the sector memo of the process and the column positions of
+# LINE_FIELDS in the CSV header
+_memo = None
+_columns = None
+
+
+def _init_worker(columns=None, memo_size=DEFAULT_MEMO_SIZE):
+    global _memo, _columns
+    _memo = MemoizedClassifier(SECTOR_RULES, maxsize=memo_size)
+    _columns = columns
+
+
+def _classify(row):
+    """(categoria_ai, settore_pa, is_pnrr) of one record, as enrich_records does."""
+    return (
+        classify_ai_category(row["oggetto_lotto"] or "", row["oggetto_gara"] or ""),
+        _memo.classify(row["denominazione_amministrazione_appaltante"] or ""),
+        is_pnrr(row),
+    )
+
+
+def _take_memo_counts():
+    """Hits / misses / evictions of the worker memo since the last call."""
+    counts = {"hits": _memo.hits, "misses": _memo.misses, "evictions": _memo.evictions}
+    _memo.hits = _memo.misses = _memo.evictions = 0
+    return counts
+
+
+def _classify_fields_task(rows):
+    """Classify a chunk of CLASSIFY_FIELDS tuples (used by ClassifierPool).
+
+    Returns (labels, memo counts of the chunk).
+    """
+    labels = [_classify(dict(zip(CLASSIFY_FIELDS, fields))) for fields in rows]
+    return labels, _take_memo_counts()
+
+
+def _add(totals, key, amount):
+    entry = totals.setdefault(key, [0, 0.0])
+    entry[0] += 1
+    entry[1] += amount
+
+
+def _classify_lines_task(lines, with_rows):
+    """Parse, correct and classify a chunk of raw CSV lines.
+
+    Returns (aggregates, rows); rows is None unless with_rows.
+    """
+    aggregates = new_aggregates()
+    rows = [] if with_rows else None
+    for values in csv.reader(lines, delimiter=";", quotechar='"'):
+        if not values:
+            continue
+        record = {name: clean_value(values[i]) if i is not None and i < len(values) else None
+                  for name, i in zip(LINE_FIELDS, _columns)}
+        cig = record["cig"]
+        if cig in CORRECTIONS:
+            aggregates["corrections"].extend(apply_corrections([record]))
+        amount = parse_float(record["importo_lotto"])
+        importo = amount or 0.0
+        categoria, settore, pnrr = _classify(record)
+        aggregates["rows"] += 1
+        aggregates["importi"].add(amount, categoria=categoria, settore=settore)
+        _add(aggregates["categorie"], categoria, importo)
+        _add(aggregates["settori"], settore, importo)
+        _add(aggregates["pnrr"], "pnrr" if pnrr else "non_pnrr", importo)
+        if with_rows:
+            rows.append((cig, categoria, settore, pnrr))
+    aggregates["memo"] = _take_memo_counts()
+    return aggregates, rows
+
+
+# ============================================================================
+# AGGREGATES
+# ============================================================================
+
+def new_aggregates():
+    return {"rows": 0, "categorie": {}, "settori": {}, "pnrr": {}, "importi": AmountProfile(),
+            "corrections": [], "memo": {"hits": 0, "misses": 0, "evictions": 0}}
+
+
+def merge_aggregates(total, part):
+    """Add the chunk aggregates part into total (in place) and return total."""
+    total["rows"] += part["rows"]
+    total["importi"].merge(part["importi"])
+    total["corrections"].extend(part["corrections"])
+    for key, count in part["memo"].items():
+        total["memo"][key] += count
+    for group in ("categorie", "settori", "pnrr"):
+        for key, (count, value) in part[group].items():
+            entry = total[group].setdefault(key, [0, 0.0])
+            entry[0] += count
+            entry[1] += value
+    return total
+
+
+def format_aggregates(total):
+    """{group: [{"key", "count", "value"}, ...]} sorted by value, for the JSON output."""
+    result = {"rows": total["rows"]}
+    for group in ("categorie", "settori", "pnrr"):
+        result[group] = [
+            {"key": key, "count": count, "value": round(value, 2)}
+            for key, (count, value) in sorted(total[group].items(), key=lambda kv: -kv[1][1])
+        ]
+    result["importi"] = total["importi"].thresholds()
+    result["corrections"] = total["corrections"]
+    return result
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def open_lines(path):
+    """Text stream of a .csv file, or of the first .csv member of a .zip."""
+    path = Path(path)
+    if path.suffix.lower() == ".zip":
+        zf = zipfile.ZipFile(path)
+        member = next((n for n in zf.namelist() if n.lower().endswith(".csv")), None)
+        if member is None:
+            zf.close()
+            return None
+        return io.TextIOWrapper(zf.open(member), encoding=ENCODING, errors=ERRORS, newline="")
+    return open(path, "r", encoding=ENCODING, errors=ERRORS, newline="")
+
+
+def header_columns(header_line):
+    """Positions of LINE_FIELDS in a CSV header (None for missing fields)."""
+    header = next(csv.reader([header_line.lstrip("\ufeff")], delimiter=";", quotechar='"'))
+    positions = {name: i for i, name in enumerate(header)}
+    return [positions.get(name) for name in LINE_FIELDS]
+
+
+def iter_chunks(stream, chunk_size):
+    """Lists of at least chunk_size lines (fewer for the last), ending with a
+    complete CSV record.
+
+    Quotes inside a quoted field are doubled, so a line with an odd number of
+    quotes opens or closes a multi-line field; a chunk is only cut where no
+    field is open.
+    """
+    chunk = []
+    in_quotes = False
+    for line in stream:
+        chunk.append(line)
+        if line.count('"') % 2:
+            in_quotes = not in_quotes
+        if len(chunk) >= chunk_size and not in_quotes:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ============================================================================
+# DRIVERS
+# ============================================================================
+
+def _collect(future, total, output):
+    aggregates, rows = future.result()
+    merge_aggregates(total, aggregates)
+    if output is not None:
+        output.writerows((cig, cat, sec, int(pnrr)) for cig, cat, sec, pnrr in rows)
+
+
+def classify_file(path, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, output=None,
+                  memo_size=DEFAULT_MEMO_SIZE):
+    """Classify one file chunk by chunk. Returns its merged aggregates.
+
+    output, if given, is a csv.writer receiving (cig, categoria_ai,
+    settore_pa, is_pnrr) rows in input order.
+    """
+    stream = open_lines(path)
+    total = new_aggregates()
+    if stream is None:
+        return total
+    with stream:
+        header = stream.readline()
+        if not header:
+            return total
+        # Each file gets its own pool: the column positions are worker state
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(header_columns(header), memo_size)) as pool:
+            # Keep a bounded window of chunks in flight, collected in input order
+            window = 2 * (workers or os.cpu_count() or 1)
+            pending = deque()
+            for chunk in iter_chunks(stream, chunk_size):
+                pending.append(pool.submit(_classify_lines_task, chunk, output is not None))
+                if len(pending) >= window:
+                    _collect(pending.popleft(), total, output)
+            while pending:
+                _collect(pending.popleft(), total, output)
+    return total
+
+
+class ClassifierPool:
+    """Worker processes with the rules compiled, for already loaded records.
+
+    Used by 02_build_contracts.py --workers for its enrichment step:
+
+        with ClassifierPool(4, memo=SECTOR_MEMO) as pool:
+            labels = pool.classify(records)   # [(categoria, settore, is_pnrr)]
+
+    Each worker keeps a sector memo of memo.maxsize entries; the hits,
+    misses and evictions of every chunk are added to memo (add_counts()), so
+    its stats() cover the whole run.
+    """
+
+    def __init__(self, workers, chunk_size=DEFAULT_CHUNK_SIZE, memo=None):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.memo = memo
+        memo_size = memo.maxsize if memo is not None else DEFAULT_MEMO_SIZE
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(None, memo_size))
+
+    def classify(self, records):
+        """One (categoria_ai, settore_pa, is_pnrr) per record, in order."""
+        rows = [tuple(r.get(f) for f in CLASSIFY_FIELDS) for r in records]
+        # A few chunks per worker, so small batches still use every core
+        size = min(self.chunk_size, max(MIN_CHUNK_SIZE, -(-len(rows) // (self.workers * 4))))
+        results = []
+        for labels, counts in self.executor.map(
+                _classify_fields_task, [rows[i:i + size] for i in range(0, len(rows), size)]):
+            results.extend(labels)
+            if self.memo is not None:
+                self.memo.add_counts(counts)
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Classify ANAC CIG CSVs (AI category, PA sector, PNRR) on all cores")
+    parser.add_argument("inputs", nargs="+", type=Path, help=".csv files or cig_csv_*.zip archives")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="classification processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"CSV lines per chunk, up to the end of a record "
+                             f"(default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--memo-size", type=int, default=DEFAULT_MEMO_SIZE,
+                        help="max distinct PA names in each worker's sector memo (0 disables it)")
+    parser.add_argument("--output", type=Path,
+                        help="write cig;categoria_ai;settore_pa;is_pnrr for every row")
+    parser.add_argument("--aggregates", type=Path,
+                        help="write the merged totals per category, sector and PNRR as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"[CLASSIFY] {len(args.inputs)} file(s), {workers} worker(s), "
+          f"chunks of {args.chunk_size} lines")
+
+    out_file = writer = None
+    if args.output:
+        out_file = open(args.output, "w", encoding="utf-8", newline="")
+        writer = csv.writer(out_file, delimiter=";", quotechar='"', quoting=csv.QUOTE_ALL)
+        writer.writerow(["cig", "categoria_ai", "settore_pa", "is_pnrr"])
+
+    total = new_aggregates()
+    start = time.perf_counter()
+    try:
+        for path in args.inputs:
+            file_start = time.perf_counter()
+            part = classify_file(path, workers, args.chunk_size, writer, args.memo_size)
+            merge_aggregates(total, part)
+            elapsed = time.perf_counter() - file_start
+            print(f"  {path.name}: {part['rows']:,} rows in {elapsed:.1f} s "
+                  f"({part['rows'] / elapsed if elapsed else 0:,.0f} rows/s)")
+    finally:
+        if out_file is not None:
+            out_file.close()
+
+    elapsed = time.perf_counter() - start
+    result = format_aggregates(total)
+    print(f"\n[DONE] {total['rows']:,} rows in {elapsed:.1f} s "
+          f"({total['rows'] / elapsed if elapsed else 0:,.0f} rows/s)")
+    for group in ("categorie", "settori", "pnrr"):
+        print(f"\n  {group}:")
+        for entry in result[group]:
+            print(f"    {entry['key']}: {entry['count']:,} (EUR {entry['value']:,.2f})")
+    memo = total["memo"]
+    lookups = memo["hits"] + memo["misses"]
+    print(f"\n  Sector memo: {memo['hits']:,} hits, {memo['misses']:,} misses, "
+          f"{memo['evictions']:,} evictions "
+          f"({memo['hits'] / lookups * 100 if lookups else 0:.1f}% hit rate, {workers} worker(s))")
+    if total["corrections"]:
+        print(f"  Corrections applied: {len(total['corrections'])}")
+    overall = result["importi"]["overall"]
+    if overall["threshold"] is not None:
+        print(f"\n  importo_lotto outliers: ~{overall['above']:,} above EUR "
+              f"{overall['threshold']:,.2f} (median + 3 MAD of the log amounts)")
+    if args.aggregates:
+        with open(args.aggregates, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n[SAVED] {args.aggregates}")
+    if args.output:
+        print(f"[SAVED] {args.output}")
+
+
+if __name__ == "__main__":
+    main()
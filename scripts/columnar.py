@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+columnar.py - Columnar, dictionary-encoded variant of contracts.json
+
+Instead of one object per record (65 repeated key names), the records are
+stored as one array per field:
+
+    {
+      "version": 1,
+      "contracts_sha256": "...",                        # contracts.json of the same build
+      "records": 1302,
+      "fields": ["cig", "cig_accordo_quadro", ...],     # record key order
+      "encodings": {"cig": "plain", "provincia": "dict",
+                    "importo_lotto": "number", ...},
+      "dictionaries": {"provincia": ["ROMA", "MILANO", ...], ...},
+      "columns": {"cig": ["B1B36B1A1E", ...],
+                  "provincia": [0, 1, 0, ...],          # index into dictionary
+                  "importo_lotto": [357.85, ...], ...}
+    }
+
+Encodings:
+  - number: NUMERIC_FIELDS, parsed to float (null when empty or invalid)
+  - dict:   columns with few distinct values (categoria_ai, settore_pa,
+            provincia, stato, tipo_scelta_contraente, descrizione_cpv, ...),
+            stored as integer codes into a per-column dictionary
+  - plain:  everything else, values as they are
+
+Decoding gives back the original records, except that the amounts are
+numbers instead of strings. Totals are plain sums over the number columns.
+
+Usage:
+    from columnar import read_columnar, iter_records
+
+    data = read_columnar(Path("data/contracts.columnar.json"))
+    sum(v or 0 for v in data["columns"]["importo_complessivo_gara"])
+    records = list(iter_records(data))
+"""
+
+import json
+
+COLUMNAR_VERSION = 1
+NUMERIC_FIELDS = ["importo_lotto", "importo_complessivo_gara"]
+# A column is dictionary-encoded when its distinct values are at most this
+# fraction of the records
+DICT_MAX_RATIO = 0.5
+
+
+def _to_number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number == number else None
+
+
+def to_columnar(records, contracts_sha256=None):
+    """Encode a list of records (all with the same fields) as columns."""
+    records = list(records)
+    fields = list(records[0]) if records else []
+    for record in records:
+        for key in record:
+            if key not in fields:
+                fields.append(key)
+
+    encodings = {}
+    dictionaries = {}
+    columns = {}
+    limit = len(records) * DICT_MAX_RATIO
+    for field in fields:
+        values = [r.get(field) for r in records]
+        if field in NUMERIC_FIELDS:
+            encodings[field] = "number"
+            columns[field] = [_to_number(v) for v in values]
+            continue
+        codes = {}
+        for v in values:
+            # bools and numbers are keyed apart from equal-looking strings
+            codes.setdefault((type(v).__name__, v), len(codes))
+            if len(codes) > limit:
+                break
+        if len(codes) <= limit:
+            encodings[field] = "dict"
+            dictionaries[field] = [v for _, v in codes]
+            columns[field] = [codes[(type(v).__name__, v)] for v in values]
+        else:
+            encodings[field] = "plain"
+            columns[field] = values
+
+    return {
+        "version": COLUMNAR_VERSION,
+        "contracts_sha256": contracts_sha256,
+        "records": len(records),
+        "fields": fields,
+        "encodings": encodings,
+        "dictionaries": dictionaries,
+        "columns": columns,
+    }
+
+
+def read_columnar(path):
+    """Load a columnar file, checking its version."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"{path}: unsupported columnar version {data.get('version')}")
+    return data
+
+
+def columnar_is_current(path, contracts_sha256):
+    """True if path holds a columnar file of this version for this contracts.json."""
+    try:
+        data = read_columnar(path)
+    except (OSError, ValueError):
+        return False
+    return bool(contracts_sha256) and data.get("contracts_sha256") == contracts_sha256
+
+
+def decode_column(data, field):
+    """The values of one field, with dictionary codes resolved."""
+    column = data["columns"][field]
+    if data["encodings"][field] == "dict":
+        dictionary = data["dictionaries"][field]
+        return [dictionary[code] for code in column]
+    return column
+
+
+def iter_records(data):
+    """Rebuild the records (amounts as numbers) one at a time."""
+    fields = data["fields"]
+    columns = [decode_column(data, field) for field in fields]
+    for values in zip(*columns):
+        yield dict(zip(fields, values))
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+contracts_db.py - SQLite database of the enriched contracts, and a query CLI
+
+The build publishes data/contracts.sqlite next to contracts.json, with the
+same records (corrected, deduplicated, enriched) in the same order:
+
+    contracts(ordinal, cig, ..., anno_dataset, categoria_ai, settore_pa, is_pnrr)
+    contracts_fts(oggetto_lotto, oggetto_gara, denominazione_amministrazione_appaltante)
+    meta(key, value)       version, contracts_sha256, generated_at, years, records
+
+  - ordinal is the position of the record in contracts.json
+  - amounts are REAL and year/month/lot counts INTEGER (SQLite column
+    affinity converts the CSV strings), everything else TEXT; is_pnrr is 0/1
+  - indexes on cig (unique), cf_amministrazione_appaltante, provincia,
+    anno_pubblicazione, categoria_ai and settore_pa
+  - contracts_fts is an FTS5 index over the lot and tender objects and the
+    PA name (external content: the text is stored once, in contracts),
+    case- and accent-insensitive
+
+The database is written to a temporary file and moved into place, so a
+reader never sees a half-built one. Questions about the data become
+millisecond queries instead of reloading the CSVs:
+
+    python scripts/contracts_db.py filter --provincia MILANO --anno 2024
+    python scripts/contracts_db.py filter --categoria "Computer Vision" --min-importo 100000
+    python scripts/contracts_db.py aggregate --by settore_pa --by categoria_ai
+    python scripts/contracts_db.py search "riconoscimento facciale" --pnrr
+    python scripts/contracts_db.py search 'chatbot OR "assistente virtuale"' --raw
+    python scripts/contracts_db.py sql "SELECT provincia, COUNT(*) FROM contracts GROUP BY 1"
+
+Every command opens the database read-only; --json prints the rows as JSON.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DB_FILE = PROJECT_DIR / "data" / "contracts.sqlite"
+DB_VERSION = 1
+BATCH_SIZE = 5000
+
+# Column affinities; fields not listed are TEXT
+COLUMN_TYPES = {
+    "importo_complessivo_gara": "REAL",
+    "importo_lotto": "REAL",
+    "IMPORTO_SICUREZZA": "REAL",
+    "n_lotti_componenti": "INTEGER",
+    "anno_pubblicazione": "INTEGER",
+    "mese_pubblicazione": "INTEGER",
+    "is_pnrr": "INTEGER",
+}
+INDEXED_FIELDS = [
+    "cf_amministrazione_appaltante",
+    "provincia",
+    "anno_pubblicazione",
+    "categoria_ai",
+    "settore_pa",
+]
+FTS_FIELDS = ["oggetto_lotto", "oggetto_gara", "denominazione_amministrazione_appaltante"]
+
+# Columns shown by filter/search unless --fields is given
+DEFAULT_FIELDS = [
+    "cig", "data_pubblicazione", "importo_lotto", "provincia",
+    "denominazione_amministrazione_appaltante", "categoria_ai", "oggetto_lotto",
+]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _schema(fields):
+    columns = ",\n    ".join(f"{_quote(f)} {COLUMN_TYPES.get(f, 'TEXT')}" for f in fields)
+    statements = [
+        "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)",
+        f"CREATE TABLE contracts (\n    ordinal INTEGER PRIMARY KEY,\n    {columns}\n)",
+        "CREATE UNIQUE INDEX idx_contracts_cig ON contracts (cig)",
+    ]
+    statements += [f"CREATE INDEX idx_contracts_{f} ON contracts ({_quote(f)})"
+                   for f in INDEXED_FIELDS if f in fields]
+    fts_columns = ", ".join(_quote(f) for f in FTS_FIELDS)
+    statements.append(
+        f"CREATE VIRTUAL TABLE contracts_fts USING fts5({fts_columns}, "
+        "content='contracts', content_rowid='ordinal', "
+        "tokenize='unicode61 remove_diacritics 2')")
+    return statements
+
+
+def write_contracts_db(records, path, contracts_sha256=None, years=None):
+    """Write records (any iterable, read once) to an SQLite database at path.
+
+    Returns {"path", "records", "bytes"}.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    records = iter(records)
+    first = next(records, None)
+    fields = list(first) if first is not None else []
+    for name in ["cig"] + FTS_FIELDS:
+        if name not in fields:
+            fields.append(name)
+
+    db = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        # Built from scratch and moved into place: no journal, no fsync
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        for statement in _schema(fields):
+            db.execute(statement)
+        insert = (f"INSERT INTO contracts (ordinal, {', '.join(_quote(f) for f in fields)}) "
+                  f"VALUES (?{', ?' * len(fields)})")
+        batch = []
+        for record in chain([first] if first is not None else [], records):
+            batch.append((count, *(record.get(f) for f in fields)))
+            count += 1
+            if len(batch) >= BATCH_SIZE:
+                db.executemany(insert, batch)
+                batch = []
+        db.executemany(insert, batch)
+        db.execute("INSERT INTO contracts_fts (contracts_fts) VALUES ('rebuild')")
+        meta = {
+            "version": DB_VERSION,
+            "contracts_sha256": contracts_sha256,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "years": json.dumps(years or []),
+            "records": count,
+        }
+        db.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                       [(k, None if v is None else str(v)) for k, v in meta.items()])
+        db.commit()
+        db.execute("ANALYZE")
+        db.commit()
+    except BaseException:
+        db.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    db.close()
+    os.replace(tmp_path, path)
+    return {"path": str(path), "records": count, "bytes": path.stat().st_size}
+
+
+def db_is_current(path, contracts_sha256):
+    """True if path holds a database of this version for this contracts.json."""
+    path = Path(path)
+    if not path.is_file() or not contracts_sha256:
+        return False
+    try:
+        db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return False
+    return meta.get("version") == str(DB_VERSION) and meta.get("contracts_sha256") == contracts_sha256
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def connect(path=DB_FILE):
+    """Open the database read-only."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found: run scripts/02_build_contracts.py first")
+    db = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def where_clause(filters, alias="c"):
+    """SQL condition and parameters for a {filter: value} dict (see add_filters)."""
+    conditions = []
+    params = []
+    equal = {
+        "cig": "cig",
+        "cf": "cf_amministrazione_appaltante",
+        "provincia": "provincia",
+        "anno": "anno_pubblicazione",
+        "categoria": "categoria_ai",
+        "settore": "settore_pa",
+    }
+    for key, column in equal.items():
+        values = filters.get(key)
+        if values:
+            conditions.append(f"{alias}.{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if filters.get("pnrr"):
+        conditions.append(f"{alias}.is_pnrr = 1")
+    if filters.get("min_importo") is not None:
+        conditions.append(f"{alias}.importo_lotto >= ?")
+        params.append(filters["min_importo"])
+    if filters.get("max_importo") is not None:
+        conditions.append(f"{alias}.importo_lotto <= ?")
+        params.append(filters["max_importo"])
+    return " AND ".join(conditions) or "1", params
+
+
+def fts_query(text):
+    """An FTS5 query matching every word of text (each quoted, so no syntax)."""
+    words = text.split()
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def filter_contracts(db, filters, fields=DEFAULT_FIELDS, order="importo_lotto DESC", limit=20):
+    where, params = where_clause(filters)
+    columns = ", ".join(f"c.{_quote(f)}" for f in fields)
+    sql = f"SELECT {columns} FROM contracts c WHERE {where} ORDER BY {order}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return db.execute(sql, params).fetchall()
+
+
+def aggregate_contracts(db, by, filters, limit=None):
+    """Count, total, mean and maximum of importo_lotto per group, largest total first."""
+    where, params = where_clause(filters)
+    groups = ", ".join(f"c.{_quote(f)}" for f in by)
+    sql = (f"SELECT {groups}, COUNT(*) AS n, ROUND(SUM(c.importo_lotto), 2) AS totale, "
+           f"ROUND(AVG(c.importo_lotto), 2) AS media, MAX(c.importo_lotto) AS massimo "
+           f"FROM contracts c WHERE {where} GROUP BY {groups} ORDER BY totale DESC")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return db.execute(sql, params).fetchall()
+
+
+def search_contracts(db, text, filters, fields=DEFAULT_FIELDS, raw=False, limit=20):
+    """Full-text search, best matches (bm25) first."""
+    where, params = where_clause(filters)
+    columns = ", ".join(f"c.{_quote(f)}" for f in fields)
+    sql = (f"SELECT {columns} FROM contracts_fts JOIN contracts c ON c.ordinal = contracts_fts.rowid "
+           f"WHERE contracts_fts MATCH ? AND {where} ORDER BY bm25(contracts_fts)")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return db.execute(sql, [text if raw else fts_query(text), *params]).fetchall()
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def print_rows(rows, as_json=False, width=60):
+    if as_json:
+        print(json.dumps([dict(r) for r in rows], ensure_ascii=False, indent=2))
+        return
+    if not rows:
+        print("(no rows)")
+        return
+    names = list(rows[0].keys())
+    cells = [["" if v is None else str(v)[:width] for v in r] for r in rows]
+    widths = [max(len(n), *(len(row[i]) for row in cells)) for i, n in enumerate(names)]
+    print("  ".join(n.ljust(w) for n, w in zip(names, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def add_filters(parser):
+    parser.add_argument("--cig", nargs="+")
+    parser.add_argument("--cf", nargs="+", help="cf_amministrazione_appaltante")
+    parser.add_argument("--provincia", nargs="+")
+    parser.add_argument("--anno", nargs="+", type=int, help="anno_pubblicazione")
+    parser.add_argument("--categoria", nargs="+", help="categoria_ai")
+    parser.add_argument("--settore", nargs="+", help="settore_pa")
+    parser.add_argument("--pnrr", action="store_true", help="only PNRR contracts")
+    parser.add_argument("--min-importo", type=float)
+    parser.add_argument("--max-importo", type=float)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Query the contracts SQLite database")
+    parser.add_argument("--db", type=Path, default=DB_FILE,
+                        help="database (default: data/contracts.sqlite)")
+    parser.add_argument("--json", action="store_true", help="print the rows as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("filter", help="contracts matching the filters")
+    add_filters(p)
+    p.add_argument("--fields", nargs="+", default=DEFAULT_FIELDS)
+    p.add_argument("--order", default="importo_lotto DESC",
+                   help="SQL ORDER BY (default: importo_lotto DESC)")
+    p.add_argument("--limit", type=int, default=20, help="0 for no limit (default: 20)")
+
+    p = commands.add_parser("aggregate", help="count and amounts per group")
+    add_filters(p)
+    p.add_argument("--by", action="append", required=True, metavar="FIELD",
+                   help="group by this column (repeatable)")
+    p.add_argument("--limit", type=int, default=0)
+
+    p = commands.add_parser("search", help="full-text search on objects and PA name")
+    p.add_argument("text")
+    p.add_argument("--raw", action="store_true",
+                   help="pass text as FTS5 query syntax (OR, NEAR, prefix*, column:)")
+    add_filters(p)
+    p.add_argument("--fields", nargs="+", default=DEFAULT_FIELDS)
+    p.add_argument("--limit", type=int, default=20, help="0 for no limit (default: 20)")
+
+    p = commands.add_parser("sql", help="any read-only SQL statement")
+    p.add_argument("query")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        db = connect(args.db)
+    except FileNotFoundError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    filters = {key: getattr(args, key, None) for key in
+               ("cig", "cf", "provincia", "anno", "categoria", "settore", "pnrr",
+                "min_importo", "max_importo")}
+    start = time.perf_counter()
+    try:
+        if args.command == "filter":
+            rows = filter_contracts(db, filters, args.fields, args.order, args.limit)
+        elif args.command == "aggregate":
+            rows = aggregate_contracts(db, args.by, filters, args.limit)
+        elif args.command == "search":
+            rows = search_contracts(db, args.text, filters, args.fields, args.raw, args.limit)
+        else:
+            rows = db.execute(args.query).fetchall()
+    except sqlite3.Error as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - start
+    print_rows(rows, args.json)
+    if not args.json:
+        print(f"\n[QUERY] {len(rows)} rows in {elapsed*1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+extract_cig.py - Stream ANAC CIG monthly archives and filter AI contracts
+
+For every month of the requested years, reads the CSV member straight out of
+cig_csv_YYYY_MM.zip (no unzip to disk), keeps the rows containing one of the
+AI keywords (scripts/ai_keywords.txt, see keyword_matcher.py) and writes:
+  - appalti_ia_YYYY_anac.csv          header + matching rows, one per CIG,
+                                      sorted by CIG
+  - appalti_ia_YYYY_anac.counts.json  per-month total and matching rows
+
+A CIG listed in several months keeps its most recent row (latest
+DATA_ULTIMO_PERFEZIONAMENTO, then data_pubblicazione; on a tie the earliest
+month), the same "most recent wins" rule as the build. The old
+grep | sort -t';' -k1,1 -u pipeline kept an arbitrary one instead.
+
+Each archive is read exactly once; only the matching rows are kept, spooled
+to disk and indexed by CIG (cig_index.py) as each month is filtered, so
+memory does not grow with the number of months or years. All (year, month)
+archives are scheduled together: downloads run in a bounded thread pool and
+filtering in a process pool, overlapping with each other.
+
+Usage:
+    python scripts/extract_cig.py 2025
+    python scripts/extract_cig.py 2023 2024 2025
+    python scripts/extract_cig.py --all                    # 2023-2025
+    python scripts/extract_cig.py 2025 --zip-dir fixtures  # local ZIPs, no download
+    python scripts/extract_cig.py 2025 --keywords my_keywords.txt
+    python scripts/extract_cig.py --all --download-workers 2 --filter-workers 4
+"""
+
+import argparse
+import csv
+import http.client
+import io
+import json
+import shutil
+import sys
+import urllib.request
+import zipfile
+import zlib
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait,
+)
+from pathlib import Path
+
+from cig_index import CigIndex, RowReader, last_modified
+from keyword_matcher import DEFAULT_KEYWORDS_FILE, KeywordMatcher, load_keywords
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+WORK_DIR = PROJECT_DIR / ".tmp_extract"
+BASE_URL = "https://dati.anticorruzione.it/opendata/download/dataset"
+ALL_YEARS = ["2023", "2024", "2025"]
+# Seconds without data before a download is given up (the month is skipped)
+DOWNLOAD_TIMEOUT = 60
+# Raised by a failed or truncated download (IncompleteRead, RemoteDisconnected, ...)
+DOWNLOAD_ERRORS = (OSError, http.client.HTTPException)
+# Raised while reading a damaged archive (bad CRC, broken or truncated data)
+CORRUPT_ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError)
+DEFAULT_YEARS = ["2025"]
+
+# AI keywords (one per line) matched against the whole CSV line, ignoring
+# case and accents
+KEYWORDS_FILE = DEFAULT_KEYWORDS_FILE
+
+# ANAC CSVs are UTF-8; surrogateescape keeps any stray byte intact on output
+ENCODING = "utf-8"
+ERRORS = "surrogateescape"
+
+
+# ============================================================================
+# ARCHIVE ACCESS
+# ============================================================================
+
+def archive_name(year, month):
+    return f"cig_csv_{year}_{month:02d}.zip"
+
+
+def month_url(year, month):
+    return f"{BASE_URL}/cig-{year}/filesystem/{archive_name(year, month)}"
+
+
+def download_month(year, month, dest_dir):
+    """Download one monthly archive. Returns its path, or None if unavailable."""
+    zip_path = Path(dest_dir) / archive_name(year, month)
+    try:
+        with urllib.request.urlopen(month_url(year, month), timeout=DOWNLOAD_TIMEOUT) as resp, \
+                open(zip_path, "wb") as f:
+            shutil.copyfileobj(resp, f)
+    except DOWNLOAD_ERRORS:
+        zip_path.unlink(missing_ok=True)
+        return None
+    if zip_path.stat().st_size == 0 or not zipfile.is_zipfile(zip_path):
+        zip_path.unlink(missing_ok=True)
+        return None
+    return zip_path
+
+
+def csv_member(zf, year, month):
+    """Pick the CSV member of a monthly archive."""
+    expected = f"cig_csv_{year}_{month:02d}.csv"
+    names = zf.namelist()
+    for name in names:
+        if Path(name).name == expected:
+            return name
+    for name in names:
+        if name.lower().endswith(".csv"):
+            return name
+    return None
+
+
+def iter_csv_lines(zip_path, year, month):
+    """Yield the raw lines (line endings included) of the archive's CSV."""
+    with zipfile.ZipFile(zip_path) as zf:
+        member = csv_member(zf, year, month)
+        if member is None:
+            return
+        with zf.open(member) as raw:
+            text = io.TextIOWrapper(raw, encoding=ENCODING, errors=ERRORS, newline="")
+            yield from text
+
+
+# ============================================================================
+# FILTERING
+# ============================================================================
+
+def filter_month(zip_path, year, month, matcher):
+    """Stream one month and keep the rows where matcher.search() is true.
+
+    Returns (header, matching_lines, total_rows); header is None if the
+    archive holds no CSV.
+    """
+    header = None
+    matches = []
+    total = 0
+    for line in iter_csv_lines(zip_path, year, month):
+        if header is None:
+            header = line
+            continue
+        total += 1
+        if matcher.search(line):
+            matches.append(line if line.endswith("\n") else line + "\n")
+    return header, matches, total
+
+
+class YearMatches:
+    """The matching rows of one year, spooled to disk and indexed by CIG.
+
+    Months arrive in any order; add_month() appends their rows to a spool
+    file and indexes each one (position: month, then line, so equal dates
+    resolve to the earliest month whatever the arrival order). winners()
+    reads back the most recent row of each CIG, sorted by CIG.
+    """
+
+    def __init__(self, year, directory=None):
+        self.year = year
+        self.months = {}    # month -> (header, matching rows, total rows)
+        self.index = CigIndex(directory)
+        self.spool_path = self.index.path.with_name("matches.csv")
+        self.spool = open(self.spool_path, "wb")
+        self.source = self.index.source(self.spool_path)
+
+    def add_month(self, month, header, matches, total):
+        self.months[month] = (header, len(matches), total)
+        if header is None:
+            return
+        columns = next(csv.reader([header], delimiter=";", quotechar='"'), [])
+        columns = [name.lstrip("\ufeff").strip() for name in columns]
+        entries = []
+        for i, line in enumerate(matches):
+            offset = self.spool.tell()
+            self.spool.write(line.encode(ENCODING, ERRORS))
+            fields = next(csv.reader([line], delimiter=";", quotechar='"'), [])
+            row = dict(zip(columns, fields))
+            entries.append(((row.get("cig") or "").strip(), self.year, last_modified(row),
+                            month * 10**9 + i, self.source, offset))
+        self.index.add(entries)
+
+    def winners(self):
+        self.spool.close()
+        with RowReader(ENCODING, ERRORS) as reader:
+            for _, _, path, offset in self.index.iter_winners(order="cig"):
+                yield reader.read_line(path, offset)
+
+    def close(self):
+        self.spool.close()
+        self.index.close()
+
+
+def write_year(year, header, lines, counts, output_dir):
+    output_csv = Path(output_dir) / f"appalti_ia_{year}_anac.csv"
+    with open(output_csv, "w", encoding=ENCODING, errors=ERRORS, newline="") as f:
+        f.write(header if header.endswith("\n") else header + "\n")
+        f.writelines(lines)
+
+    counts_file = output_csv.with_suffix(".counts.json")
+    with open(counts_file, "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2)
+    return output_csv
+
+
+# ============================================================================
+# SCHEDULING
+# ============================================================================
+#
+# Every (year, month) is an independent task: a thread pool downloads the
+# archives (bounded, to stay gentle with the ANAC server) and each finished
+# download goes straight to a process pool that filters it, so filtering
+# month N overlaps with downloading month N+1. A year is written as soon as
+# all of its months are resolved.
+
+# Filter-worker state: the keyword matcher is compiled once per process
+_worker_matcher = None
+
+
+def _init_filter_worker(keywords):
+    global _worker_matcher
+    _worker_matcher = KeywordMatcher(keywords)
+
+
+def _filter_task(zip_path, year, month):
+    return filter_month(zip_path, year, month, _worker_matcher)
+
+
+def locate_month(year, month, zip_dir):
+    """Stand-in for download_month when reading local archives."""
+    zip_path = Path(zip_dir) / archive_name(year, month)
+    if not zip_path.is_file():
+        return None
+    if not zipfile.is_zipfile(zip_path):
+        print(f"[WARN]   {zip_path.name}: not a valid ZIP archive, skipped")
+        return None
+    return zip_path
+
+
+def finish_year(matches, output_dir):
+    """Write the outputs of a year from its YearMatches.
+
+    Returns the unique CIG count, or None if no month had data.
+    """
+    year = matches.year
+    header = None
+    counts = {"year": year, "months": {}}
+    for month in sorted(matches.months):
+        month_header, month_matches, month_total = matches.months[month]
+        if month_header is None:
+            print(f"[WARN]   {archive_name(year, month)}: no CSV member")
+            continue
+        header = header or month_header
+        counts["months"][f"{month:02d}"] = {
+            "rows": month_total,
+            "ai_rows": month_matches,
+        }
+
+    if header is None:
+        print(f"[ERROR] No data available for year {year}")
+        return None
+
+    counts["total_rows"] = sum(m["rows"] for m in counts["months"].values())
+    counts["ai_rows"] = sum(m["ai_rows"] for m in counts["months"].values())
+    counts["unique_cig"] = len(matches.index)
+    output_csv = write_year(year, header, matches.winners(), counts, output_dir)
+
+    print(f"[OK]   Year {year}: {len(counts['months'])}/12 months, "
+          f"{counts['total_rows']} total CIG -> {counts['ai_rows']} AI matches "
+          f"-> {counts['unique_cig']} unique CIG")
+    print(f"[OK]   Output: {output_csv}")
+    return counts["unique_cig"]
+
+
+def run(years, keywords, zip_dir=None, output_dir=PROJECT_DIR,
+        download_workers=4, filter_workers=None):
+    """Extract all (year, month) tasks. Returns {year: unique CIG count}."""
+    if zip_dir is None:
+        WORK_DIR.mkdir(parents=True, exist_ok=True)
+        fetch = lambda year, month: download_month(year, month, WORK_DIR)
+    else:
+        fetch = lambda year, month: locate_month(year, month, zip_dir)
+
+    matches = {year: YearMatches(year) for year in years}
+    remaining = {year: 12 for year in years}
+    results = {}
+
+    def resolve(year, month, result):
+        if result is not None:
+            matches[year].add_month(month, *result)
+        remaining[year] -= 1
+        if remaining[year] == 0:
+            year_matches = matches.pop(year)
+            try:
+                results[year] = finish_year(year_matches, output_dir)
+            finally:
+                year_matches.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=download_workers) as downloads, \
+                ProcessPoolExecutor(max_workers=filter_workers,
+                                    initializer=_init_filter_worker,
+                                    initargs=(keywords,)) as filters:
+            pending = {}
+            for year in years:
+                for month in range(1, 13):
+                    pending[downloads.submit(fetch, year, month)] = ("download", year, month, None)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, year, month, zip_path = pending.pop(future)
+                    if kind == "download":
+                        zip_path = future.result()
+                        if zip_path is None:
+                            resolve(year, month, None)
+                        else:
+                            task = filters.submit(_filter_task, zip_path, year, month)
+                            pending[task] = ("filter", year, month, zip_path)
+                        continue
+
+                    try:
+                        result = future.result()
+                    except CORRUPT_ARCHIVE_ERRORS as e:
+                        # Corrupt archive (bad CRC, truncated member): skip the month
+                        print(f"[WARN]   {zip_path.name}: corrupt archive, skipped ({e})")
+                        result = None
+                    if zip_dir is None:
+                        zip_path.unlink(missing_ok=True)
+                    if result is None:
+                        resolve(year, month, None)
+                        continue
+                    print(f"[INFO]   {year}-{month:02d}: {result[2]} rows, {len(result[1])} AI matches")
+                    resolve(year, month, result)
+    finally:
+        for year_matches in matches.values():
+            year_matches.close()
+    return results
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Download ANAC CIG archives and filter AI contracts")
+    parser.add_argument("years", nargs="*", help="years to process (default: 2025)")
+    parser.add_argument("--all", action="store_true", help="process 2023-2025")
+    parser.add_argument("--zip-dir", type=Path,
+                        help="read cig_csv_YYYY_MM.zip from this directory instead of downloading")
+    parser.add_argument("--keywords", type=Path, default=KEYWORDS_FILE,
+                        help="AI keywords file, one per line (default: scripts/ai_keywords.txt)")
+    parser.add_argument("--output-dir", type=Path, default=PROJECT_DIR,
+                        help="where to write appalti_ia_YYYY_anac.csv (default: project root)")
+    parser.add_argument("--download-workers", type=int, default=4,
+                        help="concurrent downloads from ANAC (default: 4)")
+    parser.add_argument("--filter-workers", type=int, default=None,
+                        help="processes filtering archives (default: CPU count)")
+    args = parser.parse_args(argv)
+    if args.all:
+        args.years = ALL_YEARS
+    elif not args.years:
+        args.years = DEFAULT_YEARS
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("=" * 60)
+    print(" ANAC CIG Extraction - AI Procurement Contracts")
+    print("=" * 60)
+    print(f"\n[INFO] Years to process: {' '.join(args.years)}")
+    keywords = load_keywords(args.keywords)
+    print(f"[INFO] AI keywords: {len(keywords)} from {args.keywords}\n")
+
+    try:
+        results = run(args.years, keywords, args.zip_dir, args.output_dir,
+                      args.download_workers, args.filter_workers)
+    finally:
+        if args.zip_dir is None and WORK_DIR.exists():
+            shutil.rmtree(WORK_DIR)
+            print("[INFO] Cleaned up temporary files")
+
+    grand_total = sum(count for count in results.values() if count)
+    print()
+    print("=" * 60)
+    print(f"[OK] Extraction complete. Total AI contracts: {grand_total}")
+    print("=" * 60)
+    return 0 if grand_total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+json_writer.py - Streaming JSON array writer with precompressed siblings
+
+Writes an iterable of records as a JSON array one record at a time, so
+memory stays constant whatever the number of records, and feeds the same
+bytes to a gzip and (if the brotli module is installed) a brotli
+compressor in the same pass. A static server can then send
+contracts.json.gz / contracts.json.br directly.
+
+Formats:
+  - compact (default): one minified record per line
+  - pretty:            byte-identical to json.dump(records, f, indent=2)
+
+Compression (the compress argument):
+  - True / "fast":     gzip level 6, brotli quality 5 (the default: a few
+                       percent larger than "max", many times faster)
+  - "max":             gzip level 9, brotli quality 11, for release builds
+  - False:             no siblings
+
+Usage:
+    from json_writer import write_json_array
+
+    stats = write_json_array(records, Path("data/contracts.json"))
+    stats["bytes"], stats["sha256"], stats["gz_bytes"], stats.get("br_bytes")
+
+    stats = write_json(document, Path("data/contracts.columnar.json"))
+"""
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional: .br siblings are skipped without it
+    brotli = None
+
+# Flush to the file and compressors every ~256 KB of output
+FLUSH_BYTES = 256 * 1024
+
+# Compression preset -> (gzip level, brotli quality)
+COMPRESSION_LEVELS = {"fast": (6, 5), "max": (9, 11)}
+DEFAULT_COMPRESSION = "fast"
+
+
+def _encode_compact(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _encode_pretty(record):
+    text = json.dumps(record, indent=2, ensure_ascii=False, default=str)
+    return "  " + text.replace("\n", "\n  ")
+
+
+class _Sinks:
+    """The plain file plus its compressed siblings, fed with the same bytes."""
+
+    def __init__(self, path, compress):
+        self.path = Path(path)
+        self.file = open(self.path, "wb")
+        self.gz_path = self.path.with_name(self.path.name + ".gz")
+        self.br_path = self.path.with_name(self.path.name + ".br")
+        self.gz = self.br = None
+        if compress:
+            gz_level, br_quality = COMPRESSION_LEVELS[
+                DEFAULT_COMPRESSION if compress is True else compress]
+            self.gz = gzip.GzipFile(self.gz_path, "wb", compresslevel=gz_level, mtime=0)
+            if brotli is not None:
+                self.br_file = open(self.br_path, "wb")
+                self.br = brotli.Compressor(quality=br_quality)
+        # A sibling we are not rewriting would be stale: drop it
+        for stale, active in ((self.gz_path, self.gz), (self.br_path, self.br)):
+            if active is None:
+                stale.unlink(missing_ok=True)
+        self.buffer = []
+        self.buffered = 0
+        self.total = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = b"".join(self.buffer)
+        self.file.write(data)
+        self.sha256.update(data)
+        if self.gz is not None:
+            self.gz.write(data)
+        if self.br is not None:
+            self.br_file.write(self.br.process(data))
+        self.total += len(data)
+        self.buffer = []
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        stats = {"path": str(self.path), "bytes": self.total,
+                 "sha256": self.sha256.hexdigest()}
+        if self.gz is not None:
+            self.gz.close()
+            stats["gz_bytes"] = self.gz_path.stat().st_size
+        if self.br is not None:
+            self.br_file.write(self.br.finish())
+            self.br_file.close()
+            stats["br_bytes"] = self.br_path.stat().st_size
+        return stats
+
+
+def write_json_array(records, path, pretty=False, compress=True):
+    """Stream records to path as a JSON array. Returns size statistics.
+
+    stats: {"path", "records", "bytes", "sha256", "gz_bytes"?, "br_bytes"?}
+    """
+    encode = _encode_pretty if pretty else _encode_compact
+    sinks = _Sinks(path, compress)
+    count = 0
+    try:
+        for record in records:
+            sinks.write(("[\n" if count == 0 else ",\n") + encode(record))
+            count += 1
+        sinks.write("\n]" if count else "[]")
+    finally:
+        stats = sinks.close()
+    stats["records"] = count
+    return stats
+
+
+def write_json(document, path, compress=True):
+    """Write a single JSON document compactly, with the same siblings and stats."""
+    sinks = _Sinks(path, compress)
+    try:
+        sinks.write(json.dumps(document, ensure_ascii=False, separators=(",", ":"), default=str))
+    finally:
+        stats = sinks.close()
+    return stats
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+keyword_matcher.py - Multi-keyword literal matcher with case/accent folding
+
+Builds a trie over a list of literal keywords, after folding both keywords
+and text to lowercase without accents (so "Intelligènza Artificiale"
+matches "intelligenza artificiale"), and compiles it into one regex whose
+alternatives share prefixes. search(text), the hot path of the extractor,
+scans a line in a single pass inside the C regex engine, with one branch
+per distinct next character instead of one per keyword. The scan still
+grows with the keywords, only more slowly than a plain alternation: on
+200,000 synthetic rows (bench_keywords.py) going from 5 to 55 keywords
+takes it from about 1.1 s to 2.9 s, against 6.9 s to 62 s for an re.I
+alternation of the same keywords.
+
+Keywords are loaded from a plain text file (one per line, '#' comments),
+by default scripts/ai_keywords.txt.
+
+Usage:
+    from keyword_matcher import load_keywords, KeywordMatcher
+
+    matcher = KeywordMatcher(load_keywords())
+    matcher.search(line)     # -> True / False
+"""
+
+import re
+import unicodedata
+from pathlib import Path
+
+DEFAULT_KEYWORDS_FILE = Path(__file__).resolve().parent / "ai_keywords.txt"
+
+
+def _build_fold_table():
+    """Map accented Latin letters (U+00C0-U+024F) to their base letter."""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = unicodedata.normalize("NFKD", chr(code))[0]
+        if base != chr(code) and base.isascii():
+            table[code] = base
+    return str.maketrans(table)
+
+
+_FOLD_TABLE = _build_fold_table()
+
+
+def fold(text):
+    """Lowercase text and strip accents from Latin letters."""
+    text = text.lower()
+    # Most ANAC rows are plain ASCII: skip the per-character translation
+    return text if text.isascii() else text.translate(_FOLD_TABLE)
+
+
+def load_keywords(path=DEFAULT_KEYWORDS_FILE):
+    """Read keywords from a file: one per line, blank lines and '#' ignored."""
+    keywords = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                keywords.append(line)
+    return keywords
+
+
+class KeywordMatcher:
+    """Trie of folded literal keywords, compiled into one regex."""
+
+    def __init__(self, keywords):
+        self.keywords = sorted({fold(k) for k in keywords if k.strip()})
+        # State 0 is the root; goto[s] maps a character to the next state
+        self._goto = [{}]
+        self._terminal = [False]
+        for kw in self.keywords:
+            self._add(kw)
+        self._regex = re.compile(self._trie_regex(0)) if self.keywords else None
+
+    def _add(self, keyword):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._terminal.append(False)
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._terminal[state] = True
+
+    def _trie_regex(self, state):
+        """Regex for 'a keyword starts here', following the trie from state.
+
+        Reaching a state that completes a keyword is already a match, so its
+        subtree (longer keywords sharing the prefix) is not needed.
+        """
+        if self._terminal[state]:
+            return ""
+        branches = [
+            re.escape(ch) + self._trie_regex(nxt)
+            for ch, nxt in sorted(self._goto[state].items())
+        ]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    def search(self, text):
+        """True if any keyword occurs in text (after folding)."""
+        return self._regex is not None and self._regex.search(fold(text)) is not None
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+listing.py - Slim contract listing plus per-contract details in buckets
+
+The dashboard needs only a dozen of the 65 fields of every record up
+front; the rest is shown when a contract is opened. The build writes:
+
+  - data/contracts_listing.json    the records projected on LISTING_FIELDS
+                                   (or the fields given with --listing-fields)
+
+        {"version": 1, "contracts_sha256": "...", "fields": [...],
+         "detail_buckets": 256, "records": [{...}, ...]}
+
+  - data/details/XX.json           the full records, {cig: record}, split in
+                                   detail_buckets files by a hash of the CIG
+
+The bucket of a CIG is FNV-1a (32 bit) of its characters modulo
+detail_buckets, in lowercase hex padded to the width of the last bucket;
+detailBucket() in js/app.js computes the same value to fetch only the
+bucket of the contract being opened.
+"""
+
+import json
+from pathlib import Path
+
+from json_writer import write_json
+
+LISTING_VERSION = 1
+DEFAULT_DETAIL_BUCKETS = 256
+# Fields used by the KPIs, charts, search and PA table of the dashboard
+LISTING_FIELDS = [
+    "cig",
+    "cf_amministrazione_appaltante",
+    "denominazione_amministrazione_appaltante",
+    "oggetto_lotto",
+    "importo_lotto",
+    "importo_complessivo_gara",
+    "provincia",
+    "categoria_ai",
+    "settore_pa",
+    "is_pnrr",
+    "data_pubblicazione",
+    "anno_pubblicazione",
+]
+
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+
+def fnv1a(text):
+    h = FNV_OFFSET
+    for ch in text:
+        h = ((h ^ ord(ch)) * FNV_PRIME) & 0xFFFFFFFF
+    return h
+
+
+def detail_bucket(cig, buckets=DEFAULT_DETAIL_BUCKETS):
+    """Name of the detail bucket holding a CIG (e.g. '3f')."""
+    width = len(f"{buckets - 1:x}")
+    return f"{fnv1a(cig) % buckets:0{width}x}"
+
+
+def write_listing(records, listing_path, details_dir, fields=None,
+                  buckets=DEFAULT_DETAIL_BUCKETS, compress=True, contracts_sha256=None):
+    """Write the projected listing and the detail buckets. Returns size stats.
+
+    cig is always part of the listing, since it is the key of the details.
+    compress applies to the listing only. Bucket files left over from a
+    previous build are removed.
+    """
+    fields = list(fields or LISTING_FIELDS)
+    if "cig" not in fields:
+        fields.insert(0, "cig")
+
+    details = {}
+    listing = []
+    for record in records:
+        listing.append({f: record.get(f) for f in fields})
+        cig = record.get("cig") or ""
+        details.setdefault(detail_bucket(cig, buckets), {})[cig] = record
+
+    listing_stats = write_json({
+        "version": LISTING_VERSION,
+        "contracts_sha256": contracts_sha256,
+        "fields": fields,
+        "detail_buckets": buckets,
+        "records": listing,
+    }, listing_path, compress=compress)
+
+    details_dir = Path(details_dir)
+    details_dir.mkdir(parents=True, exist_ok=True)
+    detail_bytes = 0
+    for name in sorted(details):
+        # Buckets are a few KB each: precompressing them costs more than it saves
+        detail_bytes += write_json(details[name], details_dir / f"{name}.json",
+                                   compress=False)["bytes"]
+    for old in details_dir.glob("*.json*"):
+        if old.name.split(".json")[0] not in details:
+            old.unlink()
+
+    return {"listing_bytes": listing_stats["bytes"], "detail_files": len(details),
+            "detail_bytes": detail_bytes}
+
+
+def listing_is_current(listing_path, details_dir, contracts_sha256):
+    """True if listing_path holds a listing for this contracts.json and
+    details_dir every detail bucket of its records."""
+    try:
+        with open(listing_path, "r", encoding="utf-8") as f:
+            listing = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if listing.get("version") != LISTING_VERSION or not contracts_sha256 \
+            or listing.get("contracts_sha256") != contracts_sha256:
+        return False
+    buckets = listing["detail_buckets"]
+    names = {detail_bucket(r.get("cig") or "", buckets) for r in listing["records"]}
+    return all((Path(details_dir) / f"{name}.json").is_file() for name in names)
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+outliers.py - Streaming robust outlier thresholds for contract amounts
+
+Procurement amounts are heavy-tailed: a mean + 3 sigma threshold is pulled up
+by the very values it should flag (one mis-keyed EUR 293M contract is enough
+to hide every other anomaly). The thresholds here are robust instead:
+
+    threshold = exp(median(log x) + k * 1.4826 * MAD(log x))
+
+i.e. k robust standard deviations above the median on the log scale, which
+for log-normal amounts is the usual 3 sigma rule without the tail inflating
+it. Median and MAD come from a mergeable quantile sketch, so they are computed
+in one streaming pass, in bounded memory:
+
+  - QuantileSketch   log-bucketed sketch (DDSketch-style): every quantile
+                     within RELATIVE_ACCURACY of the exact one, at most
+                     MAX_BUCKETS buckets whatever the number of values (the
+                     lowest buckets are collapsed first, the upper tail stays
+                     exact to the accuracy). Two sketches merge by adding
+                     bucket counts, so chunks, processes or years can be
+                     sketched separately and combined.
+  - AmountProfile    one sketch overall and one per label of each grouping
+                     (e.g. AI category, PA sector), plus count, mean and
+                     variance (merged with Chan's formula). thresholds()
+                     gives the robust threshold of each group.
+
+Zero amounts go to a zero bucket (they count for the quantiles but have no
+logarithm), negative and missing amounts are only counted.
+
+Usage:
+    profile = AmountProfile()
+    for r in records:
+        profile.add(amount, categoria=r["categoria_ai"], settore=r["settore_pa"])
+    profile.merge(other_chunk_profile)
+    profile.thresholds()["overall"]["threshold"]
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional: add_many() falls back to a Python loop
+    np = None
+
+RELATIVE_ACCURACY = 0.005
+MAX_BUCKETS = 4096
+# Robust sigmas above the log median (3: the mean + 3 sigma rule it replaces)
+DEFAULT_K = 3.0
+# MAD to standard deviation for normal data
+MAD_SCALE = 1.4826
+# Groups with fewer positive amounts get no threshold of their own
+MIN_GROUP_COUNT = 30
+
+
+class QuantileSketch:
+    """Mergeable relative-accuracy quantile sketch of non-negative values."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}      # bucket key -> count of positive values
+        self.zero = 0
+        self.count = 0      # zero + positive values
+
+    def key(self, value):
+        """Bucket of a positive value: gamma**(key-1) < value <= gamma**key."""
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def value(self, key):
+        """Representative value of a bucket (within relative_accuracy of its values)."""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        if value > 0:
+            k = self.key(value)
+            self.bins[k] = self.bins.get(k, 0) + count
+            if len(self.bins) > self.max_buckets:
+                self._collapse()
+        elif value == 0:
+            self.zero += count
+        else:
+            return
+        self.count += count
+
+    def add_many(self, values):
+        """Add a sequence of values (bucketed vectorially with numpy if available)."""
+        if np is None:
+            for v in values:
+                self.add(v)
+            return
+        values = np.asarray(values, dtype=float)
+        positive = values[values > 0]
+        keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            self.bins[k] = self.bins.get(k, 0) + c
+        zero = int((values == 0).sum())
+        self.zero += zero
+        self.count += len(positive) + zero
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest buckets into one: the upper tail keeps its accuracy."""
+        keys = sorted(self.bins)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        self.bins[excess[-1]] = sum(self.bins.pop(k) for k in excess[:-1]) + self.bins[excess[-1]]
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same accuracy (in place)."""
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        if len(self.bins) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def quantile(self, q):
+        """q-quantile of the values added (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero:
+            return 0.0
+        seen = self.zero
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                return self.value(k)
+        return self.value(max(self.bins))
+
+    def count_above(self, threshold):
+        """Values in buckets entirely above threshold (approximate to the accuracy)."""
+        if threshold <= 0:
+            return sum(self.bins.values())
+        limit = self.key(threshold)
+        return sum(c for k, c in self.bins.items() if k > limit)
+
+    def log_median_mad(self):
+        """(median, MAD) of log(value) over the positive values, or (None, None)."""
+        positive = sum(self.bins.values())
+        if not positive:
+            return None, None
+        logs = sorted((math.log(self.value(k)), c) for k, c in self.bins.items())
+        median = _weighted_median(logs, positive)
+        mad = _weighted_median(sorted((abs(v - median), c) for v, c in logs), positive)
+        return median, mad
+
+
+def _weighted_median(pairs, total):
+    """Median of sorted (value, count) pairs."""
+    half = (total - 1) / 2
+    seen = 0
+    for value, count in pairs:
+        seen += count
+        if seen > half:
+            return value
+    return pairs[-1][0]
+
+
+def robust_threshold(sketch, k=DEFAULT_K):
+    """Median, log median / MAD and the exp(median + k * 1.4826 * MAD) threshold."""
+    log_median, log_mad = sketch.log_median_mad()
+    if log_median is None:
+        return {"count": sketch.count, "median": sketch.quantile(0.5), "log_median": None,
+                "log_mad": None, "threshold": None, "above": 0}
+    threshold = math.exp(log_median + k * MAD_SCALE * log_mad)
+    return {
+        "count": sketch.count,
+        "median": sketch.quantile(0.5),
+        "log_median": log_median,
+        "log_mad": log_mad,
+        "threshold": threshold,
+        "above": sketch.count_above(threshold),
+    }
+
+
+class AmountProfile:
+    """Amount sketches overall and per group label, with streaming moments."""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_buckets=MAX_BUCKETS):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.overall = self._sketch()
+        self.groups = {}    # grouping -> {label: QuantileSketch}
+        self.n = 0          # non-missing amounts (negatives included)
+        self.mean = 0.0
+        self.m2 = 0.0       # sum of squared deviations from the mean
+        self.missing = 0
+        self.negative = 0
+
+    def _sketch(self):
+        return QuantileSketch(self.relative_accuracy, self.max_buckets)
+
+    def _group(self, grouping, label):
+        sketches = self.groups.setdefault(grouping, {})
+        if label not in sketches:
+            sketches[label] = self._sketch()
+        return sketches[label]
+
+    def _merge_moments(self, n, mean, m2):
+        if not n:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+
+    def add(self, amount, **labels):
+        """One amount (None/NaN counts as missing) with its group labels."""
+        if amount is None or amount != amount:
+            self.missing += 1
+            return
+        self._merge_moments(1, amount, 0.0)
+        if amount < 0:
+            self.negative += 1
+            return
+        self.overall.add(amount)
+        for grouping, label in labels.items():
+            self._group(grouping, label).add(amount)
+
+    def add_many(self, amounts, **labels):
+        """A column of amounts; each label keyword is a column of the same length."""
+        if np is None:
+            columns = list(labels.items())
+            for i, amount in enumerate(amounts):
+                self.add(amount, **{g: column[i] for g, column in columns})
+            return
+        values = np.asarray(amounts, dtype=float)
+        present = ~np.isnan(values)
+        self.missing += int((~present).sum())
+        values = values[present]
+        if len(values):
+            self._merge_moments(len(values), float(values.mean()),
+                                float(((values - values.mean()) ** 2).sum()))
+        kept = values >= 0
+        self.negative += int((~kept).sum())
+        values = values[kept]
+        self.overall.add_many(values)
+        for grouping, column in labels.items():
+            column = np.asarray(column, dtype=object)[present][kept]
+            names, codes = np.unique(column.astype(str), return_inverse=True)
+            for i, name in enumerate(names.tolist()):
+                self._group(grouping, name).add_many(values[codes == i])
+
+    def merge(self, other):
+        """Add another profile (another chunk, process or year) in place."""
+        self._merge_moments(other.n, other.mean, other.m2)
+        self.missing += other.missing
+        self.negative += other.negative
+        self.overall.merge(other.overall)
+        for grouping, sketches in other.groups.items():
+            for label, sketch in sketches.items():
+                self._group(grouping, label).merge(sketch)
+        return self
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, as pandas)."""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else None
+
+    def thresholds(self, k=DEFAULT_K, min_count=MIN_GROUP_COUNT):
+        """{"overall": threshold, grouping: {label: threshold}} (see robust_threshold).
+
+        Labels with fewer than min_count positive amounts get no threshold
+        of their own (their "threshold" is None): the overall one applies.
+        """
+        result = {"overall": robust_threshold(self.overall, k)}
+        for grouping, sketches in self.groups.items():
+            result[grouping] = {}
+            for label, sketch in sorted(sketches.items(), key=lambda kv: -kv[1].count):
+                entry = robust_threshold(sketch, k)
+                if sum(sketch.bins.values()) < min_count:
+                    entry.update(threshold=None, above=0)
+                result[grouping][label] = entry
+        return result
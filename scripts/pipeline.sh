@@ -59,4 +59,5 @@ echo ""
 echo "============================================================"
 echo " Pipeline complete!"
 echo " Output: data/contracts.json"
+echo " Query:  python3 scripts/contracts_db.py --help (data/contracts.sqlite)"
 echo "============================================================"
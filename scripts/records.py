@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+records.py - CSV value cleaning, known-data corrections and record rules
+
+02_build_contracts.py and the classify_chunks.py workers import these from
+here, so a worker does not need to execute the build script, and the
+corrections and rules of rules.py are applied the same way in both. The PA
+sector is not here: each process classifies it through its own memo
+(classifier.MemoizedClassifier over rules.SECTOR_RULES).
+"""
+
+from rules import AI_RULES, CORRECTIONS, PNRR_RULES
+
+
+def clean_value(value):
+    """Clean a CSV field value - normalize empty strings to None."""
+    if value is None:
+        return None
+    v = value.strip().strip('"')
+    if v == "" or v.lower() == "nan":
+        return None
+    return v
+
+
+def parse_float(value):
+    """Parse a float value, returning None for invalid values."""
+    v = clean_value(value)
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        return None
+
+
+def apply_corrections(records):
+    """Apply known data corrections."""
+    corrections_applied = []
+    for record in records:
+        cig = record.get("cig")
+        if cig in CORRECTIONS:
+            correction = CORRECTIONS[cig]
+            field = correction["field"]
+            old_val = parse_float(record.get(field))
+            record[field] = str(correction["correct_value"])
+            if field == "importo_lotto":
+                record["importo_complessivo_gara"] = str(correction["correct_value"])
+            corrections_applied.append({
+                "cig": cig,
+                "field": field,
+                "old_value": old_val,
+                "new_value": correction["correct_value"],
+                "reason": correction["reason"]
+            })
+            print(f"  [CORRECTED] CIG {cig}: {field} {old_val} -> {correction['correct_value']}")
+    return corrections_applied
+
+
+def classify_ai_category(oggetto_lotto, oggetto_gara):
+    """Classify contract by AI category based on text content."""
+    return AI_RULES.classify(f"{oggetto_lotto} {oggetto_gara}")
+
+
+def is_pnrr(row):
+    """Check if contract is PNRR-funded."""
+    flag = str(row.get("FLAG_PNRR_PNC", "")).strip()
+    if flag == "1":
+        return True
+    text = f"{row.get('oggetto_lotto', '')} {row.get('oggetto_gara', '')}"
+    return PNRR_RULES.matches(text)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+rules.py - Correction and classification tables shared by both pipelines
+
+02_build_contracts.py and analisi_appalti_ia.py (and classify_chunks.py,
+build_all.py) import the tables from here, so the two paths cannot drift:
+
+  - CORRECTIONS     known data errors, by CIG
+  - CATEGORIE_AI    AI category -> patterns on oggetto_lotto + oggetto_gara
+  - SETTORI_PA      PA sector -> patterns on the administration name
+  - PNRR_PATTERNS   patterns marking PNRR-funded contracts
+
+Each table is an ordered dict (or list) of lowercase regex patterns: the
+first label with a matching pattern wins. AI_RULES, SECTOR_RULES and
+PNRR_RULES are the tables compiled once (see classifier.py).
+"""
+
+from classifier import RuleSet
+
+DEFAULT_CATEGORY = "Altre applicazioni IA"
+DEFAULT_SECTOR = "Altri Enti Pubblici"
+
+# Known data corrections
+CORRECTIONS = {
+    "B1B36B1A1E": {
+        "field": "importo_lotto",
+        "wrong_value": 293893058.00,
+        "correct_value": 357.85,
+        "reason": "Acquisto libri biblioteca (confronto CIG B1AA21EEA3, B1B748D667)"
+    }
+}
+
+# ============================================================================
+# AI CATEGORY PATTERNS
+# ============================================================================
+
+CATEGORIE_AI = {
+    "AI Generativa & LLM": [
+        r"ai generativa", r"llm", r"gpt", r"chatbot", r"chat bot",
+        r"assistente virtuale", r"conversazional", r"generative ai",
+        r"open\s*ai", r"copilot", r"digital human"
+    ],
+    "Machine Learning & Analytics": [
+        r"machine learning", r"ml(?:\s|$)", r"deep learning",
+        r"predittiv", r"analytics", r"analisi dati", r"data science",
+        r"big data", r"rete neural", r"neural network"
+    ],
+    "Computer Vision": [
+        r"visione artificiale", r"computer vision", r"riconoscimento immagini",
+        r"detection", r"rilevamento", r"video analytics", r"ocr",
+        r"image processing", r"elaborazione immagini"
+    ],
+    "NLP & Speech": [
+        r"nlp", r"natural language", r"elaborazione linguaggio",
+        r"speech", r"vocale", r"riconoscimento vocale", r"text mining",
+        r"sentiment analysis", r"text to speech"
+    ],
+    "RPA & Automazione": [
+        r"rpa", r"robotic process", r"automazione", r"workflow automation",
+        r"processo automatizzato", r"automazione processo"
+    ],
+    "Formazione IA": [
+        r"formazione.*(?:ia|ai|intelligenza artificiale)",
+        r"corso.*(?:ia|ai|intelligenza artificiale)",
+        r"training.*(?:ia|ai)", r"didattica.*(?:ia|ai)",
+        r"insegnamento.*(?:ia|ai)", r"master.*intelligenza",
+        r"seminari?.*(?:ia|ai|intelligenza)", r"mooc.*intelligenza",
+        r"laboratori?.*(?:ia|ai|intelligenza)", r"percors.*formativ"
+    ],
+    "Cybersecurity IA": [
+        r"cybersecurity.*(?:ia|ai)", r"sicurezza.*intelligenza artificiale",
+        r"threat detection", r"anomaly detection.*security",
+        r"cyber.*intelligenza", r"darktrace", r"monitoraggio.*anomalie"
+    ],
+    "Healthcare IA": [
+        r"diagnostica.*(?:ia|ai)", r"medical.*ai", r"radiologia.*(?:ia|ai)",
+        r"telemedicina.*(?:ia|ai)", r"clinical.*ai", r"pathology.*ai",
+        r"polipi", r"colonscopia", r"endoscopia.*(?:ia|ai)",
+        r"mammograf", r"ictus", r"stroke", r"neuroradiologia",
+        r"boneview", r"rapidai", r"zeeromed", r"ecocardiograf",
+        r"morfologic.*vetrini"
+    ],
+    "Biometria": [
+        r"biometric", r"facial recognition", r"riconoscimento facciale",
+        r"fingerprint", r"impronta digitale", r"iris recognition"
+    ],
+    "Document Intelligence": [
+        r"document.*intelligence", r"protocollazione.*(?:ia|ai)",
+        r"gestione documentale.*(?:ia|ai)", r"archiviazione.*(?:ia|ai)",
+        r"ocr.*(?:ia|ai)"
+    ],
+    "IoT & Edge AI": [
+        r"iot.*(?:ia|ai)", r"edge.*(?:ia|ai)", r"smart.*sensor",
+        r"sensori.*intelligenti", r"social robot"
+    ],
+    "Recommendation Systems": [
+        r"recommendation", r"raccomandazione", r"suggerimento automatico",
+        r"personalizzazione.*(?:ia|ai)"
+    ],
+    "AI Ethics & Governance": [
+        r"etica.*(?:ia|ai)", r"governance.*(?:ia|ai)", r"responsible.*ai",
+        r"trustworthy.*ai", r"ai act", r"trasparenza.*(?:ia|ai|intelligenza)"
+    ],
+    "Infrastruttura IA": [
+        r"gpu", r"cuda", r"tensorflow", r"pytorch", r"cloud.*(?:ia|ai)",
+        r"infrastructure.*ai", r"computing.*(?:ia|ai)", r"calcolo.*(?:ia|ai)",
+        r"server.*(?:gpu|hpc|ai)", r"workstation.*(?:ia|ai)",
+        r"nvidia", r"hpc4ai", r"multi-gpu"
+    ],
+    "Consulenza IA": [
+        r"consulenza.*(?:ia|ai|intelligenza)", r"advisory.*ai",
+        r"supporto.*intelligenza artificiale", r"assessment.*ai",
+        r"osservatorio.*intelligenza"
+    ]
+}
+
+# ============================================================================
+# PA SECTOR PATTERNS
+# ============================================================================
+
+SETTORI_PA = {
+    "Sanità": [
+        r"\basl\b", r"azienda sanitaria", r"ospedale", r"\birccs\b", r"agenas",
+        r"policlinico", r"\busl\b", r"\bausl\b", r"\basst\b", r"\bats\b",
+        r"\baou\b", r"\basp\b", r"ospedalier[ao]", r"azienda.*sanitar",
+        r"azienda.*colli", r"fondazione.*pascale", r"fondazione.*policlinico"
+    ],
+    "Università e Ricerca": [
+        r"universit[àa]", r"university", r"politecnico", r"\bcnr\b",
+        r"scuola superiore", r"istituto nazionale", r"\binfn\b", r"\benea\b",
+        r"istituto superiore", r"ricerca metrologica", r"crea", r"inrim"
+    ],
+    "PA Centrale": [
+        r"ministero", r"agenzia entrate", r"\binps\b", r"\binail\b", r"\baci\b",
+        r"agenzia nazionale", r"\bagid\b", r"sogei", r"consip", r"agenzia dogane",
+        r"presidenza.*consiglio", r"commissione.*borsa", r"consob",
+        r"agenzia spaziale", r"\bice\b.*agenzia", r"\benit\b"
+    ],
+    "PA Locale": [
+        r"\bcomune\b", r"\bprovincia\b", r"\bregione\b", r"citt[àa] metropolitana",
+        r"municipio", r"unione comuni", r"comunit[àa] montana",
+        r"camera.*commercio", r"c\.c\.i\.a"
+    ],
+    "Istruzione": [
+        r"istituto comprensivo", r"\bliceo\b", r"istituto tecnico",
+        r"istituto professionale", r"convitto", r"\bscuola\b",
+        r"direzione didattica", r"circolo didattico", r"\bits\b.*academy",
+        r"istituto.*istruzione.*superiore", r"i\.i\.s\."
+    ],
+    "Difesa e Sicurezza": [
+        r"\bdifesa\b", r"carabinieri", r"polizia", r"guardia.*finanza",
+        r"vigili.*fuoco", r"esercito", r"\bmarina\b", r"aeronautica",
+        r"corpo forestale", r"interno.*p\.?s\.?", r"comando.*rete"
+    ],
+    "Utilities & Trasporti": [
+        r"\brai\b", r"trenitalia", r"\brfi\b", r"\banas\b", r"\benav\b",
+        r"\bacea\b", r"\batac\b", r"\batm\b", r"\bamat\b", r"metropolitana",
+        r"ferrovie", r"\bamtab\b", r"\bhera\b", r"\bcap\b.*holding",
+        r"acquevenete", r"ve\.la\b"
+    ],
+    "Enti Pubblici Economici": [
+        r"cassa depositi", r"\bcdp\b", r"\beur\b.*spa", r"invitalia", r"\bsace\b",
+        r"banca.*italia", r"digital library"
+    ],
+    "Giustizia": [
+        r"tribunale", r"\bcorte\b", r"\bprocura\b", r"consiglio.*magistratura",
+        r"avvocatura", r"\btar\b", r"consiglio.*stato"
+    ]
+}
+
+PNRR_PATTERNS = [
+    r"\bpnrr\b", r"piano nazionale ripresa", r"next generation",
+    r"\bngeu\b", r"recovery fund", r"recovery plan", r"\brrf\b",
+    r"d\.?m\.?\s*66", r"m4c1"
+]
+
+# Rule tables compiled once into a single matcher each
+AI_RULES = RuleSet(CATEGORIE_AI, default=DEFAULT_CATEGORY)
+SECTOR_RULES = RuleSet(SETTORI_PA, default=DEFAULT_SECTOR)
+PNRR_RULES = RuleSet({True: PNRR_PATTERNS}, default=False)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+run_report.py - Per-stage instrumentation and JSON run report
+
+Both pipelines wrap each stage in RunReport.stage(), which measures:
+
+  - wall time (perf_counter) and CPU time (process_time)
+  - records in and out of the stage
+  - peak traced memory during the stage (tracemalloc), unless disabled
+  - peak RSS of the process so far (ru_maxrss)
+
+A stage entered more than once (e.g. load, once per year) accumulates:
+times and records are summed, peaks are the maximum. write() saves the
+report as JSON:
+
+    {
+      "script": "02_build_contracts.py",
+      "started_at": "2025-06-01T10:00:00", "argv": [...], "python": "3.12.1",
+      "wall_s": 12.3, "cpu_s": 11.9, "peak_rss_mb": 310.5,
+      "trace_memory": true,
+      "stages": [{"stage": "load", "calls": 3, "wall_s": 1.2, "cpu_s": 1.1,
+                  "records_in": 0, "records_out": 9863, "peak_traced_mb": 85.2,
+                  "peak_rss_mb": 140.1}, ...],
+      "profiles": [{"stage": "enrichment", "file": "...prof",
+                    "hotspots": [{"function": "classifier.py:57(classify)",
+                                  "ncalls": 9863, "tottime_s": 0.4,
+                                  "cumtime_s": 0.6}, ...]}]
+    }
+
+profile() runs a block under cProfile; the raw stats are dumped (for pstats
+or snakeviz) and the top functions by cumulative time kept in the report.
+"""
+
+import contextlib
+import cProfile
+import json
+import platform
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+REPORT_VERSION = 1
+PROFILE_TOP = 25
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+class RunReport:
+    """Stage timings of one run of a pipeline."""
+
+    def __init__(self, script, trace_memory=True):
+        self.script = script
+        self.trace_memory = trace_memory
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages = {}
+        self._profilers = {}
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, records_in=0):
+        """Measure the block. Set entry["records_out"] on the yielded entry."""
+        entry = {"records_in": records_in, "records_out": records_in}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry["wall_s"] = time.perf_counter() - wall
+            entry["cpu_s"] = time.process_time() - cpu
+            if self.trace_memory:
+                entry["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            entry["peak_rss_mb"] = peak_rss_mb()
+            self._add(name, entry)
+
+    def _add(self, name, entry):
+        total = self.stages.get(name)
+        if total is None:
+            self.stages[name] = dict(stage=name, calls=1, **entry)
+            return
+        total["calls"] += 1
+        for key in ("records_in", "records_out", "wall_s", "cpu_s"):
+            total[key] += entry[key]
+        for key in ("peak_traced_mb", "peak_rss_mb"):
+            if key in entry:
+                total[key] = max(total[key], entry[key])
+
+    @contextlib.contextmanager
+    def profile(self, stage, path, enabled=True):
+        """Run the block under cProfile (if enabled); the stats go to path.
+
+        Repeated blocks of the same stage add to one profile, dumped by to_dict().
+        """
+        if not enabled:
+            yield
+            return
+        profiler, _ = self._profilers.setdefault(stage, (cProfile.Profile(), Path(path)))
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    def to_dict(self):
+        report = {
+            "version": REPORT_VERSION,
+            "script": self.script,
+            "started_at": self.started_at,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "wall_s": time.perf_counter() - self._wall,
+            "cpu_s": time.process_time() - self._cpu,
+            "peak_rss_mb": peak_rss_mb(),
+            "trace_memory": self.trace_memory,
+            "stages": list(self.stages.values()),
+        }
+        profiles = []
+        for stage, (profiler, path) in self._profilers.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            profiles.append({"stage": stage, "file": str(path),
+                             "hotspots": hotspots(pstats.Stats(profiler))})
+        if profiles:
+            report["profiles"] = profiles
+        return report
+
+    def write(self, path):
+        report = self.to_dict()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return report
+
+    def print_summary(self):
+        print(f"  {'stage':<20} {'wall s':>8} {'cpu s':>8} {'in':>9} {'out':>9} "
+              f"{'traced MB':>10} {'RSS MB':>8}")
+        for s in self.stages.values():
+            traced = f"{s['peak_traced_mb']:>10.1f}" if "peak_traced_mb" in s else f"{'-':>10}"
+            print(f"  {s['stage']:<20} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} "
+                  f"{s['records_in']:>9} {s['records_out']:>9} {traced} {s['peak_rss_mb']:>8.0f}")
+
+
+def hotspots(stats, top=PROFILE_TOP):
+    """The top functions of a pstats.Stats by cumulative time."""
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({"function": f"{Path(filename).name}:{line}({func})", "ncalls": ncalls,
+                     "tottime_s": tottime, "cumtime_s": cumtime})
+    rows.sort(key=lambda r: r["cumtime_s"], reverse=True)
+    return rows[:top]
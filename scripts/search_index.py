@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+search_index.py - Trigram index for the dashboard search box
+
+Produces data/search_index.json, an inverted index over the fields the
+search box looks at. Every record's fields are joined with a space and
+folded (lowercase, accents stripped), exactly like foldText() in js/app.js;
+each distinct trigram of that text maps to the ordinals (positions in
+contracts.json) of the records containing it:
+
+    {
+      "version": 1,
+      "contracts_sha256": "...",              # contracts.json of the same build
+      "records": 1302,
+      "fields": ["cig", ...],
+      "trigrams": {"int": [0, 3, 1, ...], ...}  # ordinals, delta-encoded
+    }
+
+A query of three or more characters (prefix or substring alike) is answered
+by intersecting the postings of its trigrams, then checking the few
+candidates against their folded text, instead of scanning every record
+(searchContracts() in js/app.js). The build writes the index with
+json_writer.write_json(), with the same .gz/.br siblings as the other outputs.
+"""
+
+import json
+import unicodedata
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_FIELDS = [
+    "cig",
+    "denominazione_amministrazione_appaltante",
+    "oggetto_lotto",
+    "provincia",
+    "categoria_ai",
+    "settore_pa",
+]
+
+
+def fold_text(text):
+    """Lowercase and strip combining accents (U+0300-U+036F), as foldText() in app.js."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in decomposed if not "\u0300" <= ch <= "\u036f")
+
+
+def search_text(record):
+    """The folded text the search box matches against for one record."""
+    return fold_text(" ".join(str(record.get(f) or "") for f in SEARCH_FIELDS))
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _delta_encode(ordinals):
+    previous = 0
+    deltas = []
+    for ordinal in ordinals:
+        deltas.append(ordinal - previous)
+        previous = ordinal
+    return deltas
+
+
+def build_search_index(records, contracts_sha256=None):
+    """Index records (in contracts.json order) by the trigrams of their search text."""
+    postings = {}
+    count = 0
+    for ordinal, record in enumerate(records):
+        for gram in trigrams(search_text(record)):
+            postings.setdefault(gram, []).append(ordinal)
+        count += 1
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "contracts_sha256": contracts_sha256,
+        "records": count,
+        "fields": SEARCH_FIELDS,
+        "trigrams": {gram: _delta_encode(postings[gram]) for gram in sorted(postings)},
+    }
+
+
+def search_index_is_current(path, contracts_sha256):
+    """True if path holds an index of this version for this contracts.json."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return index.get("version") == SEARCH_INDEX_VERSION and bool(contracts_sha256) \
+        and index.get("contracts_sha256") == contracts_sha256
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+shards.py - Partition contracts by publication month for lazy loading
+
+Writes one JSON array per month (data/contracts/YYYY-MM.json, records
+without a date go to unknown.json) plus data/contracts/manifest.json:
+
+    {
+      "version": 1,
+      "total_records": 1302,
+      "contracts_sha256": "...",                # hash of the matching contracts.json
+      "shards": [                               # newest first
+        {"key": "2025-10", "file": "2025-10.json", "records": 57,
+         "importo_lotto": 1234.5, "importo_complessivo_gara": 2345.6,
+         "bytes": 123456},
+        ...
+      ]
+    }
+
+The dashboard reads the manifest, fetches the most recent shards first and
+renders, then loads the older ones.
+"""
+
+import json
+from itertools import groupby
+from pathlib import Path
+
+from json_writer import write_json_array
+
+MANIFEST_VERSION = 1
+UNKNOWN_SHARD = "unknown"
+
+
+def shard_key(record):
+    """YYYY-MM of data_pubblicazione, or 'unknown'."""
+    date = record.get("data_pubblicazione") or ""
+    return date[:7] if len(date) >= 7 and date[4] == "-" else UNKNOWN_SHARD
+
+
+def _amount(record, field):
+    try:
+        return float(record.get(field) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def write_shards(records, out_dir, compress=True, contracts_sha256=None):
+    """Write month shards of records (sorted newest first) and the manifest.
+
+    Returns the manifest dict. Shard files left over from a previous build
+    that are no longer produced are removed.
+    """
+    by_key = {}
+    for key, group in groupby(records, key=shard_key):
+        by_key.setdefault(key, []).extend(group)
+    keys = sorted(by_key, key=lambda k: (k != UNKNOWN_SHARD, k), reverse=True)
+    return write_shard_groups(((key, by_key[key]) for key in keys), out_dir,
+                              compress=compress, contracts_sha256=contracts_sha256)
+
+
+def write_shard_groups(groups, out_dir, compress=True, contracts_sha256=None):
+    """Write already grouped shards, (key, records) in manifest order.
+
+    Each group's records are consumed once, as they are written, so the
+    groups can be lazy iterators (see streaming.RecordStore.iter_shards).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    shards = []
+    for key, group in groups:
+        totals = {"records": 0, "importo_lotto": 0.0, "importo_complessivo_gara": 0.0}
+
+        def counted(group=group, totals=totals):
+            for r in group:
+                totals["records"] += 1
+                totals["importo_lotto"] += _amount(r, "importo_lotto")
+                totals["importo_complessivo_gara"] += _amount(r, "importo_complessivo_gara")
+                yield r
+
+        path = out_dir / f"{key}.json"
+        stats = write_json_array(counted(), path, compress=compress)
+        shards.append({
+            "key": key,
+            "file": path.name,
+            "records": totals["records"],
+            "importo_lotto": round(totals["importo_lotto"], 2),
+            "importo_complessivo_gara": round(totals["importo_complessivo_gara"], 2),
+            "bytes": stats["bytes"],
+        })
+
+    keep = {s["file"] for s in shards} | {"manifest.json"}
+    for old in out_dir.glob("*.json*"):
+        if old.name.split(".json")[0] + ".json" not in keep:
+            old.unlink()
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "total_records": sum(s["records"] for s in shards),
+        "contracts_sha256": contracts_sha256,
+        "shards": shards,
+    }
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def shards_are_current(out_dir, contracts_sha256):
+    """True if out_dir holds a manifest for this contracts.json and every
+    shard it lists, with the recorded size."""
+    out_dir = Path(out_dir)
+    try:
+        with open(out_dir / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if manifest.get("version") != MANIFEST_VERSION or not contracts_sha256 \
+            or manifest.get("contracts_sha256") != contracts_sha256:
+        return False
+    for shard in manifest.get("shards", []):
+        path = out_dir / shard["file"]
+        if not path.is_file() or path.stat().st_size != shard["bytes"]:
+            return False
+    return True
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+streaming.py - Disk-backed record store for the streaming build
+
+In --stream mode 02_build_contracts.py never holds the whole dataset: the
+winning row of each CIG (cig_index.py) is read, corrected and enriched in
+small batches and put in a temporary SQLite database, one row per CIG:
+
+    records(seq, cig UNIQUE, year, sort_key, shard, payload)
+
+  - seq       first-seen position of the CIG, like the insertion order of
+              the dict in deduplicate()
+  - year      anno_dataset; a later record replaces the stored one only if
+              its year is more recent (the build adds records already
+              deduplicated by the CIG index, so this is only a safeguard)
+  - sort_key  data_pubblicazione or "0000-00-00", the key of the date sort
+  - shard     shard_key() of the record (YYYY-MM or "unknown")
+  - payload   the pickled record
+
+Reading back in contracts.json order is ORDER BY sort_key DESC, seq, which
+is exactly the stable newest-first sort of the in-memory build. SQLite
+sorts through its page cache and spills to temporary files beyond it, so
+memory stays bounded by the page cache size (the memory budget) plus one
+batch of records, whatever the number of years or rows.
+"""
+
+import pickle
+import sqlite3
+import tempfile
+from itertools import groupby
+from pathlib import Path
+
+from shards import UNKNOWN_SHARD, shard_key
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+BATCH_SIZE = 2000
+
+_SCHEMA = """
+CREATE TABLE records (
+    seq INTEGER PRIMARY KEY,
+    cig TEXT NOT NULL UNIQUE,
+    year TEXT NOT NULL,
+    sort_key TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    payload BLOB NOT NULL
+)
+"""
+# Keep the first-seen seq; replace the record only with a more recent year
+_UPSERT = """
+INSERT INTO records (cig, year, sort_key, shard, payload) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (cig) DO UPDATE SET
+    year = excluded.year, sort_key = excluded.sort_key,
+    shard = excluded.shard, payload = excluded.payload
+WHERE excluded.year > records.year
+"""
+
+
+def sort_key(record):
+    return record.get("data_pubblicazione") or "0000-00-00"
+
+
+class RecordStore:
+    """Deduplicated records on disk, readable in contracts.json or shard order."""
+
+    def __init__(self, directory=None, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self._tmp = tempfile.TemporaryDirectory(prefix="stream_", dir=directory)
+        self.path = Path(self._tmp.name) / "records.sqlite"
+        self.db = sqlite3.connect(self.path)
+        # A scratch database: no journal, no fsync, sorts spill to files
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("PRAGMA temp_store = FILE")
+        self.db.execute(f"PRAGMA cache_size = -{int(memory_budget_mb * 1024)}")
+        self.db.execute(_SCHEMA)
+        self.added = 0
+        self.skipped = 0
+
+    def add(self, records):
+        """Store a batch of records; records without a CIG are dropped."""
+        rows = []
+        for r in records:
+            cig = r.get("cig")
+            if not cig:
+                self.skipped += 1
+                continue
+            rows.append((cig, r.get("anno_dataset") or "0", sort_key(r), shard_key(r),
+                         pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL)))
+        with self.db:
+            self.db.executemany(_UPSERT, rows)
+        self.added += len(rows)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    @property
+    def duplicates(self):
+        return self.added - len(self)
+
+    def _query(self, sql):
+        for (payload,) in self.db.execute(sql):
+            yield pickle.loads(payload)
+
+    def iter_records(self):
+        """Records in insertion order (for passes where order does not matter)."""
+        return self._query("SELECT payload FROM records ORDER BY seq")
+
+    def iter_sorted(self):
+        """Records newest first, ties in first-seen order: the contracts.json order."""
+        return self._query("SELECT payload FROM records ORDER BY sort_key DESC, seq")
+
+    def iter_shards(self):
+        """(shard key, records) pairs, newest month first and 'unknown' last."""
+        cursor = self.db.execute(
+            "SELECT shard, payload FROM records "
+            "ORDER BY shard = ?, shard DESC, sort_key DESC, seq", (UNKNOWN_SHARD,))
+        for key, rows in groupby(cursor, key=lambda row: row[0]):
+            yield key, (pickle.loads(payload) for _, payload in rows)
+
+    def close(self):
+        self.db.close()
+        self._tmp.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
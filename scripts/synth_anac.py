@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+synth_anac.py - Deterministic synthetic ANAC CSVs for benchmarks
+
+Writes appalti_ia_YYYY_anac.csv files with the 61 CSV_FIELDS of the ANAC
+CIG dataset, in the same format as step 1 (";"-separated, quoted values,
+empty fields unquoted), so that both 02_build_contracts.py and
+analisi_appalti_ia.py can read them:
+
+  - PA names, fiscal codes and provinces drawn from a fixed pool per run
+    (one PA every ~20 contracts), covering every PA sector of the rules
+  - lot objects built from AI phrases of every category, some mentioning
+    PNRR; ~15% of the rows have FLAG_PNRR_PNC = 1
+  - log-normal amounts (median ~40k EUR, a few zeros and a long tail),
+    tender amount >= lot amount
+  - publication dates spread over the year with more contracts towards
+    December; deadlines 10-60 days later
+  - ~2% of the CIGs repeated in the following year's file (deduplication)
+    and the CIG of the known critical error with its wrong amount
+    (corrections)
+
+The same --rows/--seed always produce byte-identical files.
+
+Usage:
+    python scripts/synth_anac.py --rows 100k --output-dir /tmp/synth
+    python scripts/synth_anac.py --rows 1M --years 2024 2025 --output-dir /tmp/synth
+"""
+
+import argparse
+import importlib.util
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+# Same columns, in the same order, as the build reads them
+_spec = importlib.util.spec_from_file_location(
+    "build_contracts", Path(__file__).resolve().parent / "02_build_contracts.py")
+_build = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_build)
+CSV_FIELDS = _build.CSV_FIELDS
+
+DEFAULT_YEARS = ["2023", "2024", "2025"]
+CONTRACTS_PER_PA = 20
+DUPLICATE_RATE = 0.02
+PNRR_FLAG_RATE = 0.15
+# Known critical error, written with its wrong amount
+CRITICAL_CIG = "B1B36B1A1E"
+CRITICAL_AMOUNT = f"{_build.CORRECTIONS[CRITICAL_CIG]['wrong_value']:.2f}"
+
+CITIES = [
+    ("ROMA", "058091", "SEZIONE REGIONALE LAZIO"),
+    ("MILANO", "015146", "SEZIONE REGIONALE LOMBARDIA"),
+    ("NAPOLI", "063049", "SEZIONE REGIONALE CAMPANIA"),
+    ("TORINO", "001272", "SEZIONE REGIONALE PIEMONTE"),
+    ("PALERMO", "082053", "SEZIONE REGIONALE SICILIA"),
+    ("GENOVA", "010025", "SEZIONE REGIONALE LIGURIA"),
+    ("BOLOGNA", "037006", "SEZIONE REGIONALE EMILIA ROMAGNA"),
+    ("FIRENZE", "048017", "SEZIONE REGIONALE TOSCANA"),
+    ("BARI", "072006", "SEZIONE REGIONALE PUGLIA"),
+    ("CATANIA", "087015", "SEZIONE REGIONALE SICILIA"),
+    ("VENEZIA", "027042", "SEZIONE REGIONALE VENETO"),
+    ("VERONA", "023091", "SEZIONE REGIONALE VENETO"),
+    ("PADOVA", "028060", "SEZIONE REGIONALE VENETO"),
+    ("TRIESTE", "032006", "SEZIONE REGIONALE FRIULI VENEZIA GIULIA"),
+    ("CAGLIARI", "092009", "SEZIONE REGIONALE SARDEGNA"),
+    ("PERUGIA", "054039", "SEZIONE REGIONALE UMBRIA"),
+    ("ANCONA", "042002", "SEZIONE REGIONALE MARCHE"),
+    ("TRENTO", "022205", "SEZIONE REGIONALE TRENTINO ALTO ADIGE"),
+    ("PESCARA", "068028", "SEZIONE REGIONALE ABRUZZO"),
+    ("POTENZA", "076063", "SEZIONE REGIONALE BASILICATA"),
+]
+
+# PA name templates, one group per sector of the classification rules
+PA_TEMPLATES = [
+    "COMUNE DI {city}", "PROVINCIA DI {city}", "CITTA' METROPOLITANA DI {city}",
+    "CAMERA DI COMMERCIO DI {city}", "AZIENDA SANITARIA LOCALE {city} {n}",
+    "AZIENDA OSPEDALIERA UNIVERSITARIA DI {city}", "IRCCS ISTITUTO DI {city}",
+    "UNIVERSITA' DEGLI STUDI DI {city}", "POLITECNICO DI {city}",
+    "CNR ISTITUTO DI RICERCA {n}", "ISTITUTO COMPRENSIVO {city} {n}",
+    "LICEO SCIENTIFICO STATALE {city} {n}", "ISTITUTO TECNICO INDUSTRIALE {city}",
+    "MINISTERO DELL'INTERNO - PREFETTURA DI {city}", "AGENZIA DELLE DOGANE {city}",
+    "COMANDO PROVINCIALE VIGILI DEL FUOCO {city}", "TRIBUNALE DI {city}",
+    "ATAC {city} SPA", "ACQUE {city} SPA", "FONDAZIONE MUSEO {city} {n}",
+]
+
+AI_OBJECTS = [
+    "PIATTAFORMA DI INTELLIGENZA ARTIFICIALE GENERATIVA E CHATBOT PER {x}",
+    "ASSISTENTE VIRTUALE CONVERSAZIONALE PER {x}",
+    "SOLUZIONE DI MACHINE LEARNING E ANALISI PREDITTIVA PER {x}",
+    "SISTEMA DI VISIONE ARTIFICIALE E VIDEO ANALYTICS PER {x}",
+    "RICONOSCIMENTO VOCALE E NLP PER {x}",
+    "AUTOMAZIONE PROCESSI RPA CON INTELLIGENZA ARTIFICIALE PER {x}",
+    "CORSO DI FORMAZIONE SULL'INTELLIGENZA ARTIFICIALE PER {x}",
+    "SOFTWARE DI DIAGNOSTICA PER IMMAGINI CON AI - MAMMOGRAFIA",
+    "SISTEMA AI PER RILEVAMENTO POLIPI IN COLONSCOPIA",
+    "SERVER GPU NVIDIA PER CALCOLO AI",
+    "CONSULENZA SU INTELLIGENZA ARTIFICIALE E AI ACT PER {x}",
+    "GESTIONE DOCUMENTALE CON INTELLIGENZA ARTIFICIALE PER {x}",
+    "SERVIZIO DI THREAT DETECTION CON INTELLIGENZA ARTIFICIALE",
+    "LICENZE SOFTWARE DI INTELLIGENZA ARTIFICIALE PER {x}",
+]
+AI_TARGETS = [
+    "GLI UFFICI AMMINISTRATIVI", "IL SERVIZIO AI CITTADINI", "LA DIDATTICA",
+    "IL PRONTO SOCCORSO", "LA POLIZIA LOCALE", "IL PROTOCOLLO",
+    "LA GESTIONE DEL PERSONALE", "I LABORATORI DI RICERCA",
+]
+PNRR_SUFFIXES = [" - PNRR M1C1", " - FINANZIATO DAL PNRR NEXT GENERATION EU", " - D.M. 66/2023"]
+
+CONTRACT_TYPES = ["SERVIZI", "FORNITURE", "LAVORI"]
+CHOICE_TYPES = [
+    ("27", "AFFIDAMENTO DIRETTO IN ADESIONE AD ACCORDO QUADRO/CONVENZIONE"),
+    ("23", "AFFIDAMENTO DIRETTO"),
+    ("3", "PROCEDURA APERTA"),
+    ("26", "AFFIDAMENTO DIRETTO A SOCIETA' IN HOUSE"),
+    ("8", "PROCEDURA NEGOZIATA SENZA PREVIA PUBBLICAZIONE"),
+]
+REALIZATION_TYPES = [
+    ("1", "CONTRATTO D'APPALTO"),
+    ("11", "CONTRATTO D'APPALTO DISCENDENTE DA ACCORDO QUADRO/CONVENZIONE"),
+    ("9", "ACCORDO QUADRO"),
+]
+CPV = [
+    ("72000000-5", "SERVIZI INFORMATICI: CONSULENZA, SVILUPPO DI SOFTWARE, INTERNET E SUPPORTO"),
+    ("48000000-8", "PACCHETTI SOFTWARE E SISTEMI DI INFORMAZIONE"),
+    ("30200000-1", "APPARECCHIATURE INFORMATICHE E FORNITURE"),
+    ("80500000-9", "SERVIZI DI FORMAZIONE"),
+    ("33100000-1", "APPARECCHIATURE MEDICALI"),
+    ("79400000-8", "SERVIZI DI CONSULENZA COMMERCIALE E DI GESTIONE"),
+]
+ESITI = [("", ""), ("1", "AGGIUDICATA"), ("2", "DESERTA"), ("4", "NON AGGIUDICATA")]
+
+# Relative weight of each month: activity grows towards the end of the year
+MONTH_WEIGHTS = [6, 7, 8, 8, 8, 7, 7, 4, 8, 9, 10, 14]
+
+
+def parse_count(text):
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500."""
+    text = str(text).strip()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def cig_for(i, seed):
+    # Multiplying by an odd constant is a bijection modulo 16**10: unique CIGs
+    return f"{(i * 2654435761 + seed * 7919 + 1) % 16**10:010X}"
+
+
+def make_pas(rng, n):
+    pas = []
+    for i in range(n):
+        city, istat, sezione = rng.choice(CITIES)
+        name = rng.choice(PA_TEMPLATES).format(city=city, n=rng.randint(1, 30))
+        pas.append({
+            "denominazione_amministrazione_appaltante": name,
+            "cf_amministrazione_appaltante": f"{rng.choice(['0', '8', '9'])}{rng.randrange(10**10):010d}",
+            "codice_ausa": f"{rng.randrange(10**10):010d}",
+            "provincia": city if rng.random() > 0.04 else "",
+            "luogo_istat": istat,
+            "sezione_regionale": sezione,
+        })
+    return pas
+
+
+def amount(rng):
+    if rng.random() < 0.01:
+        return 0.0
+    return round(min(rng.lognormvariate(10.6, 1.6), 5e8), 2)
+
+
+def make_row(rng, cig, year, pas):
+    pa = rng.choice(pas)
+    month = rng.choices(range(1, 13), weights=MONTH_WEIGHTS)[0]
+    published = date(int(year), month, rng.randint(1, 28))
+    oggetto = rng.choice(AI_OBJECTS).format(x=rng.choice(AI_TARGETS))
+    pnrr_flag = rng.random() < PNRR_FLAG_RATE
+    if pnrr_flag or rng.random() < 0.05:
+        oggetto += rng.choice(PNRR_SUFFIXES)
+    n_lotti = 1 if rng.random() < 0.8 else rng.randint(2, 12)
+    lotto = amount(rng)
+    gara = lotto if n_lotti == 1 else round(lotto * rng.uniform(n_lotti * 0.7, n_lotti * 1.3), 2)
+    scelta = rng.choice(CHOICE_TYPES)
+    realizzazione = rng.choice(REALIZATION_TYPES)
+    cpv = rng.choice(CPV)
+    esito = rng.choice(ESITI)
+
+    row = dict.fromkeys(CSV_FIELDS, "")
+    row.update(pa)
+    row.update({
+        "cig": cig,
+        "numero_gara": str(rng.randrange(8_000_000, 10_000_000)),
+        "oggetto_gara": oggetto,
+        "importo_complessivo_gara": f"{gara:.2f}",
+        "n_lotti_componenti": str(n_lotti),
+        "oggetto_lotto": oggetto,
+        "importo_lotto": f"{lotto:.2f}",
+        "oggetto_principale_contratto": rng.choice(CONTRACT_TYPES),
+        "stato": "ATTIVO",
+        "settore": "SETTORI ORDINARI" if rng.random() < 0.95 else "SETTORI SPECIALI",
+        "data_pubblicazione": published.isoformat(),
+        "data_scadenza_offerta": (published + timedelta(days=rng.randint(10, 60))).isoformat(),
+        "cod_tipo_scelta_contraente": scelta[0],
+        "tipo_scelta_contraente": scelta[1],
+        "cod_modalita_realizzazione": realizzazione[0],
+        "modalita_realizzazione": realizzazione[1],
+        "id_centro_costo": f"{rng.randrange(16**8):08X}-{rng.randrange(16**4):04X}",
+        "denominazione_centro_costo": "UFFICIO ACQUISTI",
+        "anno_pubblicazione": year,
+        "mese_pubblicazione": str(month),
+        "cod_cpv": cpv[0],
+        "descrizione_cpv": cpv[1],
+        "flag_prevalente": "1" if rng.random() < 0.9 else "0",
+        "DATA_ULTIMO_PERFEZIONAMENTO": published.isoformat() + " 10:00:00",
+        "FLAG_URGENZA": "0",
+        "DURATA_PREVISTA": str(rng.choice([30, 90, 180, 365, 730])) if rng.random() < 0.2 else "",
+        "COD_ESITO": esito[0],
+        "ESITO": esito[1],
+        "DATA_COMUNICAZIONE_ESITO": (published + timedelta(days=rng.randint(30, 120))).isoformat()
+        if esito[0] else "",
+        "FLAG_PNRR_PNC": "1" if pnrr_flag else "0",
+    })
+    return row
+
+
+def format_row(row):
+    return ";".join(
+        '"' + v.replace('"', '""') + '"' if v else "" for v in (row[f] for f in CSV_FIELDS)
+    ) + "\n"
+
+
+def generate(output_dir, rows, years=None, seed=42):
+    """Write `rows` contracts split evenly over the years. Returns {year: path}."""
+    years = list(years or DEFAULT_YEARS)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    pas = make_pas(rng, max(50, rows // CONTRACTS_PER_PA))
+    header = ";".join(f'"{f}"' for f in CSV_FIELDS) + "\n"
+
+    paths = {}
+    next_cig = 0
+    carried = []  # rows repeated in the next year's file
+    for y, year in enumerate(years):
+        count = rows // len(years) + (1 if y < rows % len(years) else 0)
+        path = output_dir / f"appalti_ia_{year}_anac.csv"
+        repeated = []
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(header)
+            written = 0
+            for row in carried[:count]:
+                row = dict(row, anno_pubblicazione=year)
+                f.write(format_row(row))
+                written += 1
+            if y == min(1, len(years) - 1) and written < count:
+                row = make_row(rng, CRITICAL_CIG, year, pas)
+                row["importo_lotto"] = row["importo_complessivo_gara"] = CRITICAL_AMOUNT
+                f.write(format_row(row))
+                written += 1
+            while written < count:
+                row = make_row(rng, cig_for(next_cig, seed), year, pas)
+                next_cig += 1
+                f.write(format_row(row))
+                written += 1
+                if rng.random() < DUPLICATE_RATE:
+                    repeated.append(row)
+        carried = repeated
+        paths[year] = path
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ANAC CSVs")
+    parser.add_argument("--rows", default="10k",
+                        help="total contracts over all years (e.g. 10k, 100k, 1M, 10M)")
+    parser.add_argument("--years", nargs="+", default=DEFAULT_YEARS)
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows = parse_count(args.rows)
+    print(f"[GEN] {rows:,} rows over {len(args.years)} year(s) -> {args.output_dir}")
+    for year, path in generate(args.output_dir, rows, args.years, args.seed).items():
+        print(f"  {path.name}: {path.stat().st_size / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
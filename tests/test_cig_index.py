@@ -0,0 +1,29 @@
+"""
+Tests for scripts/cig_index.py: offsets of multi-line CSV records.
+
+Run with: python -m pytest tests
+"""
+
+import csv
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from cig_index import RowReader, iter_rows  # noqa: E402
+
+
+def test_multiline_record_read_back_complete(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_bytes(b'"cig";"oggetto_lotto"\r\n'
+                     b'"A1";"prima riga"\r\n'
+                     b'"A2";"prima riga\r\nseconda riga\r\nterza "" riga"\r\n'
+                     b'"A3";"ultima"\r\n')
+    with open(path, "r", encoding="utf-8") as f:
+        expected = [list(row.values()) for row in csv.DictReader(f, delimiter=";")]
+
+    rows = list(iter_rows(path))
+    assert [fields for _, fields in rows] == expected
+    with RowReader() as reader:
+        assert [reader.read_row(path, offset) for offset, _ in rows] == expected
+        assert reader.read_line(path, rows[2][0]) == '"A3";"ultima"\r\n'
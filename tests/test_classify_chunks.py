@@ -0,0 +1,57 @@
+"""
+Tests for scripts/classify_chunks.py: corrections and memo counts per chunk.
+
+Run with: python -m pytest tests
+"""
+
+import csv
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import classify_chunks  # noqa: E402
+from rules import CORRECTIONS  # noqa: E402
+
+HEADER = ("cig;importo_lotto;oggetto_lotto;oggetto_gara;"
+          "denominazione_amministrazione_appaltante;FLAG_PNRR_PNC\n")
+
+
+def test_classify_file_applies_corrections_and_merges_memo(tmp_path):
+    path = tmp_path / "cig.csv"
+    lines = [f"A{i:03d};1000;Chatbot;;Comune di Roma;0\n" for i in range(20)]
+    lines.append("B1B36B1A1E;293893058.00;Piattaforma machine learning;;Comune di Roma;0\n")
+    path.write_text(HEADER + "".join(lines), encoding="utf-8")
+
+    total = classify_chunks.classify_file(path, workers=2, chunk_size=5)
+
+    corrected = CORRECTIONS["B1B36B1A1E"]["correct_value"]
+    assert total["rows"] == 21
+    assert [c["cig"] for c in total["corrections"]] == ["B1B36B1A1E"]
+    assert sum(value for _, value in total["categorie"].values()) == 20 * 1000 + corrected
+    memo = total["memo"]
+    assert memo["hits"] + memo["misses"] == 21
+    assert memo["misses"] in (1, 2)  # one per worker that saw the name
+
+
+def test_classify_file_keeps_multiline_records_whole(tmp_path):
+    path = tmp_path / "cig.csv"
+    lines = [
+        "A001;1000;Chatbot;;Comune di Roma;0\r\n",
+        'A002;2000;"Prima riga\r\nseconda riga ""citata""\r\nintelligenza artificiale";;Comune di Roma;0\r\n',
+        'A003;3000;"Due righe\r\nfine";;"ASL ""Roma 1""";0\r\n',
+        "A004;4000;Chatbot;;Comune di Milano;0\r\n",
+    ]
+    path.write_text(HEADER + "".join(lines), encoding="utf-8", newline="")
+    expected = classify_chunks.classify_file(path, workers=1, chunk_size=1000)
+    output = io.StringIO()
+
+    total = classify_chunks.classify_file(path, workers=2, chunk_size=1,
+                                          output=csv.writer(output, delimiter=";"))
+
+    rows = list(csv.reader(io.StringIO(output.getvalue()), delimiter=";"))
+    assert [row[0] for row in rows] == ["A001", "A002", "A003", "A004"]
+    assert total["rows"] == expected["rows"] == 4
+    assert total["categorie"] == expected["categorie"]
+    assert total["settori"] == expected["settori"]
@@ -0,0 +1,94 @@
+"""
+Tests for scripts/extract_cig.py against the local ZIP fixtures.
+
+tests/fixtures/cig_csv_2025_01.zip and cig_csv_2025_02.zip hold a few rows
+each (CRLF line endings, as in the ANAC archives):
+
+  - Z001, Z006   no AI keyword: filtered out
+  - Z002         in both months; February has the later
+                 DATA_ULTIMO_PERFEZIONAMENTO and must win
+  - Z003         in both months; February's row is older and must lose
+  - Z004         accented, upper-case keyword ("INTELLIGÈNZA ARTIFICIALE")
+  - Z005         February only
+
+Run with: python -m pytest tests
+"""
+
+import csv
+import http.client
+import io
+import json
+import shutil
+import sys
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent
+FIXTURES = TESTS_DIR / "fixtures"
+sys.path.insert(0, str(TESTS_DIR.parent / "scripts"))
+
+import extract_cig  # noqa: E402
+from keyword_matcher import KeywordMatcher, load_keywords  # noqa: E402
+
+
+def read_output(output_dir, year="2025"):
+    path = Path(output_dir) / f"appalti_ia_{year}_anac.csv"
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f, delimiter=";"))
+    with open(path.with_suffix(".counts.json"), "r", encoding="utf-8") as f:
+        counts = json.load(f)
+    return rows, counts
+
+
+def test_filter_month_keeps_keyword_rows():
+    matcher = KeywordMatcher(load_keywords())
+    header, matches, total = extract_cig.filter_month(
+        FIXTURES / "cig_csv_2025_01.zip", "2025", 1, matcher)
+
+    assert header.startswith('"cig";')
+    assert total == 4
+    assert [line.split(";", 1)[0] for line in matches] == ['"Z003"', '"Z002"', '"Z004"']
+    assert all(line.endswith("\r\n") for line in matches)
+
+
+def test_run_dedups_most_recent_and_sorts_by_cig(tmp_path):
+    results = extract_cig.run(["2025"], load_keywords(), zip_dir=FIXTURES,
+                              output_dir=tmp_path, filter_workers=1)
+
+    assert results == {"2025": 4}
+    rows, counts = read_output(tmp_path)
+    assert [r["cig"] for r in rows] == ["Z002", "Z003", "Z004", "Z005"]
+    by_cig = {r["cig"]: r for r in rows}
+    assert by_cig["Z002"]["oggetto_lotto"].endswith("- variante")
+    assert by_cig["Z002"]["DATA_ULTIMO_PERFEZIONAMENTO"] == "2025-02-20"
+    assert by_cig["Z003"]["oggetto_lotto"] == "Piattaforma di intelligenza artificiale"
+
+    assert counts["months"] == {"01": {"rows": 4, "ai_rows": 3},
+                                "02": {"rows": 4, "ai_rows": 3}}
+    assert (counts["total_rows"], counts["ai_rows"], counts["unique_cig"]) == (8, 6, 4)
+
+
+def test_run_skips_corrupt_archive(tmp_path):
+    zip_dir = tmp_path / "zips"
+    shutil.copytree(FIXTURES, zip_dir)
+    (zip_dir / "cig_csv_2025_03.zip").write_bytes(b"not a zip archive")
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    results = extract_cig.run(["2025"], load_keywords(), zip_dir=zip_dir,
+                              output_dir=output_dir, filter_workers=1)
+
+    assert results == {"2025": 4}
+    _, counts = read_output(output_dir)
+    assert sorted(counts["months"]) == ["01", "02"]
+
+
+def test_download_month_skips_truncated_download(tmp_path, monkeypatch):
+    class Truncated(io.BytesIO):
+        def read(self, *args):
+            raise http.client.IncompleteRead(b"PK")
+
+    monkeypatch.setattr(extract_cig.urllib.request, "urlopen",
+                        lambda url, timeout=None: Truncated())
+
+    assert extract_cig.download_month("2025", 1, tmp_path) is None
+    assert list(tmp_path.iterdir()) == []